@@ -0,0 +1,124 @@
+import asyncio
+import csv
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+
+from consts import KEYSIZE, MESSAGE, SEED, SQUARINGS_PER_SEC
+from utils import try_make_process_rude
+
+from tlp_lib import AsyncEDTLP
+from tlp_lib.protocols import Server_Info
+from tlp_lib.smartcontracts import AsyncEthereumSC, AsyncMockSC
+from tlp_lib.smartcontracts.protocols import AsyncSCInterface
+
+PARTS = 2  # puzzle parts per contract
+LATENCY = 0.05  # seconds each AsyncMockSC call takes, standing in for the round trip to a node
+# squarings per second the puzzles are made for, and the contract counts to run them with. At 1 the puzzles solve
+# at once and only the contract handling is measured; at this host's rate each part takes a second of squaring,
+# which the concurrent run overlaps on the executor's threads, with the GIL released
+RUNS = [
+    (1, [1, 10, 100, 250]),
+    (SQUARINGS_PER_SEC[KEYSIZE], [1, 4, 16]),
+]
+
+
+async def run_protocol(sc: AsyncSCInterface, squarings_per_sec: int) -> None:
+    """
+    One EDTLP instance of PARTS puzzles of a second each at `squarings_per_sec`, from delegation to retrieval,
+    against `sc`
+    """
+    client_helper_id = 1
+    server_id = 0
+    server_helper_id = 2
+
+    edtlp = AsyncEDTLP(seed=SEED, smart_contract=sc)
+    messages = [MESSAGE] * PARTS
+    intervals = [1] * PARTS
+
+    csk = edtlp.client_setup()
+    encrypted_messages, start_time = edtlp.client_delegation(messages, csk)
+
+    helper_id = client_helper_id
+    if isinstance(sc, AsyncEthereumSC):
+        await sc.switch_to_account(client_helper_id)
+        helper_id = sc.account
+    await sc.switch_to_account(server_id)
+    server_info = Server_Info(squarings_per_sec)
+    _, sc = await edtlp.server_delegation(intervals, server_info, [1] * PARTS, start_time, helper_id, None, KEYSIZE)
+
+    await sc.switch_to_account(client_helper_id)
+    pk, sk = await edtlp.helper_setup(intervals, squarings_per_sec, KEYSIZE)
+    puzz_list = await edtlp.helper_generate(encrypted_messages, pk, sk, start_time, sc)
+
+    await sc.switch_to_account(server_helper_id)
+    async for m, d in edtlp.solve(sc, server_info, pk, puzz_list, 1):
+        await edtlp.register(sc, m, d)
+
+    await sc.switch_to_account(server_id)
+    await edtlp.pay_many(sc)
+    assert [m async for m in edtlp.retrieve_all(sc, csk)] == messages
+
+
+def mock_contracts(contracts: int) -> list[AsyncSCInterface]:
+    return [AsyncMockSC(latency=LATENCY) for _ in range(contracts)]
+
+
+def ethereum_contracts(contracts: int) -> list[AsyncSCInterface]:
+    # one in-process PyEVM chain shared by all contracts, as with a single node
+    first = AsyncEthereumSC()
+    return [first, *(AsyncEthereumSC(web3=first.web3) for _ in range(contracts - 1))]
+
+
+async def run_sequential(contracts: list[AsyncSCInterface], squarings_per_sec: int) -> None:
+    for sc in contracts:
+        await run_protocol(sc, squarings_per_sec)
+
+
+async def run_concurrent(contracts: list[AsyncSCInterface], squarings_per_sec: int) -> None:
+    await asyncio.gather(*(run_protocol(sc, squarings_per_sec) for sc in contracts))
+
+
+def benchmark_async_contracts(
+    contracts: int, squarings_per_sec: int, make_contracts: Callable[[int], list[AsyncSCInterface]]
+) -> dict[str, int | float]:
+    """
+    Seconds to run `contracts` EDTLP instances one after another and all at once on a single event loop
+    """
+    output: dict[str, int | float] = {"contracts": contracts, "squarings per second": squarings_per_sec}
+    for name, run in [("sequential", run_sequential), ("concurrent", run_concurrent)]:
+        scs = make_contracts(contracts)
+        start = time.perf_counter()
+        asyncio.run(run(scs, squarings_per_sec))
+        output[f"{name} seconds"] = time.perf_counter() - start
+    output["speedup"] = output["sequential seconds"] / output["concurrent seconds"]
+    print(output)
+    return output
+
+
+def benchmark():
+    for backend, make_contracts in [("mock", mock_contracts), ("ethereum", ethereum_contracts)]:
+        rows = []
+        for squarings_per_sec, contract_counts in RUNS:
+            for contracts in contract_counts:
+                print(f"{backend}: {contracts} contracts at {squarings_per_sec} squarings per second")
+                rows.append(benchmark_async_contracts(contracts, squarings_per_sec, make_contracts))
+
+        with open(
+            Path(__file__).parent / f"out/benchmark_async_contracts_{backend}{datetime.now()}.csv", "w", newline=""
+        ) as csvfile:
+            writer = csv.DictWriter(
+                csvfile,
+                fieldnames=["contracts", "squarings per second", "sequential seconds", "concurrent seconds", "speedup"],
+            )
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    try_make_process_rude()
+
+    print("keysize:", KEYSIZE)
+    print("parts per contract:", PARTS)
+    benchmark()
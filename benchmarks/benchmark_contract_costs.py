@@ -0,0 +1,82 @@
+import csv
+from datetime import datetime
+from pathlib import Path
+
+from consts import KEYSIZE, MESSAGE, SEED
+from utils import try_make_process_rude
+
+from tlp_lib import EDTLP
+from tlp_lib.protocols import Server_Info
+from tlp_lib.smartcontracts import EthereumSC
+
+INSTANCES = [10**i for i in range(0, 4)]
+FUNCTIONS = ["initialize", "setCommitments", "addSolution", "pay"]
+SQUARINGS_PER_SEC = 1  # the puzzles only need to be solvable, their delay doesn't change the contract costs
+
+
+def benchmark_contract_costs(instances: int) -> dict[str, int | float]:
+    """
+    Runs EDTLP for `instances` puzzles against a contract on the in-process PyEVM backend and returns the gas and
+    seconds per instance of each contract function
+    """
+    client_helper_id = 1
+    server_id = 0
+    server_helper_id = 2
+
+    sc = EthereumSC()
+    edtlp = EDTLP(seed=SEED, smart_contract=sc)
+    messages = [MESSAGE] * instances
+    intervals = [1] * instances
+
+    csk = edtlp.client_setup()
+    encrypted_messages, start_time = edtlp.client_delegation(messages, csk)
+
+    sc.switch_to_account(client_helper_id)
+    helper_id = sc.account
+    sc.switch_to_account(server_id)
+    server_info = Server_Info(1)
+    _, sc = edtlp.server_delegation(intervals, server_info, [1] * instances, start_time, helper_id, None, KEYSIZE)
+
+    sc.switch_to_account(client_helper_id)
+    pk, sk = edtlp.helper_setup(intervals, SQUARINGS_PER_SEC, KEYSIZE)
+    puzz_list = edtlp.helper_generate(encrypted_messages, pk, sk, start_time, sc)
+
+    sc.switch_to_account(server_helper_id)
+    for m, d in edtlp.solve(sc, server_info, pk, puzz_list, 1):
+        edtlp.register(sc, m, d)
+
+    sc.switch_to_account(server_id)
+    for i in range(instances):
+        edtlp.pay(sc, i)
+
+    assert isinstance(sc, EthereumSC)
+    output: dict[str, int | float] = {"instances": instances}
+    for name in FUNCTIONS:
+        _, gas_used, _, seconds = sc.stats.transactions[name]
+        output[f"{name} gas"] = gas_used / instances
+        output[f"{name} seconds"] = seconds / instances
+    calls = sc.stats.call_total
+    output["calls"] = calls.count / instances
+    output["call seconds"] = calls.seconds / instances
+    print(sc.stats)
+    return output
+
+
+def benchmark():
+    rows = []
+    for instances in INSTANCES:
+        print(f"{instances} instances")
+        rows.append(benchmark_contract_costs(instances))
+
+    with open(Path(__file__).parent / f"out/benchmark_contract_costs{datetime.now()}.csv", "w", newline="") as csvfile:
+        fieldnames = ["instances", *(f"{name} {unit}" for name in FUNCTIONS for unit in ("gas", "seconds"))]
+        writer = csv.DictWriter(csvfile, fieldnames=[*fieldnames, "calls", "call seconds"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    try_make_process_rude()
+
+    print("keysize:", KEYSIZE)
+    benchmark()
@@ -0,0 +1,37 @@
+import gmpy2
+from consts import SEED, SQUARINGS_PER_SEC
+from utils import timer, try_make_process_rude
+
+from tlp_lib import TLP
+from tlp_lib.TLP import crt_powmod
+
+EXPONENTIATIONS = 1000
+
+
+def benchmark_crt():
+    print(f"{'keysize':>8} {'powmod':>12} {'crt':>12} {'speedup':>8}")
+    for keysize, squarings_per_sec in SQUARINGS_PER_SEC.items():
+        tlp = TLP(seed=SEED)
+        (n, _, r), (p, q, _, a) = tlp.setup(1, squarings_per_sec, keysize=keysize)
+        q_inv = gmpy2.invert(gmpy2.mpz(q), gmpy2.mpz(p))
+        assert crt_powmod(r, a, p, q, q_inv) == gmpy2.powmod(r, a, n)
+
+        def full():
+            for _ in range(EXPONENTIATIONS):
+                gmpy2.powmod(r, a, n)
+
+        def crt():
+            for _ in range(EXPONENTIATIONS):
+                crt_powmod(r, a, p, q, q_inv)
+
+        time_full = timer(full)
+        time_crt = timer(crt)
+        print(
+            f"{keysize:>8} {EXPONENTIATIONS / time_full:>10.0f}/s {EXPONENTIATIONS / time_crt:>10.0f}/s"
+            f" {time_full / time_crt:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    try_make_process_rude()
+    benchmark_crt()
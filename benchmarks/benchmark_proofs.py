@@ -0,0 +1,33 @@
+from consts import KEYSIZE, SEED, SQUARINGS_PER_SEC
+from utils import timer, timer_with_output, try_make_process_rude
+
+from tlp_lib import TLP
+from tlp_lib.protocols import TLP_Proof
+
+TIMES = [1, 2, 4, 8]
+
+
+def benchmark_proofs():
+    print(f"{'seconds':>8} {'solve':>10} {'prove':>10} {'verify':>10} {'proof size':>11}")
+    tlp = TLP(seed=SEED)
+    for seconds in TIMES:
+        pk, sk = tlp.setup(seconds, SQUARINGS_PER_SEC[KEYSIZE], KEYSIZE)
+        puzzle = tlp.generate(pk, sk.a, b"")
+
+        solve_time = timer(tlp.solve, pk, puzzle)
+        prove_time, (_, proof) = timer_with_output(tlp.solve_with_proof, pk, puzzle)
+        assert tlp.verify_proof(pk, proof)
+        verify_time = timer(tlp.verify_proof, pk, proof)
+        print(
+            f"{seconds:>8} {solve_time:>9.3f}s {prove_time:>9.3f}s {verify_time * 1000:>8.2f}ms"
+            f" {_proof_size(proof, pk.n):>10}B"
+        )
+
+
+def _proof_size(proof: TLP_Proof, n: int) -> int:
+    return (n.bit_length() + 7) // 8 * (3 + len(proof.mu))
+
+
+if __name__ == "__main__":
+    try_make_process_rude()
+    benchmark_proofs()
@@ -1,10 +1,12 @@
 import csv
 from datetime import datetime
+from itertools import accumulate
 from multiprocessing import Pool
 from operator import itemgetter
 from pathlib import Path
 from typing import Optional
 
+import gmpy2
 from consts import KEYSIZE, MESSAGE, SEED, SQUARINGS_PER_SEC
 from utils import timer, timer_with_output, try_make_process_rude
 
@@ -20,6 +22,7 @@ from tlp_lib.protocols import (
 )
 from tlp_lib.smartcontracts import EthereumSC, MockSC
 from tlp_lib.smartcontracts.protocols import SCInterface
+from tlp_lib.wrappers import FixedBasePow, SeededRSA
 
 SOLVE = True
 
@@ -61,22 +64,13 @@ def benchmark_time_tlp(instances: int):
     time_generate = timer(tlp_generate)
     output["generate"] = time_generate
 
-    # (n, _, _), (p, q, phi_n, _) = tlp.setup(1, SQUARINGS_PER_SEC[KEYSIZE], KEYSIZE)
-
-    # def gen_modulus(*, keysize: int):
-    #     # keysize isn't used, as KEYSIZE constant affects instantiation above
-    #     return n, p, q, phi_n
-    #
-    # def tlp_setup_and_generate_fixed_n():
-    #     tlp = TLP(seed=SEED, gen_modulus=gen_modulus)
-    #     seconds = 0
-    #     for i, m in enumerate(messages):
-    #         seconds += distinct_intervals[i]
-    #         pk, sk = tlp.setup(seconds, SQUARINGS_PER_SEC[KEYSIZE], KEYSIZE)
-    #         tlp.generate(pk, sk.a, m)
-    #
-    # time_fixed_n = timer(tlp_setup_and_generate_fixed_n)
-    # output["setup and generate fixed n"] = time_fixed_n
+    def tlp_setup_and_generate_shared_n():
+        intervals = list(accumulate(distinct_intervals))
+        keys = tlp.setup_many(intervals, SQUARINGS_PER_SEC[KEYSIZE], KEYSIZE)
+        tlp.generate_many([pk for pk, _ in keys], [sk.a for _, sk in keys], messages)
+
+    time_shared_n = timer(tlp_setup_and_generate_shared_n)
+    output["setup and generate shared n"] = time_shared_n
 
     if not SOLVE or instances >= 100:
         output["total"] = sum((time_setup, time_generate))
@@ -134,6 +128,11 @@ def benchmark_time_mitlp(instances: int):
     time_verify = timer(mitlp_verify)
     output["verify"] = time_verify
 
+    def mitlp_verify_many():
+        assert mitlp.verify_many(sol, hash_list) == []
+
+    output["verify many"] = timer(mitlp_verify_many)
+
     output["total"] = sum((time_setup, time_generate, time_solve, time_verify))
     return output
 
@@ -153,6 +152,11 @@ def benchmark_time_gctlp(instances: int):
     time_setup, (pk, sk) = timer_with_output(gctlp.setup, distinct_intervals, SQUARINGS_PER_SEC[KEYSIZE], KEYSIZE)
     output["setup"] = time_setup
 
+    _, _, _, phi_n = SeededRSA(seed=SEED).gen_key(keysize=KEYSIZE)
+    t = [gmpy2.mpz(interval * SQUARINGS_PER_SEC[KEYSIZE]) for interval in distinct_intervals]
+    output["setup exponents"] = timer(FixedBasePow(2, phi_n).pow_many, t)
+    output["setup exponents naive"] = timer(lambda: [gmpy2.powmod(2, t_i, phi_n) for t_i in t])
+
     time_generate, (puzz_list, hash_list) = timer_with_output(gctlp.generate, messages, pk, sk)
     output["generate"] = time_generate
 
@@ -178,6 +182,11 @@ def benchmark_time_gctlp(instances: int):
     time_verify = timer(gctlp_verify)
     output["verify"] = time_verify
 
+    def gctlp_verify_many():
+        assert gctlp.verify_many(sol, hash_list) == []
+
+    output["verify many"] = timer(gctlp_verify_many)
+
     output["total"] = sum((time_setup, time_generate, time_solve, time_verify))
     return output
 
@@ -335,15 +344,19 @@ def benchmark():
             "extra",
             "instances",
             "setup",
+            "setup exponents",
+            "setup exponents naive",
             "helper setup",
             "client delegation",
             "server delegation",
             "generate",
             "helper generate",
+            "setup and generate shared n",
             "solve",
             "helper solve",
             "helper register",
             "verify",
+            "verify many",
             "retrieve",
             "total",
         ]
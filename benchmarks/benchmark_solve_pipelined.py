@@ -0,0 +1,52 @@
+import time
+
+from consts import KEYSIZE, SEED, SQUARINGS_PER_SEC
+from utils import try_make_process_rude
+
+from tlp_lib import GCTLP
+
+PARTS = 4
+SECONDS_PER_PART = 2
+CONSUMER_SECONDS = [0.5, 1, 2]  # CPU seconds the consumer spends on each result
+
+
+def consume(seconds: float) -> None:
+    # spins until this thread has had `seconds` of CPU time, like parsing or re-encrypting a result would
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+def benchmark_solve_pipelined():
+    """
+    Seconds to solve and consume PARTS instances with solve, where the consumer waits for the squarings, and with
+    solve_pipelined, where it runs alongside them. With the GIL released during squaring the pipelined run takes
+    about the longer of the two rather than their sum, given a second core
+    """
+    gctlp = GCTLP(seed=SEED)
+    pk, sk = gctlp.setup([SECONDS_PER_PART] * PARTS, SQUARINGS_PER_SEC[KEYSIZE], KEYSIZE)
+    puzz_list, _ = gctlp.generate([b""] * PARTS, pk, sk)
+
+    print(f"{'consumer':>9} {'solve':>10} {'pipelined':>10} {'overlap':>8}")
+    for seconds in CONSUMER_SECONDS:
+        start = time.perf_counter()
+        for _ in gctlp.solve(pk, puzz_list):
+            consume(seconds)
+        solve_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in gctlp.solve_pipelined(pk, puzz_list):
+            consume(seconds)
+        pipelined_time = time.perf_counter() - start
+
+        # share of the consumer's time that was hidden behind the squarings
+        overlap = (solve_time - pipelined_time) / (seconds * PARTS)
+        print(f"{seconds:>8}s {solve_time:>9.3f}s {pipelined_time:>9.3f}s {overlap:>7.0%}")
+
+
+if __name__ == "__main__":
+    try_make_process_rude()
+
+    print("keysize:", KEYSIZE)
+    print("parts:", PARTS, "seconds per part:", SECONDS_PER_PART)
+    benchmark_solve_pipelined()
@@ -3,7 +3,9 @@ import time
 from consts import KEYSIZE, SEED, SQUARINGS_PER_SEC
 from utils import timer
 
-from tlp_lib import TLP
+from tlp_lib import TLP, calibrate
+from tlp_lib.wrappers import ChunkedSquarer, NaiveSquarer
+from tlp_lib.wrappers.protocols import Squarer
 
 
 def now():
@@ -90,6 +92,43 @@ def compare_gmpy_sage(squarings: int):
     print(seconds)
 
 
+def compare_squarers(seconds: int = 5):
+    squarers: dict[str, Squarer] = {"(r**2) % n": NaiveSquarer(), "chunked powmod": ChunkedSquarer()}
+    print(f"{'keysize':>8} {'squarer':>16} {'per sec':>12}")
+    for keysize, squarings_per_sec in SQUARINGS_PER_SEC.items():
+        tlp = TLP(seed=SEED)
+        pk, _ = tlp.setup(1, 1, keysize=keysize)
+        n, _, r = pk
+        squarings = squarings_per_sec * seconds
+        results: list[int] = []
+        for name, squarer in squarers.items():
+            start = now()
+            results.append(squarer.square(r, squarings, n))
+            stop = now()
+            print(f"{keysize:>8} {name:>16} {squarings / ((stop - start) / MILI_TO_S):>12.0f}")
+        assert len(set(results)) == 1
+
+
+def compare_calibration():
+    """
+    Compares the rate found by calibrate against a long run of the solve engine, to check calibrate's accuracy
+    """
+    print(f"{'keysize':>8} {'calibrated':>12} {'measured':>12} {'error':>8}")
+    for keysize in SQUARINGS_PER_SEC:
+        profile = calibrate(keysize, save=False)
+        tlp = TLP(seed=SEED)
+        pk, _ = tlp.setup(1, 1, keysize=keysize)
+        n, _, r = pk
+        squarings = profile.squarings_per_second * INTERVAL
+        start = now()
+        ChunkedSquarer().square(r, squarings, n)
+        measured = squarings / ((now() - start) / MILI_TO_S)
+        error = profile.squarings_per_second / measured - 1
+        print(f"{keysize:>8} {profile.squarings_per_second:>12} {measured:>12.0f} {error:>8.2%}")
+
+
 if __name__ == "__main__":
     print(timer(count_squarings_in_fixed_time))
+    # compare_squarers()
+    # compare_calibration()
     # print(timer(time_fixed_squarings, 100_000_000))
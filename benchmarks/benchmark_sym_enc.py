@@ -0,0 +1,39 @@
+from consts import NUMBER
+from utils import timer, try_make_process_rude
+
+from tlp_lib.wrappers import AESGCMWrapper, FernetWrapper
+from tlp_lib.wrappers.protocols import SymEnc
+
+MESSAGE_SIZES = [16, 1024, 64 * 1024, 1024 * 1024]
+ROUNDS = 100
+
+
+def benchmark_sym_enc():
+    print(f"{'backend':>14} {'size':>8} {'encrypt':>12} {'decrypt':>12} {'overhead':>9}")
+    sym_encs: dict[str, SymEnc] = {"FernetWrapper": FernetWrapper, "AESGCMWrapper": AESGCMWrapper}
+    for size in MESSAGE_SIZES:
+        message = bytes(size)
+        for name, sym_enc in sym_encs.items():
+            key = sym_enc.generate_key()
+            encrypted_message = sym_enc.encrypt(key, message)
+            assert sym_enc.decrypt(key, encrypted_message) == message
+
+            def encrypt():
+                for _ in range(ROUNDS):
+                    sym_enc.encrypt(key, message)
+
+            def decrypt():
+                for _ in range(ROUNDS):
+                    sym_enc.decrypt(key, encrypted_message)
+
+            encrypt_rate = size * ROUNDS * NUMBER / timer(encrypt)
+            decrypt_rate = size * ROUNDS * NUMBER / timer(decrypt)
+            print(
+                f"{name:>14} {size:>8} {encrypt_rate / 2**20:>8.1f}MB/s {decrypt_rate / 2**20:>8.1f}MB/s"
+                f" {len(encrypted_message) - size:>8}B"
+            )
+
+
+if __name__ == "__main__":
+    try_make_process_rude()
+    benchmark_sym_enc()
@@ -0,0 +1,40 @@
+import os
+import time
+
+from consts import KEYSIZE, MESSAGE, SEED, SQUARINGS_PER_SEC
+from utils import try_make_process_rude
+
+from tlp_lib import TLP
+from tlp_lib.protocols import TLP_Public, TLP_Puzzle
+
+INTERVAL = 1
+
+
+def benchmark_tlp_solve_many(puzzles_per_worker: int = 4):
+    max_workers = os.cpu_count() or 1
+    tlp = TLP(seed=SEED)
+    pk, sk = tlp.setup(INTERVAL, SQUARINGS_PER_SEC[KEYSIZE], keysize=KEYSIZE)
+    puzzles: list[tuple[TLP_Public, TLP_Puzzle]] = [
+        (pk, tlp.generate(pk, sk.a, MESSAGE)) for _ in range(max_workers * puzzles_per_worker)
+    ]
+
+    workers = 1
+    print(f"{'workers':>8} {'puzzles':>8} {'seconds':>10} {'puzzles/sec':>12} {'speedup':>8}")
+    base_rate = None
+    while workers <= max_workers:
+        items = puzzles[: workers * puzzles_per_worker]
+        start = time.perf_counter()
+        for _, message in tlp.solve_many(items, workers=workers):
+            assert message == MESSAGE
+        seconds = time.perf_counter() - start
+        rate = len(items) / seconds
+        if base_rate is None:
+            base_rate = rate
+        print(f"{workers:>8} {len(items):>8} {seconds:>10.2f} {rate:>12.2f} {rate / base_rate:>8.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    try_make_process_rude()
+    print("keysize:", KEYSIZE)
+    benchmark_tlp_solve_many()
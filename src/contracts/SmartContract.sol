@@ -139,6 +139,19 @@ contract SmartContract {
 
     function addSolution(bytes calldata solution, bytes calldata witness) public {
         require(contractStatus == Status.Solving, "Contract is not in Solving status.");
+        _addSolution(solution, witness);
+    }
+
+    function addSolutions(bytes[] calldata _solutions, bytes[] calldata _witnesses) public {
+        require(contractStatus == Status.Solving, "Contract is not in Solving status.");
+        require(_solutions.length == _witnesses.length, "The length of the solutions and witnesses arrays should be the same.");
+
+        for (uint i = 0; i < _solutions.length; i++) {
+            _addSolution(_solutions[i], _witnesses[i]);
+        }
+    }
+
+    function _addSolution(bytes calldata solution, bytes calldata witness) internal {
         require(nextUnsolvedPuzzlePart < amountOfPuzzleParts, "All puzzle parts have already been solved.");
 
         puzzleParts[nextUnsolvedPuzzlePart].solution = solution;
@@ -182,7 +195,54 @@ contract SmartContract {
         return (solutions, witnesses, timestamps);
     }
 
+    function getCommitmentsRange(uint start, uint count) public view returns (bytes[] memory) {
+        uint end = _rangeEnd(start, count);
+        bytes[] memory commitments = new bytes[](end - start);
+        for (uint i = start; i < end; i++) {
+            commitments[i - start] = puzzleParts[i].commitment;
+        }
+        return commitments;
+    }
+
+    function getUpperBoundsRange(uint start, uint count) public view returns (uint[] memory) {
+        uint end = _rangeEnd(start, count);
+        uint[] memory upperBounds = new uint[](end - start);
+        for (uint i = start; i < end; i++) {
+            upperBounds[i - start] = puzzleParts[i].upperBound;
+        }
+        return upperBounds;
+    }
+
+    function getSolutionsRange(uint start, uint count) public view returns (bytes[] memory, bytes[] memory, uint[] memory) {
+        uint end = _rangeEnd(start, count);
+        bytes[] memory solutions = new bytes[](end - start);
+        bytes[] memory witnesses = new bytes[](end - start);
+        uint[] memory timestamps = new uint[](end - start);
+        for (uint i = start; i < end; i++) {
+            solutions[i - start] = puzzleParts[i].solution;
+            witnesses[i - start] = puzzleParts[i].witness;
+            timestamps[i - start] = puzzleParts[i].timestamp;
+        }
+        return (solutions, witnesses, timestamps);
+    }
+
+    // the end of the range of at most count puzzle parts from start
+    function _rangeEnd(uint start, uint count) internal view returns (uint) {
+        require(start <= amountOfPuzzleParts, "The start index is out of bounds.");
+        return count < amountOfPuzzleParts - start ? start + count : amountOfPuzzleParts;
+    }
+
     function pay(uint puzzlePartIndex) public onlyOwner {
+        _pay(puzzlePartIndex);
+    }
+
+    function payMany(uint[] calldata puzzlePartIndices) public onlyOwner {
+        for (uint i = 0; i < puzzlePartIndices.length; i++) {
+            _pay(puzzlePartIndices[i]);
+        }
+    }
+
+    function _pay(uint puzzlePartIndex) internal {
         require(!puzzleParts[puzzlePartIndex].paidOut, "The puzzle part has already been paid out.");
         puzzleParts[puzzlePartIndex].paidOut = true;
         payable(puzzleParts[puzzlePartIndex].solver).transfer(puzzleParts[puzzlePartIndex].coin);
@@ -0,0 +1,259 @@
+import asyncio
+import inspect
+from collections.abc import AsyncGenerator, Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Unpack
+
+from eth_typing import ChecksumAddress
+
+from tlp_lib import GCTLP
+from tlp_lib.calibration import host_server_info
+from tlp_lib.consts import SC_GAS_BUDGET, SC_PAGE_SIZE, SC_PAY_GAS, SQUARINGS_PER_SEC_UPPER_BOUND
+from tlp_lib.EDTLP import (
+    check_proof,
+    check_solvable,
+    custom_extra_delay,
+    delegation_schedule,
+    gas_batches,
+    late_parts,
+    solution_gas,
+)
+from tlp_lib.protocols import (
+    GCTLP_Client_Key,
+    GCTLP_Encrypted_Message,
+    GCTLP_Encrypted_Messages,
+    GCTLP_Intervals,
+    GCTLP_Public_Input,
+    GCTLP_Secret_Input,
+    GCTLP_type,
+    GCTLPKwargs,
+    Server_Info,
+    TLP_Digest,
+    TLP_Message,
+    TLP_Messages,
+    TLP_Proof,
+    TLP_Puzzle,
+)
+from tlp_lib.smartcontracts import AsyncMockSC
+from tlp_lib.smartcontracts.protocols import AsyncSCInterface, SC_Coins, SC_ExtraTime
+from tlp_lib.wrappers import FernetWrapper, Random
+from tlp_lib.wrappers.protocols import Checkpointer, ProgressTracker, RandGen, SymEnc
+
+
+class AsyncEDTLP:
+    """
+    EDTLP for asyncio: contract calls are awaited, and setup, generation and solving run on `executor`, the event
+    loop's default executor if it is None. A single loop can then drive many protocol instances, each with its own
+    smart contract. The executor must be a thread pool, as solving hands it one step of a generator at a time
+    """
+
+    def __init__(
+        self,
+        *,
+        gctlp: GCTLP_type = GCTLP,
+        sym_enc: Optional[SymEnc] = None,
+        random: Optional[RandGen] = None,
+        seed: Optional[int] = None,
+        smart_contract: Optional[AsyncSCInterface] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+        **kwargs: Unpack[GCTLPKwargs],
+    ):
+        if random is None:
+            random = Random(seed=seed)
+        self.random = random
+        if sym_enc is None:
+            sym_enc = FernetWrapper()
+        self.sym_enc = sym_enc
+        self.gctlp = gctlp(seed=seed, random=self.random, sym_enc=self.sym_enc, **kwargs)
+        if smart_contract is None:
+            smart_contract = AsyncMockSC()
+        self.smart_contract = smart_contract
+        self.executor = executor
+
+    def client_setup(self) -> GCTLP_Client_Key:
+        return self.sym_enc.generate_key()
+
+    def client_delegation(self, messages: TLP_Messages, csk: GCTLP_Client_Key) -> tuple[GCTLP_Encrypted_Messages, int]:
+        start_time = 0  # todo: allow for delays
+        return [self.sym_enc.encrypt(csk, message) for message in messages], start_time
+
+    async def server_delegation(
+        self,
+        intervals: GCTLP_Intervals,
+        server_info: Optional[Server_Info],
+        coins: SC_Coins,
+        start_time: int,
+        helper_id: int | ChecksumAddress,
+        squarings_upper_bound: Optional[int] = None,
+        keysize: int = 2048,
+        cdeg: Callable[[int, int, Server_Info], float] = custom_extra_delay,
+    ) -> tuple[SC_ExtraTime, AsyncSCInterface]:
+        """
+        If server_info is None, it is taken from this host's calibration profile, see EDTLP.server_delegation;
+        calibrating runs on the executor
+        """
+        if squarings_upper_bound is None:
+            squarings_upper_bound = SQUARINGS_PER_SEC_UPPER_BOUND[keysize]
+        if server_info is None:
+            server_info = await self._run(host_server_info, keysize)
+
+        extra_time, upper_bounds = delegation_schedule(intervals, start_time, server_info, squarings_upper_bound, cdeg)
+        sc = await self.smart_contract.initiate(
+            coins=coins, start_time=start_time, extra_time=extra_time, upper_bounds=upper_bounds, helper_id=helper_id
+        )
+
+        return extra_time, sc
+
+    async def helper_setup(
+        self, intervals: GCTLP_Intervals, squaring_per_second: Optional[int] = None, keysize: int = 2048
+    ):
+        return await self._run(lambda: self.gctlp.setup(intervals, squaring_per_second, keysize=keysize))
+
+    async def helper_generate(
+        self,
+        messages: GCTLP_Encrypted_Messages,
+        pk: GCTLP_Public_Input,
+        sk: GCTLP_Secret_Input,
+        start_time: int,
+        sc: AsyncSCInterface,
+    ) -> list[TLP_Puzzle]:
+        puzz_list, hash_list = await self._run(self.gctlp.generate, messages, pk, sk)
+        await sc.set_commitments(hash_list)
+        return puzz_list
+
+    async def solve(
+        self,
+        sc: AsyncSCInterface,
+        server_info: Optional[Server_Info],
+        pk: GCTLP_Public_Input,
+        puzz: Iterable[TLP_Puzzle],
+        coins_acceptable: int,
+        checkpointer: Optional[Checkpointer] = None,
+        progress: Optional[ProgressTracker] = None,
+    ) -> AsyncGenerator[tuple[GCTLP_Encrypted_Message, TLP_Digest]]:
+        """
+        Yields the solutions of EDTLP.solve, squaring each instance on the executor while the loop keeps running.
+        The default ChunkedSquarer releases the GIL while it squares; a squarer that holds it stalls the loop
+        """
+        coins, upper_bounds, start_time = await asyncio.gather(sc.coins(), sc.upper_bounds(), sc.start_time())
+        if server_info is None:
+            aux, _, _, _ = pk
+            server_info = await self._run(host_server_info, aux.len_r * 8)
+        check_solvable(pk, server_info, coins, upper_bounds, start_time, coins_acceptable)
+
+        solutions = self.gctlp.solve(pk, puzz, checkpointer, progress)
+        try:
+            while (solution := await self._run(lambda: next(solutions, None))) is not None:
+                yield solution
+        finally:
+            # a cancelled step may still be running on the executor, and then the generator can't be closed
+            if inspect.getgeneratorstate(solutions) != inspect.GEN_RUNNING:
+                solutions.close()
+
+    async def register(self, sc: AsyncSCInterface, solution: GCTLP_Encrypted_Message, commitment: TLP_Digest) -> None:
+        await sc.add_solution(solution, commitment)
+
+    async def register_many(
+        self,
+        sc: AsyncSCInterface,
+        solutions: Iterable[tuple[GCTLP_Encrypted_Message, TLP_Digest]],
+        gas_budget: int = SC_GAS_BUDGET,
+    ) -> None:
+        """
+        Registers the solutions in batches that fit in `gas_budget`, see EDTLP.register_many
+        """
+        for batch in gas_batches(solutions, lambda s: solution_gas(*s), gas_budget):
+            solution_batch, witness_batch = zip(*batch)
+            await sc.add_solutions(list(solution_batch), list(witness_batch))
+
+    async def verify(
+        self,
+        sc: AsyncSCInterface,
+        i: int,
+        pk: Optional[GCTLP_Public_Input] = None,
+        proof: Optional[TLP_Proof] = None,
+        puzzle: Optional[TLP_Puzzle] = None,
+        r: Optional[int] = None,
+    ) -> Optional[int]:
+        """
+        See EDTLP.verify; the proof is checked on the executor
+        """
+        (solution, witness, time_solved), commitment, initial_timestamp, upper_bound = await asyncio.gather(
+            sc.get_solution_at(i), sc.get_commitment_at(i), sc.initial_timestamp(), sc.get_upper_bound_at(i)
+        )
+        assert time_solved - initial_timestamp < upper_bound
+        self.gctlp.verify(solution, witness, commitment)
+        if proof is None:
+            return None
+        assert pk is not None and puzzle is not None
+        return await self._run(check_proof, self.gctlp, pk, i, proof, puzzle, r, solution, witness)
+
+    async def pay(self, sc: AsyncSCInterface, i: int) -> None:
+        try:
+            await self.verify(sc, i)
+        except AssertionError:
+            await sc.pay_back(i)
+        else:
+            await sc.pay(i)
+
+    async def verify_all(self, sc: AsyncSCInterface, page_size: int = SC_PAGE_SIZE) -> list[int]:
+        """
+        See EDTLP.verify_all; the pages are read concurrently and their digests checked on the executor
+        """
+        initial_timestamp, amount = await asyncio.gather(sc.initial_timestamp(), sc.amount_of_puzzle_parts())
+
+        async def verify_page(start: int) -> list[int]:
+            solutions, commitments, upper_bounds = await asyncio.gather(
+                sc.get_solutions_range(start, page_size),
+                sc.get_commitments_range(start, page_size),
+                sc.get_upper_bounds_range(start, page_size),
+            )
+            late = late_parts(solutions, upper_bounds, initial_timestamp)
+            wrong = await self._run(self.gctlp.verify_many, [(m, d) for m, d, _ in solutions], commitments)
+            return [start + i for i in sorted(late.union(wrong))]
+
+        pages = await asyncio.gather(*(verify_page(start) for start in range(0, amount, page_size)))
+        return [i for page in pages for i in page]
+
+    async def pay_many(
+        self, sc: AsyncSCInterface, indices: Optional[Iterable[int]] = None, gas_budget: int = SC_GAS_BUDGET
+    ) -> None:
+        """
+        See EDTLP.pay_many
+        """
+        failed: set[int] = set()
+        if indices is None:
+            failed.update(await self.verify_all(sc))
+            indices = range(await sc.amount_of_puzzle_parts())
+        else:
+            indices = list(indices)
+            for i in indices:
+                try:
+                    await self.verify(sc, i)
+                except AssertionError:
+                    failed.add(i)
+
+        # payBack sends the contract's whole balance to the owner, so the payouts must go first
+        verified = [i for i in indices if i not in failed]
+        for batch in gas_batches(verified, lambda _: SC_PAY_GAS, gas_budget):
+            await sc.pay_many(batch)
+        for i in indices:
+            if i in failed:
+                await sc.pay_back(i)
+
+    async def retrieve(self, sc: AsyncSCInterface, csk: GCTLP_Client_Key, i: int) -> TLP_Message:
+        encrypted_message = await sc.get_message_at(i)
+        return self.sym_enc.decrypt(csk, encrypted_message)
+
+    async def retrieve_all(
+        self, sc: AsyncSCInterface, csk: GCTLP_Client_Key, page_size: int = SC_PAGE_SIZE
+    ) -> AsyncGenerator[TLP_Message]:
+        """
+        Retrieves the messages of all instances in order, reading the contract in pages of `page_size` parts
+        """
+        for start in range(0, await sc.amount_of_puzzle_parts(), page_size):
+            for encrypted_message, _, _ in await sc.get_solutions_range(start, page_size):
+                yield self.sym_enc.decrypt(csk, encrypted_message)
+
+    async def _run[T, *Ts](self, fn: Callable[[*Ts], T], *args: *Ts) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
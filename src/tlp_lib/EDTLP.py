@@ -1,4 +1,4 @@
-from collections.abc import Callable, Generator
+from collections.abc import Callable, Generator, Iterable, Iterator
 from itertools import accumulate
 from operator import add
 from typing import Optional, Unpack
@@ -6,7 +6,17 @@ from typing import Optional, Unpack
 from eth_typing import ChecksumAddress
 
 from tlp_lib import GCTLP
-from tlp_lib.consts import SQUARINGS_PER_SEC_UPPER_BOUND
+from tlp_lib.calibration import host_server_info
+from tlp_lib.consts import (
+    SC_CALLDATA_WORD_GAS,
+    SC_GAS_BUDGET,
+    SC_PAGE_SIZE,
+    SC_PAY_GAS,
+    SC_SOLUTION_GAS,
+    SC_STORAGE_WORD_GAS,
+    SC_TX_GAS,
+    SQUARINGS_PER_SEC_UPPER_BOUND,
+)
 from tlp_lib.protocols import (
     GCTLP_Client_Key,
     GCTLP_Encrypted_Message,
@@ -15,17 +25,19 @@ from tlp_lib.protocols import (
     GCTLP_Public_Input,
     GCTLP_Secret_Input,
     GCTLP_type,
+    GCTLPInterface,
     GCTLPKwargs,
     Server_Info,
     TLP_Digest,
     TLP_Message,
     TLP_Messages,
-    TLP_Puzzles,
+    TLP_Proof,
+    TLP_Puzzle,
 )
 from tlp_lib.smartcontracts import MockSC
-from tlp_lib.smartcontracts.protocols import SC_Coins, SC_ExtraTime, SCInterface
+from tlp_lib.smartcontracts.protocols import SC_Coins, SC_ExtraTime, SC_Solutions, SC_UpperBounds, SCInterface
 from tlp_lib.wrappers import FernetWrapper, Random
-from tlp_lib.wrappers.protocols import RandGen, SymEnc
+from tlp_lib.wrappers.protocols import Checkpointer, ProgressTracker, RandGen, SymEnc
 
 
 class CoinException(ValueError):
@@ -43,6 +55,116 @@ def custom_extra_delay(squarings_upper_bound: int, seconds: int, aux: Server_Inf
     return seconds * (squarings_upper_bound / squarings - 1)
 
 
+def solution_gas(solution: GCTLP_Encrypted_Message, witness: TLP_Digest) -> int:
+    """
+    Estimated gas one solution adds to an addSolutions transaction
+    """
+    # bytes shorter than 32 share their slot with the length, longer ones take a length slot and their words
+    slots = sum(1 if len(b) < 32 else 1 + _words(b) for b in (solution, witness))
+    # each bytes element is passed as offset, length and words; the solution also stores timestamp and solver
+    return (
+        SC_SOLUTION_GAS
+        + SC_STORAGE_WORD_GAS * (slots + 2)
+        + SC_CALLDATA_WORD_GAS * (4 + _words(solution) + _words(witness))
+    )
+
+
+def _words(b: bytes) -> int:
+    return (len(b) + 31) // 32
+
+
+def gas_batches[T](items: Iterable[T], gas: Callable[[T], int], gas_budget: int) -> Iterator[list[T]]:
+    batch: list[T] = []
+    batch_gas = SC_TX_GAS
+    for item in items:
+        item_gas = gas(item)
+        if batch and batch_gas + item_gas > gas_budget:
+            yield batch
+            batch, batch_gas = [], SC_TX_GAS
+        batch.append(item)
+        batch_gas += item_gas
+    if batch:
+        yield batch
+
+
+def delegation_schedule(
+    intervals: GCTLP_Intervals,
+    start_time: int,
+    server_info: Server_Info,
+    squarings_upper_bound: int,
+    cdeg: Callable[[int, int, Server_Info], float] = custom_extra_delay,
+) -> tuple[SC_ExtraTime, SC_UpperBounds]:
+    """
+    The extra time of each interval and the resulting upper bounds, as deadlines counted from `start_time`
+    """
+    extra_time = [cdeg(squarings_upper_bound, interval, server_info) for interval in intervals]
+    upper_bounds = list(accumulate([start_time] + list(map(add, intervals, extra_time))))[1:]
+    return extra_time, upper_bounds
+
+
+def check_proof(
+    gctlp: GCTLPInterface,
+    pk: GCTLP_Public_Input,
+    i: int,
+    proof: TLP_Proof,
+    puzzle: TLP_Puzzle,
+    r: Optional[int],
+    solution: GCTLP_Encrypted_Message,
+    witness: TLP_Digest,
+) -> int:
+    """
+    Asserts the proof of instance i starts from its r and opens the registered solution. Returns the next r
+    """
+    assert gctlp.verify_proof(pk, i, proof, r)
+    m, d, next_r = gctlp.open_with_proof(pk, i, puzzle, proof)
+    assert (m, d) == (solution, witness)
+    return next_r
+
+
+def check_solvable(
+    pk: GCTLP_Public_Input,
+    server_info: Optional[Server_Info],
+    coins: SC_Coins,
+    upper_bounds: SC_UpperBounds,
+    start_time: int,
+    coins_acceptable: int,
+) -> None:
+    """
+    Raises CoinException if an instance pays less than `coins_acceptable`, and UpperBoundException if the server
+    can't solve an instance before its upper bound. If server_info is None, it is taken from this host's profile,
+    calibrating one first if there is no recent one
+    """
+    for coin in coins:
+        if coin < coins_acceptable:
+            raise CoinException
+
+    aux, _, t, _ = pk
+    if server_info is None:
+        _, _, len_r = aux
+        server_info = host_server_info(keysize=len_r * 8)
+    squarings_per_sec = server_info.squarings
+
+    prev_bound = start_time
+    for i, upper_bound in enumerate(upper_bounds):
+        server_time = t[i] / squarings_per_sec
+        maximum_time = upper_bound - prev_bound
+
+        if server_time > maximum_time:
+            raise UpperBoundException
+        prev_bound = upper_bound
+
+
+def late_parts(solutions: SC_Solutions, upper_bounds: SC_UpperBounds, initial_timestamp: int) -> set[int]:
+    """
+    Indices of the solutions that were not registered before their upper bound
+    """
+    return {
+        i
+        for i, ((_, _, time_solved), upper_bound) in enumerate(zip(solutions, upper_bounds))
+        if not time_solved - initial_timestamp < upper_bound
+    }
+
+
 class EDTLP:
     def __init__(
         self,
@@ -74,7 +196,7 @@ class EDTLP:
     def server_delegation(
         self,
         intervals: GCTLP_Intervals,
-        server_info: Server_Info,
+        server_info: Optional[Server_Info],
         coins: SC_Coins,
         start_time: int,
         helper_id: int | ChecksumAddress,
@@ -82,18 +204,23 @@ class EDTLP:
         keysize: int = 2048,
         cdeg: Callable[[int, int, Server_Info], float] = custom_extra_delay,
     ) -> tuple[SC_ExtraTime, SCInterface]:
+        """
+        If server_info is None, it is taken from this host's calibration profile. Without a recent profile that
+        means calibrating for about 2 seconds and saving the result under ~/.cache first
+        """
         if squarings_upper_bound is None:
             squarings_upper_bound = SQUARINGS_PER_SEC_UPPER_BOUND[keysize]
+        if server_info is None:
+            server_info = host_server_info(keysize)
 
-        extra_time = [cdeg(squarings_upper_bound, interval, server_info) for interval in intervals]
-        upper_bounds = list(accumulate([start_time] + list(map(add, intervals, extra_time))))[1:]
+        extra_time, upper_bounds = delegation_schedule(intervals, start_time, server_info, squarings_upper_bound, cdeg)
         sc = self.smart_contract.initiate(
             coins=coins, start_time=start_time, extra_time=extra_time, upper_bounds=upper_bounds, helper_id=helper_id
         )
 
         return extra_time, sc
 
-    def helper_setup(self, intervals: GCTLP_Intervals, squaring_per_second: int, keysize: int = 2048):
+    def helper_setup(self, intervals: GCTLP_Intervals, squaring_per_second: Optional[int] = None, keysize: int = 2048):
         return self.gctlp.setup(intervals, squaring_per_second, keysize=keysize)
 
     def helper_generate(
@@ -112,41 +239,57 @@ class EDTLP:
     def solve(
         self,
         sc: SCInterface,
-        server_info: Server_Info,
+        server_info: Optional[Server_Info],
         pk: GCTLP_Public_Input,
-        puzz: TLP_Puzzles,
+        puzz: Iterable[TLP_Puzzle],
         coins_acceptable: int,
+        checkpointer: Optional[Checkpointer] = None,
+        progress: Optional[ProgressTracker] = None,
     ) -> Generator[tuple[GCTLP_Encrypted_Message, TLP_Digest], None, None]:
-        coins = sc.coins
-        for coin in coins:
-            if coin < coins_acceptable:
-                raise CoinException
-
-        _, _, t, _ = pk
-        upper_bounds = sc.upper_bounds
-        squarings_per_sec = server_info.squarings
-
-        prev_bound = sc.start_time
-        for i, upper_bound in enumerate(upper_bounds):
-            server_time = t[i] / squarings_per_sec
-            maximum_time = upper_bound - prev_bound
-
-            if server_time > maximum_time:
-                raise UpperBoundException
-            prev_bound = upper_bound
-
-        yield from self.gctlp.solve(pk, puzz)
+        check_solvable(pk, server_info, sc.coins, sc.upper_bounds, sc.start_time, coins_acceptable)
+        yield from self.gctlp.solve(pk, puzz, checkpointer, progress)
 
     def register(self, sc: SCInterface, solution: GCTLP_Encrypted_Message, commitment: TLP_Digest) -> None:
         sc.add_solution(solution, commitment)
 
-    def verify(self, sc: SCInterface, i: int) -> None:
+    def register_many(
+        self,
+        sc: SCInterface,
+        solutions: Iterable[tuple[GCTLP_Encrypted_Message, TLP_Digest]],
+        gas_budget: int = SC_GAS_BUDGET,
+    ) -> None:
+        """
+        Registers the solutions in as few transactions as fit in `gas_budget` each. A solution is only registered once
+        its batch is full, so streaming solve's output into it delays the earlier ones
+        """
+        for batch in gas_batches(solutions, lambda s: solution_gas(*s), gas_budget):
+            solution_batch, witness_batch = zip(*batch)
+            sc.add_solutions(list(solution_batch), list(witness_batch))
+
+    def verify(
+        self,
+        sc: SCInterface,
+        i: int,
+        pk: Optional[GCTLP_Public_Input] = None,
+        proof: Optional[TLP_Proof] = None,
+        puzzle: Optional[TLP_Puzzle] = None,
+        r: Optional[int] = None,
+    ) -> Optional[int]:
+        """
+        With the puzzles' public key, a proof from GCTLP.solve_with_proofs and the puzzle of instance i, also checks the
+        squarings of instance i were done correctly from its r, without redoing them, and that they open the registered
+        solution. For i > 0, r is the one returned when verifying instance i - 1, which this returns for instance i + 1
+        """
         solution, witness, time_solved = sc.get_solution_at(i)
         commitment = sc.get_commitment_at(i)
         time_to_solve = time_solved - sc.initial_timestamp
         upper_bound = sc.get_upper_bound_at(i)
         assert time_to_solve < upper_bound
         self.gctlp.verify(solution, witness, commitment)
+        if proof is None:
+            return None
+        assert pk is not None and puzzle is not None
+        return check_proof(self.gctlp, pk, i, proof, puzzle, r, solution, witness)
 
     def pay(self, sc: SCInterface, i: int) -> None:
         try:
@@ -156,6 +299,60 @@ class EDTLP:
         else:
             sc.pay(i)
 
+    def verify_all(self, sc: SCInterface, page_size: int = SC_PAGE_SIZE) -> list[int]:
+        """
+        Verifies every instance like verify, reading the contract in pages of `page_size` parts and checking the
+        digests locally in bulk. Returns the sorted indices of the instances that failed
+        """
+        initial_timestamp = sc.initial_timestamp
+        failed: list[int] = []
+        for start in range(0, sc.amount_of_puzzle_parts, page_size):
+            solutions = sc.get_solutions_range(start, page_size)
+            commitments = sc.get_commitments_range(start, page_size)
+            upper_bounds = sc.get_upper_bounds_range(start, page_size)
+            late = late_parts(solutions, upper_bounds, initial_timestamp)
+            wrong = self.gctlp.verify_many(((m, d) for m, d, _ in solutions), commitments)
+            failed.extend(start + i for i in sorted(late.union(wrong)))
+        return failed
+
+    def pay_many(
+        self, sc: SCInterface, indices: Optional[Iterable[int]] = None, gas_budget: int = SC_GAS_BUDGET
+    ) -> None:
+        """
+        Like pay for each index, all of them by default, with the payouts of verified solutions sent in batches
+        that fit in `gas_budget` before any failed one is paid back. Without indices, the instances are verified in
+        bulk with verify_all
+        """
+        failed: set[int] = set()
+        if indices is None:
+            failed.update(self.verify_all(sc))
+            indices = range(sc.amount_of_puzzle_parts)
+        else:
+            indices = list(indices)
+            for i in indices:
+                try:
+                    self.verify(sc, i)
+                except AssertionError:
+                    failed.add(i)
+
+        # payBack sends the contract's whole balance to the owner, so the payouts must go first
+        verified = [i for i in indices if i not in failed]
+        for batch in gas_batches(verified, lambda _: SC_PAY_GAS, gas_budget):
+            sc.pay_many(batch)
+        for i in indices:
+            if i in failed:
+                sc.pay_back(i)
+
     def retrieve(self, sc: SCInterface, csk: GCTLP_Client_Key, i: int) -> TLP_Message:
         encrypted_message = sc.get_message_at(i)
         return self.sym_enc.decrypt(csk, encrypted_message)
+
+    def retrieve_all(
+        self, sc: SCInterface, csk: GCTLP_Client_Key, page_size: int = SC_PAGE_SIZE
+    ) -> Generator[TLP_Message, None, None]:
+        """
+        Retrieves the messages of all instances in order, reading the contract in pages of `page_size` parts
+        """
+        for start in range(0, sc.amount_of_puzzle_parts, page_size):
+            for encrypted_message, _, _ in sc.get_solutions_range(start, page_size):
+                yield self.sym_enc.decrypt(csk, encrypted_message)
@@ -1,9 +1,13 @@
-from collections.abc import Generator, Sequence
+import itertools
+from collections.abc import Generator, Iterable, Sequence, Sized
 from typing import Optional, Unpack
 
 import gmpy2
 
 from tlp_lib import TLP
+from tlp_lib.calibration import host_squarings_per_second
+from tlp_lib.MITLP import VERIFY_BATCH_SIZE, VERIFY_CHUNK_SIZE, verify_digests
+from tlp_lib.proofs import verify_proof
 from tlp_lib.protocols import (
     GCTLP_Public,
     GCTLP_Public_Input,
@@ -14,12 +18,15 @@ from tlp_lib.protocols import (
     TLP_Digests,
     TLP_Message,
     TLP_Messages,
+    TLP_Proof,
+    TLP_Puzzle,
     TLP_Puzzles,
     TLP_type,
     TLPKwargs,
 )
-from tlp_lib.wrappers import Random, SHA512Wrapper
-from tlp_lib.wrappers.protocols import HashFunc, RandGen
+from tlp_lib.wrappers import BackgroundIterator, FixedBasePow, HashingReader, Random, SHA512Wrapper, new_hasher
+from tlp_lib.wrappers.BackgroundIterator import DEFAULT_DEPTH
+from tlp_lib.wrappers.protocols import Checkpointer, HashFunc, ProgressTracker, RandGen, Reader, Writer
 
 COMMITMENT_LENGTH = 128  # hard coded for hash commitments
 
@@ -41,22 +48,27 @@ class GCTLP:
         self.hash = hash_func
 
     def setup(
-        self, intervals: Sequence[int], squaring_per_second: int, keysize: int = 2048
+        self, intervals: Sequence[int], squaring_per_second: Optional[int] = None, keysize: int = 2048
     ) -> tuple[GCTLP_Public, GCTLP_Secret]:
+        """
+        Without `squaring_per_second`, the rate is taken from this host's calibration profile, which is calibrated
+        and saved first if missing or stale, see TLP.setup
+        """
+        if squaring_per_second is None:
+            squaring_per_second = host_squarings_per_second(keysize)
         tlp_pk, tlp_sk = self.tlp.setup(1, 1, keysize)
         n, _, r_0 = tlp_pk
         _, _, phi_n, _ = tlp_sk
 
         t = [gmpy2.mpz(interval * squaring_per_second) for interval in intervals]
-        # todo: can I make this more efficient? fixed base
-        a = [gmpy2.powmod(2, t_i, phi_n) for t_i in t]
+        a = FixedBasePow(2, phi_n).pow_many(t)
 
-        r = [r_0] + [self.random.gen_random_generator_mod_n(n) for _ in intervals]
+        r = [r_0] + self.random.gen_random_generators_mod_n(n, len(intervals))
         len_r = keysize // 8
         r_bin = [ri.to_bytes(length=len_r) for ri in r]
 
         len_bytes = COMMITMENT_LENGTH // 8
-        d = [self.random.gen_random_bytes(len_bytes) for _ in intervals]
+        d = self.random.gen_random_bytes_many(len_bytes, len(intervals))
 
         aux = MITLP_Auxiliary_Info(self.hash.name, len_bytes, len_r)
 
@@ -65,9 +77,7 @@ class GCTLP:
     def generate(
         self, m: TLP_Messages, pk: GCTLP_Public_Input, sk: GCTLP_Secret_Input
     ) -> tuple[TLP_Puzzles, TLP_Digests]:
-        # todo: generator function?
-        _, n, t, _ = pk
-        a, r, d = sk
+        _, r, d = sk
         z = len(m)
         if len(d) != z:
             raise ValueError("length of m and d must be equal")
@@ -76,33 +86,239 @@ class GCTLP:
 
         hash_list: TLP_Digests = []
         puzz_list: TLP_Puzzles = []
-        for i in range(z):
+        for puzzle, digest in self.generate_iter(m, pk, sk):
+            puzz_list.append(puzzle)
+            hash_list.append(digest)
+
+        return puzz_list, hash_list
+
+    def generate_iter(
+        self, m: Iterable[TLP_Message], pk: GCTLP_Public_Input, sk: GCTLP_Secret_Input
+    ) -> Generator[tuple[TLP_Puzzle, TLP_Digest], None, None]:
+        """
+        Streaming form of generate; m may yield at most one message per instance in sk
+        """
+        _, n, t, _ = pk
+        a, r, d = sk
+
+        for i, m_i in enumerate(m):
+            if i >= len(d) or i + 1 >= len(r):
+                raise ValueError("more messages than instances")
             pk_i = (n, t[i], gmpy2.mpz.from_bytes(r[i]))
 
-            message = m[i] + d[i]
-            hash_list.append(self.hash.digest(message))
+            hasher = new_hasher(self.hash)
+            hasher.update(m_i)
+            hasher.update(d[i])
 
-            message += r[i + 1]
-            puzzle = self.tlp.generate(pk_i, a[i], message)
-            puzz_list.append(puzzle)
+            # joined in one go, so the payload is copied once
+            message = b"".join((m_i, d[i], r[i + 1]))
+            yield self.tlp.generate(pk_i, a[i], message), hasher.digest()
 
-        return puzz_list, hash_list
+    def solve(
+        self,
+        pk: GCTLP_Public_Input,
+        puzz: Iterable[TLP_Puzzle],
+        checkpointer: Optional[Checkpointer] = None,
+        progress: Optional[ProgressTracker] = None,
+    ) -> Generator[tuple[TLP_Message, TLP_Digest], None, None]:
+        """
+        Puzzles can come from any iterable and are solved one at a time.
+        With a checkpointer, solving resumes from its last checkpoint, starting at the instance it was taken in.
+        A progress tracker is begun with the squarings of all remaining instances
+        """
+        aux, _, _, _ = pk
+        for _, s_i, _ in self._solve_plaintexts(pk, puzz, checkpointer, progress):
+            yield self._split(aux, s_i)
+
+    def solve_with_proofs(
+        self,
+        pk: GCTLP_Public_Input,
+        puzz: Iterable[TLP_Puzzle],
+        progress: Optional[ProgressTracker] = None,
+    ) -> Generator[tuple[TLP_Message, TLP_Digest, TLP_Proof], None, None]:
+        """
+        Like solve, but each instance also comes with a proof of its squarings, checked by verify_proof
+        """
+        aux, _, _, _ = pk
+        for _, s_i, proof in self._solve_plaintexts(pk, puzz, None, progress, prove=True):
+            assert proof is not None
+            yield *self._split(aux, s_i), proof
+
+    def verify_proof(self, pk: GCTLP_Public_Input, i: int, proof: TLP_Proof, r: Optional[int] = None) -> bool:
+        """
+        Checks the proof of instance i and that it starts from the instance's r. That is r_0 for the first instance;
+        later ones need `r`, the next r that open_with_proof unpacked from the instance before
+        """
+        _, n, t, r_0 = pk
+        if i == 0:
+            if r is not None and r != r_0:
+                return False
+            r = r_0
+        elif r is None:
+            raise ValueError("r is needed to verify the proofs of instances after the first")
+        return proof.r == r and verify_proof(n, t[i], proof)
+
+    def open_with_proof(
+        self, pk: GCTLP_Public_Input, i: int, puzzle: TLP_Puzzle, proof: TLP_Proof
+    ) -> tuple[TLP_Message, TLP_Digest, int]:
+        """
+        Decrypts instance i with the result of its proof, once verify_proof accepted it. Returns the message, its
+        commitment and the r of the next instance
+        """
+        aux, n, t, _ = pk
+        _, _, len_r = aux
+        s_i = self.tlp.decrypt_with_proof((n, t[i], proof.r), puzzle, proof)
+        return *self._split(aux, s_i), int.from_bytes(s_i[-len_r:])
+
+    def solve_pipelined(
+        self,
+        pk: GCTLP_Public_Input,
+        puzz: Iterable[TLP_Puzzle],
+        progress: Optional[ProgressTracker] = None,
+        h: Optional[Sequence[TLP_Digest]] = None,
+        depth: int = DEFAULT_DEPTH,
+    ) -> Generator[tuple[TLP_Message, TLP_Digest], None, None]:
+        """
+        Like solve, but the squarings run ahead on a background thread, see MITLP.solve_pipelined
+        """
+        aux, _, _, _ = pk
+        with BackgroundIterator(self._solve_plaintexts(pk, puzz, None, progress), depth) as plaintexts:
+            for i, s_i, _ in plaintexts:
+                m_i, d_i = self._split(aux, s_i)
+                if h is not None:
+                    self.verify(m_i, d_i, h[i])
+                yield m_i, d_i
+
+    def _solve_plaintexts(
+        self,
+        pk: GCTLP_Public_Input,
+        puzz: Iterable[TLP_Puzzle],
+        checkpointer: Optional[Checkpointer],
+        progress: Optional[ProgressTracker],
+        prove: bool = False,
+    ) -> Generator[tuple[int, bytes, Optional[TLP_Proof]], None, None]:
+        aux, n, t, r_i = pk
+        _, _, len_r = aux
+
+        start = done = 0  # done: squarings of instance `start` already in the checkpoint
+        if checkpointer is not None and (state := checkpointer.load()) is not None:
+            start, done = state.index, state.squarings
+
+        if progress is not None:
+            progress.begin(sum(t[start : len(puzz)] if isinstance(puzz, Sized) else t[start:]) - done)
+        try:
+            for i, puzzle in enumerate(itertools.islice(puzz, start, None), start):
+                proof: Optional[TLP_Proof] = None
+                if prove:
+                    s_i, proof = self.tlp.solve_with_proof((n, t[i], r_i), puzzle, i, progress)
+                else:
+                    s_i = self.tlp.solve((n, t[i], r_i), puzzle, checkpointer, i, progress)
+                r_i = gmpy2.mpz.from_bytes(memoryview(s_i)[-len_r:])
+
+                yield i, s_i, proof
+
+                if checkpointer is not None:
+                    checkpointer.update(i + 1, r_i, 0)
+        finally:
+            if progress is not None:
+                progress.finish()
+
+        if checkpointer is not None:
+            checkpointer.clear()
+
+    @staticmethod
+    def _split(aux: MITLP_Auxiliary_Info, s_i: bytes) -> tuple[TLP_Message, bytes]:
+        _, len_d, len_r = aux
+        view = memoryview(s_i)
+        end = len(view) - len_r
+        return bytes(view[: end - len_d]), bytes(view[end - len_d : end])
+
+    def generate_stream(
+        self, files: Iterable[tuple[Reader, Writer]], pk: GCTLP_Public_Input, sk: GCTLP_Secret_Input
+    ) -> Generator[tuple[int, TLP_Digest], None, None]:
+        """
+        Large-payload form of generate_iter, see MITLP.generate_stream
+        """
+        _, n, t, _ = pk
+        a, r, d = sk
+
+        for i, (src, dst) in enumerate(files):
+            if i >= len(d) or i + 1 >= len(r):
+                raise ValueError("more files than instances")
+            pk_i = (n, t[i], gmpy2.mpz.from_bytes(r[i]))
 
-    def solve(self, pk: GCTLP_Public_Input, puzz: TLP_Puzzles) -> Generator[tuple[TLP_Message, TLP_Digest], None, None]:
+            hasher = new_hasher(self.hash)
+            encrypted_key = self.tlp.generate_stream(pk_i, a[i], HashingReader(src, hasher), dst, d[i] + r[i + 1])
+            hasher.update(d[i])
+            yield encrypted_key, hasher.digest()
+
+    def solve_stream(
+        self,
+        pk: GCTLP_Public_Input,
+        encrypted_keys: Iterable[int],
+        files: Iterable[tuple[Reader, Writer]],
+        checkpointer: Optional[Checkpointer] = None,
+        progress: Optional[ProgressTracker] = None,
+    ) -> Generator[bytes, None, None]:
+        """
+        Large-payload form of solve, see MITLP.solve_stream
+        """
         aux, n, t, r_i = pk
         _, len_d, len_r = aux
-        z = len(puzz)
 
-        for i in range(z):
-            s_i = self.tlp.solve((n, t[i], r_i), puzz[i])
+        start = done = 0  # done: squarings of instance `start` already in the checkpoint
+        if checkpointer is not None and (state := checkpointer.load()) is not None:
+            start, done = state.index, state.squarings
 
-            r_i = gmpy2.mpz.from_bytes(s_i[-len_r:])
-            message = s_i[:-len_r]
+        if progress is not None:
+            progress.begin(
+                sum(t[start : len(encrypted_keys)] if isinstance(encrypted_keys, Sized) else t[start:]) - done
+            )
+        try:
+            for i, (encrypted_key, (src, dst)) in enumerate(
+                itertools.islice(zip(encrypted_keys, files), start, None), start
+            ):
+                tail = self.tlp.solve_stream(
+                    (n, t[i], r_i), encrypted_key, src, dst, len_d + len_r, checkpointer, i, progress
+                )
+                r_i = gmpy2.mpz.from_bytes(tail[len_d:])
 
-            m_i = message[:-len_d]
-            d_i = message[-len_d:]
+                yield tail[:len_d]
 
-            yield m_i, d_i
+                if checkpointer is not None:
+                    checkpointer.update(i + 1, r_i, 0)
+        finally:
+            if progress is not None:
+                progress.finish()
+
+        if checkpointer is not None:
+            checkpointer.clear()
 
     def verify(self, m: TLP_Message, d: bytes, h: TLP_Digest) -> None:
-        assert h == self.hash.digest(m + d)
+        hasher = new_hasher(self.hash)
+        hasher.update(m)
+        hasher.update(d)
+        assert h == hasher.digest()
+
+    def verify_stream(self, m: Reader, d: bytes, h: TLP_Digest) -> None:
+        """
+        Verifies a message written by solve_stream, reading it back from `m` in chunks
+        """
+        hasher = new_hasher(self.hash)
+        while chunk := m.read(VERIFY_CHUNK_SIZE):
+            hasher.update(chunk)
+        hasher.update(d)
+        assert h == hasher.digest()
+
+    def verify_many(
+        self,
+        solutions: Iterable[tuple[TLP_Message, bytes]],
+        h: Sequence[TLP_Digest],
+        *,
+        workers: Optional[int] = None,
+        batch_size: int = VERIFY_BATCH_SIZE,
+    ) -> list[int]:
+        """
+        Verifies the output of solve against the digests in batches across a thread pool, see MITLP.verify_many
+        """
+        return verify_digests(self.hash, solutions, h, workers, batch_size)
@@ -1,9 +1,14 @@
-from collections.abc import Generator
+import itertools
+import os
+from collections import deque
+from collections.abc import Generator, Iterable, Sequence, Sized
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, Unpack
 
 import gmpy2
 
 from tlp_lib import TLP
+from tlp_lib.proofs import verify_proof
 from tlp_lib.protocols import (
     MITLP_Auxiliary_Info,
     MITLP_Public,
@@ -14,14 +19,78 @@ from tlp_lib.protocols import (
     TLP_Digests,
     TLP_Message,
     TLP_Messages,
+    TLP_Proof,
+    TLP_Puzzle,
     TLP_Puzzles,
     TLP_type,
     TLPKwargs,
 )
-from tlp_lib.wrappers import Random, SHA512Wrapper
-from tlp_lib.wrappers.protocols import HashFunc, RandGen
+from tlp_lib.wrappers import BackgroundIterator, HashingReader, Random, SHA512Wrapper, new_hasher
+from tlp_lib.wrappers.BackgroundIterator import DEFAULT_DEPTH
+from tlp_lib.wrappers.protocols import Checkpointer, HashFunc, ProgressTracker, RandGen, Reader, Writer
 
 COMMITMENT_LENGTH = 128  # hard coded for hash commitments
+VERIFY_BATCH_SIZE = 256
+VERIFY_CHUNK_SIZE = 1 << 20
+
+
+def _enumerate_with_last[T](items: Iterable[T], start: int = 0) -> Generator[tuple[int, T, bool], None, None]:
+    iterator = itertools.islice(items, start, None)
+    try:
+        prev = next(iterator)
+    except StopIteration:
+        return
+
+    i = start
+    for item in iterator:
+        yield i, prev, False
+        prev = item
+        i += 1
+    yield i, prev, True
+
+
+def _verify_batch(
+    hash_func: HashFunc, start: int, batch: Sequence[tuple[TLP_Message, bytes]], h: Sequence[TLP_Digest]
+) -> list[int]:
+    failed: list[int] = []
+    for i, (m_i, d_i) in enumerate(batch, start):
+        hasher = new_hasher(hash_func)
+        hasher.update(m_i)
+        hasher.update(d_i)
+        if hasher.digest() != h[i]:
+            failed.append(i)
+    return failed
+
+
+def verify_digests(
+    hash_func: HashFunc,
+    solutions: Iterable[tuple[TLP_Message, bytes]],
+    h: Sequence[TLP_Digest],
+    workers: Optional[int],
+    batch_size: int,
+) -> list[int]:
+    if batch_size < 1:
+        raise ValueError("batch_size must be greater than 0")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    failed: list[int] = []
+    pending: deque[Future[list[int]]] = deque()
+    verified = 0
+    with ThreadPoolExecutor(workers) as executor:
+        for batch in itertools.batched(solutions, batch_size):
+            if verified + len(batch) > len(h):
+                raise ValueError("more solutions than digests")
+            pending.append(executor.submit(_verify_batch, hash_func, verified, batch, h))
+            verified += len(batch)
+            # bound the number of solutions held in memory; batches finish in order, so the failures stay sorted
+            while len(pending) > 2 * workers:
+                failed.extend(pending.popleft().result())
+        while pending:
+            failed.extend(pending.popleft().result())
+
+    failed.extend(range(verified, len(h)))
+    return failed
 
 
 class MITLP:
@@ -41,8 +110,12 @@ class MITLP:
         self.hash = hash_func
 
     def setup(
-        self, z: int, interval: int, squaring_per_second: int, keysize: int = 2048
+        self, z: int, interval: int, squaring_per_second: Optional[int] = None, keysize: int = 2048
     ) -> tuple[MITLP_Public, MITLP_Secret]:
+        """
+        Without `squaring_per_second`, the rate is taken from this host's calibration profile, which is calibrated
+        and saved first if missing or stale, see TLP.setup
+        """
         if z < 1:
             raise ValueError("z must be greater than 0")
 
@@ -50,11 +123,11 @@ class MITLP:
         n, t, r_0 = tlp_pk
         _, _, _, a = tlp_sk
 
-        r = [r_0] + [self.random.gen_random_generator_mod_n(n) for _ in range(z - 1)]
+        r = [r_0] + self.random.gen_random_generators_mod_n(n, z - 1)
         len_r = keysize // 8
         r_bin = [ri.to_bytes(length=len_r) for ri in r]
         len_commitment = COMMITMENT_LENGTH // 8
-        d = [self.random.gen_random_bytes(len_commitment) for _ in range(z)]
+        d = self.random.gen_random_bytes_many(len_commitment, z)
 
         aux = MITLP_Auxiliary_Info(self.hash.name, len_commitment, len_r)
 
@@ -63,47 +136,265 @@ class MITLP:
     def generate(
         self, m: TLP_Messages, pk: MITLP_Public_Input, sk: MITLP_Secret_Input
     ) -> tuple[TLP_Puzzles, TLP_Digests]:
-        # todo: generator function?
-        _, n, t, _ = pk
-        a, r, d = sk
+        _, r, d = sk
         z = len(m)
         if len(r) != z or len(d) != z:
             raise ValueError("length of m, r, and d must be equal")
 
         hash_list: TLP_Digests = []
         puzz_list: TLP_Puzzles = []
-        for i in range(z):
+        for puzzle, digest in self.generate_iter(m, pk, sk):
+            puzz_list.append(puzzle)
+            hash_list.append(digest)
+
+        return puzz_list, hash_list
+
+    def generate_iter(
+        self, m: Iterable[TLP_Message], pk: MITLP_Public_Input, sk: MITLP_Secret_Input
+    ) -> Generator[tuple[TLP_Puzzle, TLP_Digest], None, None]:
+        """
+        Streaming form of generate; m must yield exactly one message per instance in sk
+        """
+        _, n, t, _ = pk
+        a, r, d = sk
+        z = len(d)
+
+        i = -1
+        for i, m_i in enumerate(m):
+            if i >= z:
+                raise ValueError("length of m, r, and d must be equal")
             pk_i = n, t, gmpy2.mpz.from_bytes(r[i])
 
-            message = m[i] + d[i]
-            hash_list.append(self.hash.digest(message))
+            hasher = new_hasher(self.hash)
+            hasher.update(m_i)
+            hasher.update(d[i])
 
-            if i != z - 1:
-                message += r[i + 1]
-            puzzle = self.tlp.generate(pk_i, a, message)
-            puzz_list.append(puzzle)
+            # joined in one go, so the payload is copied once
+            message = b"".join((m_i, d[i], r[i + 1] if i != z - 1 else b""))
+            yield self.tlp.generate(pk_i, a, message), hasher.digest()
 
-        return puzz_list, hash_list
+        if i != z - 1:
+            raise ValueError("length of m, r, and d must be equal")
+
+    def solve(
+        self,
+        pk: MITLP_Public_Input,
+        puzz: Iterable[TLP_Puzzle],
+        checkpointer: Optional[Checkpointer] = None,
+        progress: Optional[ProgressTracker] = None,
+    ) -> Generator[tuple[TLP_Message, TLP_Digest], None, None]:
+        """
+        Puzzles can come from any iterable; only the current and next puzzle are held at a time.
+        With a checkpointer, solving resumes from its last checkpoint, starting at the instance it was taken in.
+        A progress tracker is begun with the squarings of all remaining instances, if the number of puzzles is known
+        """
+        aux, _, _, _ = pk
+        for _, s_i, last, _ in self._solve_plaintexts(pk, puzz, checkpointer, progress):
+            yield self._split(aux, s_i, last)
+
+    def solve_with_proofs(
+        self,
+        pk: MITLP_Public_Input,
+        puzz: Iterable[TLP_Puzzle],
+        progress: Optional[ProgressTracker] = None,
+    ) -> Generator[tuple[TLP_Message, TLP_Digest, TLP_Proof], None, None]:
+        """
+        Like solve, but each instance also comes with a proof of its squarings, checked by verify_proof
+        """
+        aux, _, _, _ = pk
+        for _, s_i, last, proof in self._solve_plaintexts(pk, puzz, None, progress, prove=True):
+            assert proof is not None
+            yield *self._split(aux, s_i, last), proof
+
+    def verify_proof(self, pk: MITLP_Public_Input, i: int, proof: TLP_Proof, r: Optional[int] = None) -> bool:
+        """
+        Checks the proof of instance i and that it starts from the instance's r. That is r_0 for the first instance;
+        later ones need `r`, the next r that open_with_proof unpacked from the instance before
+        """
+        _, n, t, r_0 = pk
+        if i == 0:
+            if r is not None and r != r_0:
+                return False
+            r = r_0
+        elif r is None:
+            raise ValueError("r is needed to verify the proofs of instances after the first")
+        return proof.r == r and verify_proof(n, t, proof)
+
+    def open_with_proof(
+        self, pk: MITLP_Public_Input, puzzle: TLP_Puzzle, proof: TLP_Proof, last: bool
+    ) -> tuple[TLP_Message, TLP_Digest, Optional[int]]:
+        """
+        Decrypts an instance with the result of its proof, once verify_proof accepted it. Returns the message, its
+        commitment and the r of the next instance, None for the `last` one
+        """
+        aux, n, t, _ = pk
+        _, _, len_r = aux
+        s_i = self.tlp.decrypt_with_proof((n, t, proof.r), puzzle, proof)
+        return *self._split(aux, s_i, last), None if last else int.from_bytes(s_i[-len_r:])
 
-    def solve(self, pk: MITLP_Public_Input, puzz: TLP_Puzzles) -> Generator[tuple[TLP_Message, TLP_Digest], None, None]:
+    def solve_pipelined(
+        self,
+        pk: MITLP_Public_Input,
+        puzz: Iterable[TLP_Puzzle],
+        progress: Optional[ProgressTracker] = None,
+        h: Optional[Sequence[TLP_Digest]] = None,
+        depth: int = DEFAULT_DEPTH,
+    ) -> Generator[tuple[TLP_Message, TLP_Digest], None, None]:
+        """
+        Like solve, but the squarings run on a background thread which only decrypts each instance and unpacks
+        the next r before moving on. Splitting off the commitment, verifying against `h` if given, and the caller's
+        handling of each result overlap with the squarings of later instances; at most `depth` solved instances
+        wait to be taken. Results are yielded in order. Checkpoints aren't supported, as the squarings run ahead
+        of the results taken
+        """
+        aux, _, _, _ = pk
+        with BackgroundIterator(self._solve_plaintexts(pk, puzz, None, progress), depth) as plaintexts:
+            for i, s_i, last, _ in plaintexts:
+                m_i, d_i = self._split(aux, s_i, last)
+                if h is not None:
+                    self.verify(m_i, d_i, h[i])
+                yield m_i, d_i
+
+    def _solve_plaintexts(
+        self,
+        pk: MITLP_Public_Input,
+        puzz: Iterable[TLP_Puzzle],
+        checkpointer: Optional[Checkpointer],
+        progress: Optional[ProgressTracker],
+        prove: bool = False,
+    ) -> Generator[tuple[int, bytes, bool, Optional[TLP_Proof]], None, None]:
+        aux, n, t, r_i = pk
+        _, _, len_r = aux
+
+        start = done = 0  # done: squarings of instance `start` already in the checkpoint
+        if checkpointer is not None and (state := checkpointer.load()) is not None:
+            start, done = state.index, state.squarings
+
+        if progress is not None:
+            progress.begin(t * (len(puzz) - start) - done if isinstance(puzz, Sized) else 0)
+        try:
+            for i, puzzle, last in _enumerate_with_last(puzz, start):
+                proof: Optional[TLP_Proof] = None
+                if prove:
+                    s_i, proof = self.tlp.solve_with_proof((n, t, r_i), puzzle, i, progress)
+                else:
+                    s_i = self.tlp.solve((n, t, r_i), puzzle, checkpointer, i, progress)
+                if not last:
+                    r_i = gmpy2.mpz.from_bytes(memoryview(s_i)[-len_r:])
+
+                yield i, s_i, last, proof
+
+                if checkpointer is not None:
+                    checkpointer.update(i + 1, r_i, 0)
+        finally:
+            if progress is not None:
+                progress.finish()
+
+        if checkpointer is not None:
+            checkpointer.clear()
+
+    @staticmethod
+    def _split(aux: MITLP_Auxiliary_Info, s_i: bytes, last: bool) -> tuple[TLP_Message, bytes]:
+        _, len_d, len_r = aux
+        view = memoryview(s_i)
+        end = len(view) if last else len(view) - len_r
+        return bytes(view[: end - len_d]), bytes(view[end - len_d : end])
+
+    def generate_stream(
+        self, files: Iterable[tuple[Reader, Writer]], pk: MITLP_Public_Input, sk: MITLP_Secret_Input
+    ) -> Generator[tuple[int, TLP_Digest], None, None]:
+        """
+        Large-payload form of generate_iter: each message is read from the first file of its pair and its puzzle's
+        ciphertext is written to the second, in chunks. The commitment is hashed while the message is read.
+        Yields the encrypted key and digest of each instance
+        """
+        _, n, t, _ = pk
+        a, r, d = sk
+        z = len(d)
+
+        i = -1
+        for i, (src, dst) in enumerate(files):
+            if i >= z:
+                raise ValueError("number of files, r, and d must be equal")
+            pk_i = n, t, gmpy2.mpz.from_bytes(r[i])
+
+            hasher = new_hasher(self.hash)
+            trailer = d[i] + r[i + 1] if i != z - 1 else d[i]
+            encrypted_key = self.tlp.generate_stream(pk_i, a, HashingReader(src, hasher), dst, trailer)
+            hasher.update(d[i])
+            yield encrypted_key, hasher.digest()
+
+        if i != z - 1:
+            raise ValueError("number of files, r, and d must be equal")
+
+    def solve_stream(
+        self,
+        pk: MITLP_Public_Input,
+        encrypted_keys: Iterable[int],
+        files: Iterable[tuple[Reader, Writer]],
+        checkpointer: Optional[Checkpointer] = None,
+        progress: Optional[ProgressTracker] = None,
+    ) -> Generator[bytes, None, None]:
+        """
+        Large-payload form of solve: each ciphertext is read from the first file of its pair and the message is
+        written to the second, in chunks. Yields the commitment d of each instance
+        """
         aux, n, t, r_i = pk
         _, len_d, len_r = aux
-        z = len(puzz)
 
-        for i in range(z):
-            s_i = self.tlp.solve((n, t, r_i), puzz[i])
+        start = done = 0  # done: squarings of instance `start` already in the checkpoint
+        if checkpointer is not None and (state := checkpointer.load()) is not None:
+            start, done = state.index, state.squarings
 
-            if i < z - 1:
-                r_i = s_i[-len_r:]
-                r_i = gmpy2.mpz.from_bytes(r_i)
-                message = s_i[:-len_r]
-            else:
-                message = s_i
+        if progress is not None:
+            progress.begin(t * (len(encrypted_keys) - start) - done if isinstance(encrypted_keys, Sized) else 0)
+        try:
+            for i, (encrypted_key, (src, dst)), last in _enumerate_with_last(zip(encrypted_keys, files), start):
+                tail_length = len_d if last else len_d + len_r
+                tail = self.tlp.solve_stream(
+                    (n, t, r_i), encrypted_key, src, dst, tail_length, checkpointer, i, progress
+                )
 
-            m_i = message[:-len_d]
-            d_i = message[-len_d:]
+                if not last:
+                    r_i = gmpy2.mpz.from_bytes(tail[len_d:])
 
-            yield m_i, d_i
+                yield tail[:len_d]
+
+                if checkpointer is not None:
+                    checkpointer.update(i + 1, r_i, 0)
+        finally:
+            if progress is not None:
+                progress.finish()
+
+        if checkpointer is not None:
+            checkpointer.clear()
 
     def verify(self, m: TLP_Message, d: bytes, h: TLP_Digest) -> None:
-        assert h == self.hash.digest(m + d)
+        hasher = new_hasher(self.hash)
+        hasher.update(m)
+        hasher.update(d)
+        assert h == hasher.digest()
+
+    def verify_stream(self, m: Reader, d: bytes, h: TLP_Digest) -> None:
+        """
+        Verifies a message written by solve_stream, reading it back from `m` in chunks
+        """
+        hasher = new_hasher(self.hash)
+        while chunk := m.read(VERIFY_CHUNK_SIZE):
+            hasher.update(chunk)
+        hasher.update(d)
+        assert h == hasher.digest()
+
+    def verify_many(
+        self,
+        solutions: Iterable[tuple[TLP_Message, bytes]],
+        h: Sequence[TLP_Digest],
+        *,
+        workers: Optional[int] = None,
+        batch_size: int = VERIFY_BATCH_SIZE,
+    ) -> list[int]:
+        """
+        Verifies the output of solve against the digests in batches of `batch_size` across `workers` threads.
+        Returns the sorted indices that failed; digests without a solution count as failed
+        """
+        return verify_digests(self.hash, solutions, h, workers, batch_size)
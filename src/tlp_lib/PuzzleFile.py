@@ -0,0 +1,202 @@
+"""
+Binary container for MITLP/GCTLP puzzles. Layout, all integers big-endian:
+
+    header   magic "TLPZ", version, kind (0 = MITLP, 1 = GCTLP), hash name (u8 length + ascii),
+             len_commitment (u16), len_r (u16), len_n (u16), n, r_0, number of t values (u64), t values (u64 each)
+    records  encrypted key (len_n bytes), ciphertext length (u32), ciphertext
+    index    file offset of each record (u64 each)
+    trailer  offset of the index (u64), number of records (u64), magic "TLPZ"
+
+The index is written last so puzzles can be streamed into the file without knowing their number up front.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Generator, Iterable, Sequence
+from typing import BinaryIO, Optional, Self, overload
+
+from tlp_lib.protocols import (
+    GCTLP_Public,
+    GCTLP_Public_Input,
+    MITLP_Auxiliary_Info,
+    MITLP_Public,
+    MITLP_Public_Input,
+    TLP_Digest,
+    TLP_Puzzle,
+)
+
+_MAGIC = b"TLPZ"
+_VERSION = 1
+_MITLP = 0
+_GCTLP = 1
+
+_PREFIX = struct.Struct(">4sBB")  # magic, version, kind
+_SIZES = struct.Struct(">HHH")  # len_commitment, len_r, len_n
+_U8 = struct.Struct(">B")
+_U32 = struct.Struct(">I")
+_U64 = struct.Struct(">Q")
+_TRAILER = struct.Struct(">QQ4s")  # index offset, number of records, magic
+
+
+class PuzzleFileWriter:
+    def __init__(self, path: str | os.PathLike[str], pk: MITLP_Public_Input | GCTLP_Public_Input):
+        aux, n, t, r_0 = pk
+        self.path = path
+        self._len_n = (n.bit_length() + 7) // 8
+        self._offsets = array("Q")
+        self._file: BinaryIO = open(path, "wb")
+
+        t_values = t if isinstance(t, Sequence) else [t]
+        hash_name = aux.hash_name.encode("ascii")
+        self._file.write(
+            b"".join((
+                _PREFIX.pack(_MAGIC, _VERSION, _GCTLP if isinstance(t, Sequence) else _MITLP),
+                _U8.pack(len(hash_name)),
+                hash_name,
+                _SIZES.pack(aux.len_commitment, aux.len_r, self._len_n),
+                n.to_bytes(self._len_n),
+                r_0.to_bytes(self._len_n),
+                _U64.pack(len(t_values)),
+                b"".join(_U64.pack(t_i) for t_i in t_values),
+            ))
+        )
+        self._offset = self._file.tell()
+
+    def write(self, puzzle: TLP_Puzzle) -> None:
+        encrypted_key, encrypted_message = puzzle
+        self._offsets.append(self._offset)
+        self._file.write(encrypted_key.to_bytes(self._len_n))
+        self._file.write(_U32.pack(len(encrypted_message)))
+        self._file.write(encrypted_message)
+        self._offset += self._len_n + _U32.size + len(encrypted_message)
+
+    def extend(self, puzzles: Iterable[TLP_Puzzle]) -> None:
+        for puzzle in puzzles:
+            self.write(puzzle)
+
+    def write_stream(self, stream: Iterable[tuple[TLP_Puzzle, TLP_Digest]]) -> Generator[TLP_Digest, None, None]:
+        """
+        Writes the puzzles of a generate_iter stream as they are made, passing the digests through
+        """
+        for puzzle, digest in stream:
+            self.write(puzzle)
+            yield digest
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        if sys.byteorder == "little":
+            self._offsets.byteswap()
+        self._file.write(self._offsets.tobytes())
+        self._file.write(_TRAILER.pack(self._offset, len(self._offsets), _MAGIC))
+        self._file.close()
+
+    def abort(self) -> None:
+        """
+        Closes and deletes the file without writing the index, so no partial file is left that reads as complete
+        """
+        self._file.close()
+        os.remove(self.path)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: Optional[type[BaseException]], *_: object) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+class _U64Table(Sequence[int]):
+    def __init__(self, buffer: mmap.mmap, offset: int, length: int):
+        self._buffer = buffer
+        self._offset = offset
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, i: int) -> int: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> list[int]: ...
+
+    def __getitem__(self, i: int | slice) -> int | list[int]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._length))]
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("index out of range")
+        return _U64.unpack_from(self._buffer, self._offset + i * _U64.size)[0]
+
+
+class PuzzleFileReader(Sequence[TLP_Puzzle]):
+    """
+    Memory-maps a puzzle file; puzzles are only read when indexed, so it can be handed straight to
+    MITLP.solve or GCTLP.solve
+    """
+
+    def __init__(self, path: str | os.PathLike[str]):
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, kind = _PREFIX.unpack_from(self._buffer)
+        index_offset, count, trailer_magic = _TRAILER.unpack_from(self._buffer, len(self._buffer) - _TRAILER.size)
+        if magic != _MAGIC or trailer_magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a valid puzzle file")
+
+        offset = _PREFIX.size
+        (len_hash_name,) = _U8.unpack_from(self._buffer, offset)
+        offset += _U8.size
+        hash_name = self._buffer[offset : offset + len_hash_name].decode("ascii")
+        offset += len_hash_name
+        len_commitment, len_r, self._len_n = _SIZES.unpack_from(self._buffer, offset)
+        offset += _SIZES.size
+        n = int.from_bytes(self._buffer[offset : offset + self._len_n])
+        offset += self._len_n
+        r_0 = int.from_bytes(self._buffer[offset : offset + self._len_n])
+        offset += self._len_n
+        (len_t,) = _U64.unpack_from(self._buffer, offset)
+        t = _U64Table(self._buffer, offset + _U64.size, len_t)
+
+        aux = MITLP_Auxiliary_Info(hash_name, len_commitment, len_r)
+        self.pk: MITLP_Public | GCTLP_Public
+        if kind == _MITLP:
+            self.pk = MITLP_Public(aux, n, t[0], r_0)
+        else:
+            self.pk = GCTLP_Public(aux, n, t, r_0)
+        self._index = _U64Table(self._buffer, index_offset, count)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @overload
+    def __getitem__(self, i: int) -> TLP_Puzzle: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> list[TLP_Puzzle]: ...
+
+    def __getitem__(self, i: int | slice) -> TLP_Puzzle | list[TLP_Puzzle]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        offset = self._index[i]
+        key_end = offset + self._len_n
+        encrypted_key = int.from_bytes(self._buffer[offset:key_end])
+        (length,) = _U32.unpack_from(self._buffer, key_end)
+        start = key_end + _U32.size
+        return TLP_Puzzle(encrypted_key, self._buffer[start : start + length])
+
+    def close(self) -> None:
+        self._buffer.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
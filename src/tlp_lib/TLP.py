@@ -1,10 +1,91 @@
+import os
+import struct
+from collections.abc import Callable, Generator, Iterable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
 from typing import Optional
 
 import gmpy2
 
-from tlp_lib.protocols import TLP_Key, TLP_Message, TLP_Public, TLP_Public_Input, TLP_Puzzle, TLP_Secret
-from tlp_lib.wrappers import FernetWrapper, Random, SeededRSA, rsa_gen_key
-from tlp_lib.wrappers.protocols import RandGenModN, RSAKeyGen, SymEnc
+from tlp_lib.calibration import host_squarings_per_second
+from tlp_lib.proofs import prove, verify_proof
+from tlp_lib.protocols import TLP_Key, TLP_Message, TLP_Proof, TLP_Public, TLP_Public_Input, TLP_Puzzle, TLP_Secret
+from tlp_lib.wrappers import (
+    AESGCMWrapper,
+    ChunkedSquarer,
+    FernetWrapper,
+    FixedBasePow,
+    Random,
+    SeededRSA,
+    SolveCancelled,
+    rsa_gen_key,
+)
+from tlp_lib.wrappers.protocols import (
+    Checkpointer,
+    ProgressTracker,
+    RandGenModN,
+    Reader,
+    RSAKeyGen,
+    Squarer,
+    StreamEnc,
+    SymEnc,
+    Writer,
+)
+
+_PACKED_HEADER = struct.Struct(">HH")  # length of n, length of t
+_FACTORS_CACHE_SIZE = 1024
+
+
+def crt_powmod(r: int, a: int, p: int, q: int, q_inv: Optional[int] = None) -> int:
+    """
+    Computes r^a mod p*q by exponentiating modulo each factor with the exponent reduced by Fermat's little theorem
+    and recombining with Garner's formula; r must be coprime to p*q
+    """
+    if q_inv is None:
+        q_inv = gmpy2.invert(gmpy2.mpz(q), gmpy2.mpz(p))
+    x_p = gmpy2.powmod(r, a % (p - 1), p)
+    x_q = gmpy2.powmod(r, a % (q - 1), q)
+    return x_q + q * (q_inv * (x_p - x_q) % p)
+
+
+def pack_puzzle(pk: TLP_Public_Input, puzzle: TLP_Puzzle) -> bytes:
+    """
+    Packs a public key and puzzle as n, t, r, encrypted key and encrypted message, with r and the encrypted key
+    using the width of n
+    """
+    n, t, r = pk
+    encrypted_key, encrypted_message = puzzle
+    len_n = (n.bit_length() + 7) // 8
+    len_t = (t.bit_length() + 7) // 8
+    return b"".join((
+        _PACKED_HEADER.pack(len_n, len_t),
+        n.to_bytes(len_n),
+        t.to_bytes(len_t),
+        r.to_bytes(len_n),
+        encrypted_key.to_bytes(len_n),
+        encrypted_message,
+    ))
+
+
+def unpack_puzzle(data: bytes) -> tuple[TLP_Public, TLP_Puzzle]:
+    len_n, len_t = _PACKED_HEADER.unpack_from(data)
+    offsets = [_PACKED_HEADER.size]
+    for length in (len_n, len_t, len_n, len_n):
+        offsets.append(offsets[-1] + length)
+    n, t, r, encrypted_key = (gmpy2.mpz.from_bytes(data[i:j]) for i, j in zip(offsets, offsets[1:]))
+    return TLP_Public(n, t, r), TLP_Puzzle(int(encrypted_key), data[offsets[-1] :])
+
+
+_worker_tlp: Optional["TLP"] = None
+
+
+def _init_worker(sym_enc: SymEnc, squarer: Squarer) -> None:
+    global _worker_tlp
+    _worker_tlp = TLP(sym_enc=sym_enc, squarer=squarer)
+
+
+def _solve_packed(data: bytes) -> TLP_Message:
+    assert _worker_tlp is not None
+    return _worker_tlp.solve(*unpack_puzzle(data))
 
 
 class TLP:
@@ -15,10 +96,15 @@ class TLP:
         gen_modulus: Optional[RSAKeyGen] = None,
         seed: Optional[int] = None,
         random: Optional[RandGenModN] = None,
+        squarer: Optional[Squarer] = None,
+        stream_enc: Optional[StreamEnc] = None,
     ):
         if sym_enc is None:
             sym_enc = FernetWrapper()
         self.sym_enc = sym_enc
+        if stream_enc is None:
+            stream_enc = AESGCMWrapper()
+        self.stream_enc = stream_enc
         if gen_modulus is None:
             if seed is not None:
                 gen_modulus = SeededRSA(seed=seed).gen_key
@@ -28,29 +114,248 @@ class TLP:
         if random is None:
             random = Random(seed=seed)
         self.gen_random_generator = random.gen_random_generator_mod_n
+        if squarer is None:
+            squarer = ChunkedSquarer()
+        self.squarer = squarer
+        # factors of the moduli made by this instance, so generate can use CRT without them being passed around
+        self._factors: dict[int, tuple[int, int, int]] = {}
 
-    def setup(self, interval: int, squarings_per_second: int, keysize: int = 2048) -> TLP_Key:
+    def setup(self, interval: int, squarings_per_second: Optional[int] = None, keysize: int = 2048) -> TLP_Key:
+        """
+        Without `squarings_per_second`, the rate is taken from this host's calibration profile. If there is no
+        recent profile, setup first spends about 2 seconds calibrating one and saves it under ~/.cache, see
+        calibration.host_squarings_per_second
+        """
+        if squarings_per_second is None:
+            squarings_per_second = host_squarings_per_second(keysize)
         n, p, q, phi_n = self.gen_modulus(keysize=keysize)
+        self._remember_factors(n, p, q)
         r = self.gen_random_generator(n)
         t = gmpy2.mpz(interval) * squarings_per_second
         a = gmpy2.powmod(2, t, phi_n)
         return TLP_Public(n, t, r), TLP_Secret(p, q, phi_n, a)
 
-    def generate(self, pk: TLP_Public_Input, a: int, message: TLP_Message) -> TLP_Puzzle:
-        n, _, r = pk
+    def generate(
+        self, pk: TLP_Public_Input, a: int, message: TLP_Message, factors: Optional[tuple[int, int]] = None
+    ) -> TLP_Puzzle:
+        """
+        Uses CRT for r^a when the factors of n are given or n was made by this instance's setup
+        """
+        n, _, _ = pk
 
         k = self.sym_enc.generate_key()
-        b = gmpy2.powmod(r, a, n)
+        b = self._exponentiate(pk, a, factors)
         encrypted_message = self.sym_enc.encrypt(k, message)
         encrypted_key = int((k + b) % n)
         return TLP_Puzzle(encrypted_key, encrypted_message)
 
-    def solve(self, pk: TLP_Public_Input, puzzle: TLP_Puzzle) -> TLP_Message:
-        encrypted_key, encrypted_message = puzzle
-        n, t, r = pk
+    def generate_stream(
+        self,
+        pk: TLP_Public_Input,
+        a: int,
+        src: Reader,
+        dst: Writer,
+        trailer: bytes = b"",
+        factors: Optional[tuple[int, int]] = None,
+    ) -> int:
+        """
+        Large-payload form of generate: the message is read from `src` and followed by `trailer`, and is encrypted
+        to `dst` in chunks by the stream cipher, so it is never held in memory as a whole.
+        Returns the encrypted key
+        """
+        n, _, _ = pk
+
+        k = self.stream_enc.generate_key()
+        b = self._exponentiate(pk, a, factors)
+        self.stream_enc.encrypt_stream(k, src, dst, trailer)
+        return int((k + b) % n)
+
+    def setup_many(
+        self, intervals: Sequence[int], squarings_per_second: Optional[int] = None, keysize: int = 2048
+    ) -> list[TLP_Key]:
+        """
+        Sets up one puzzle per interval, all sharing a single modulus; each puzzle gets its own generator r.
+        Without `squarings_per_second`, the rate comes from this host's profile as in setup
+        """
+        if squarings_per_second is None:
+            squarings_per_second = host_squarings_per_second(keysize)
+        n, p, q, phi_n = self.gen_modulus(keysize=keysize)
+        self._remember_factors(n, p, q)
+        t = [gmpy2.mpz(interval) * squarings_per_second for interval in intervals]
+        a = FixedBasePow(2, phi_n).pow_many(t)
+        return [
+            (TLP_Public(n, t_i, self.gen_random_generator(n)), TLP_Secret(p, q, phi_n, a_i)) for t_i, a_i in zip(t, a)
+        ]
+
+    def generate_many(
+        self, pks: Sequence[TLP_Public_Input], a: Sequence[int], messages: Sequence[TLP_Message]
+    ) -> list[TLP_Puzzle]:
+        if not len(pks) == len(a) == len(messages):
+            raise ValueError("length of pks, a, and messages must be equal")
+        return [self.generate(pk_i, a_i, m_i) for pk_i, a_i, m_i in zip(pks, a, messages)]
 
-        for _ in range(t):
-            r = r**2 % n
-        key_int = int((encrypted_key - r) % n)
+    def solve(
+        self,
+        pk: TLP_Public_Input,
+        puzzle: TLP_Puzzle,
+        checkpointer: Optional[Checkpointer] = None,
+        index: int = 0,
+        progress: Optional[ProgressTracker] = None,
+    ) -> TLP_Message:
+        """
+        If a checkpointer is given, solving resumes from its last checkpoint for `index` (ignoring the r in pk)
+        and the intermediate state is handed to it after every chunk of squarings.
+        If a progress tracker is given, it is advanced after every chunk of squarings; a tracker that is already
+        running (e.g. one begun by MITLP or GCTLP) keeps its totals
+        """
+        encrypted_key, encrypted_message = puzzle
+        key_int = self._solve_key(pk, encrypted_key, checkpointer, index, progress)
         message = self.sym_enc.decrypt(key_int, encrypted_message)
         return message
+
+    def solve_with_proof(
+        self,
+        pk: TLP_Public_Input,
+        puzzle: TLP_Puzzle,
+        index: int = 0,
+        progress: Optional[ProgressTracker] = None,
+    ) -> tuple[TLP_Message, TLP_Proof]:
+        """
+        Like solve, but also returns a proof that r^(2^t) was computed correctly, which verify_proof checks without
+        redoing the squarings. Proofs can't be resumed from a checkpoint
+        """
+        n, t, r = pk
+
+        owns_progress = progress is not None and not progress.running
+        if progress is not None and owns_progress:
+            progress.begin(t)
+        try:
+            proof = prove(r, t, n, self.squarer, lambda done: self._on_chunk(index, done, None, progress))
+        finally:
+            if progress is not None and owns_progress:
+                progress.finish()
+
+        return self.decrypt_with_proof(pk, puzzle, proof), proof
+
+    def verify_proof(self, pk: TLP_Public_Input, proof: TLP_Proof) -> bool:
+        n, t, r = pk
+        return proof.r == r and verify_proof(n, t, proof)
+
+    def decrypt_with_proof(self, pk: TLP_Public_Input, puzzle: TLP_Puzzle, proof: TLP_Proof) -> TLP_Message:
+        """
+        Decrypts the puzzle with the r^(2^t) of a proof, which verify_proof should have accepted first
+        """
+        encrypted_key, encrypted_message = puzzle
+        n, _, _ = pk
+        key_int = int((encrypted_key - proof.y) % n)
+        return self.sym_enc.decrypt(key_int, encrypted_message)
+
+    def solve_stream(
+        self,
+        pk: TLP_Public_Input,
+        encrypted_key: int,
+        src: Reader,
+        dst: Writer,
+        tail_length: int = 0,
+        checkpointer: Optional[Checkpointer] = None,
+        index: int = 0,
+        progress: Optional[ProgressTracker] = None,
+    ) -> bytes:
+        """
+        Large-payload form of solve: decrypts the output of generate_stream from `src` to `dst` chunk by chunk,
+        holding back and returning the last `tail_length` bytes
+        """
+        key_int = self._solve_key(pk, encrypted_key, checkpointer, index, progress)
+        return self.stream_enc.decrypt_stream(key_int, src, dst, tail_length)
+
+    def _solve_key(
+        self,
+        pk: TLP_Public_Input,
+        encrypted_key: int,
+        checkpointer: Optional[Checkpointer],
+        index: int,
+        progress: Optional[ProgressTracker],
+    ) -> int:
+        n, t, r = pk
+
+        done = 0
+        if checkpointer is not None:
+            state = checkpointer.load()
+            if state is not None and state.index == index:
+                r, done = state.r, state.squarings
+
+        owns_progress = progress is not None and not progress.running
+        if progress is not None and owns_progress:
+            progress.begin(t - done)
+        try:
+            r = self.squarer.square(r, t - done, n, self._on_chunk(index, done, checkpointer, progress))
+        except SolveCancelled:
+            if checkpointer is not None:
+                checkpointer.save()
+            raise
+        finally:
+            if progress is not None and owns_progress:
+                progress.finish()
+
+        return int((encrypted_key - r) % n)
+
+    def solve_many(
+        self, items: Iterable[tuple[TLP_Public_Input, TLP_Puzzle]], workers: Optional[int] = None
+    ) -> Generator[tuple[int, TLP_Message], None, None]:
+        """
+        Solves independent puzzles on a pool of `workers` processes and yields (index, message) pairs in completion
+        order. Puzzles are sent to the workers packed as bytes, and at most two per worker are in flight at a time
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        max_pending = 2 * workers
+
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(self.sym_enc, self.squarer))
+        pending: dict[Future[TLP_Message], int] = {}
+        try:
+            for i, (pk, puzzle) in enumerate(items):
+                if len(pending) >= max_pending:
+                    yield from self._collect(pending)
+                pending[executor.submit(_solve_packed, pack_puzzle(pk, puzzle))] = i
+            while pending:
+                yield from self._collect(pending)
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def _collect(pending: dict[Future[TLP_Message], int]) -> Generator[tuple[int, TLP_Message], None, None]:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future.result()
+
+    def _exponentiate(self, pk: TLP_Public_Input, a: int, factors: Optional[tuple[int, int]]) -> int:
+        n, _, r = pk
+        if factors is not None:
+            return crt_powmod(r, a, *factors)
+        if (cached := self._factors.get(n)) is not None:
+            return crt_powmod(r, a, *cached)
+        return gmpy2.powmod(r, a, n)
+
+    def _remember_factors(self, n: int, p: int, q: int) -> None:
+        if len(self._factors) >= _FACTORS_CACHE_SIZE:
+            del self._factors[next(iter(self._factors))]
+        self._factors[n] = (p, q, gmpy2.invert(gmpy2.mpz(q), gmpy2.mpz(p)))
+
+    @staticmethod
+    def _on_chunk(
+        index: int, done: int, checkpointer: Optional[Checkpointer], progress: Optional[ProgressTracker]
+    ) -> Optional[Callable[[int, int], None]]:
+        if checkpointer is None and progress is None:
+            return None
+
+        last = 0
+
+        def on_chunk(squarings: int, r: int) -> None:
+            nonlocal last
+            if checkpointer is not None:
+                checkpointer.update(index, r, done + squarings)
+            if progress is not None:
+                progress.advance(index, squarings - last)
+                last = squarings
+
+        return on_chunk
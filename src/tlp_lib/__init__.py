@@ -2,3 +2,5 @@ from tlp_lib.TLP import TLP as TLP  # isort:skip
 from tlp_lib.MITLP import MITLP as MITLP  # isort:skip
 from tlp_lib.GCTLP import GCTLP as GCTLP  # isort:skip
 from tlp_lib.EDTLP import EDTLP as EDTLP, custom_extra_delay as custom_extra_delay  # isort:skip
+from tlp_lib.calibration import calibrate as calibrate  # isort:skip
+from tlp_lib.AsyncEDTLP import AsyncEDTLP as AsyncEDTLP  # isort:skip
@@ -0,0 +1,145 @@
+"""
+Measures how many squarings per second this host sustains and keeps the result as a per-host profile, so setup
+and EDTLP can use the real rate instead of a hard-coded table
+"""
+
+import json
+import os
+import platform
+import secrets
+import statistics
+import time
+from logging import getLogger
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from tlp_lib.protocols import Server_Info
+from tlp_lib.wrappers import ChunkedSquarer
+from tlp_lib.wrappers.protocols import Squarer
+
+CALIBRATION_SECONDS = 2.0
+CALIBRATION_ROUNDS = 5
+MAX_PROFILE_AGE = 30 * 24 * 60 * 60  # seconds
+_PILOT_SECONDS = 0.05
+_PILOT_SQUARINGS = 1 << 10
+
+logger = getLogger(__name__)
+
+HostProfile = NamedTuple(
+    "HostProfile", [("cpu", str), ("keysize", int), ("squarings_per_second", int), ("timestamp", float)]
+)
+
+
+def default_profile_path() -> Path:
+    cache = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache) / "tlp_lib" / "profiles.json"
+
+
+def cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def calibrate(
+    keysize: int = 2048,
+    *,
+    squarer: Optional[Squarer] = None,
+    seconds: float = CALIBRATION_SECONDS,
+    path: Optional[str | os.PathLike[str]] = None,
+    save: bool = True,
+) -> HostProfile:
+    """
+    Measures the sustained squaring rate of `squarer` for a `keysize` bit modulus over about `seconds` seconds.
+    A short pilot run sizes CALIBRATION_ROUNDS equal runs, and the median of their rates is taken, so a
+    single disturbed run doesn't skew the result. The profile is saved to `path` unless `save` is false
+    """
+    if squarer is None:
+        squarer = ChunkedSquarer()
+    # the rate only depends on the size of the modulus, so any odd keysize bit number will do
+    n = secrets.randbits(keysize) | (1 << (keysize - 1)) | 1
+    r = secrets.randbelow(n - 2) + 2
+
+    squarings = _PILOT_SQUARINGS
+    while (elapsed := _time_squarings(squarer, r, squarings, n)) < _PILOT_SECONDS:
+        squarings *= 2
+    squarings = max(1, int(squarings / elapsed * seconds / CALIBRATION_ROUNDS))
+
+    rates = [squarings / _time_squarings(squarer, r, squarings, n) for _ in range(CALIBRATION_ROUNDS)]
+    profile = HostProfile(cpu_model(), keysize, int(statistics.median(rates)), time.time())
+    if save:
+        save_profile(profile, path)
+    return profile
+
+
+def load_profile(
+    keysize: int = 2048, path: Optional[str | os.PathLike[str]] = None, max_age: Optional[float] = MAX_PROFILE_AGE
+) -> Optional[HostProfile]:
+    """
+    Returns the saved profile for this host's CPU and `keysize`, unless there is none or it is older than `max_age`
+    """
+    entry = _read_profiles(path).get(cpu_model(), {}).get(str(keysize))
+    if entry is None:
+        return None
+    profile = HostProfile(cpu_model(), keysize, int(entry["squarings_per_second"]), entry["timestamp"])
+    if max_age is not None and time.time() - profile.timestamp > max_age:
+        return None
+    return profile
+
+
+def save_profile(profile: HostProfile, path: Optional[str | os.PathLike[str]] = None) -> None:
+    path = Path(path) if path is not None else default_profile_path()
+    profiles = _read_profiles(path)
+    profiles.setdefault(profile.cpu, {})[str(profile.keysize)] = {
+        "squarings_per_second": profile.squarings_per_second,
+        "timestamp": profile.timestamp,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(profiles, indent=2))
+    os.replace(tmp_path, path)
+
+
+def host_squarings_per_second(keysize: int = 2048, path: Optional[str | os.PathLike[str]] = None) -> int:
+    """
+    The squaring rate from this host's profile. If there is no recent profile, one is calibrated first, which takes
+    about CALIBRATION_SECONDS, and saved to `path` (default_profile_path if None)
+    """
+    profile = load_profile(keysize, path)
+    if profile is None:
+        logger.info(
+            "No recent squaring rate for %d bit keys on %s, calibrating for about %.0f seconds and saving it to %s",
+            keysize,
+            cpu_model(),
+            CALIBRATION_SECONDS,
+            path if path is not None else default_profile_path(),
+        )
+        profile = calibrate(keysize, path=path)
+    return profile.squarings_per_second
+
+
+def host_server_info(keysize: int = 2048, path: Optional[str | os.PathLike[str]] = None) -> Server_Info:
+    """
+    Server_Info with the rate of host_squarings_per_second, so it may calibrate and save a profile first
+    """
+    return Server_Info(squarings=host_squarings_per_second(keysize, path))
+
+
+def _time_squarings(squarer: Squarer, r: int, squarings: int, n: int) -> float:
+    start = time.perf_counter()
+    squarer.square(r, squarings, n)
+    return time.perf_counter() - start
+
+
+def _read_profiles(path: Optional[str | os.PathLike[str]]) -> dict[str, dict[str, dict[str, float]]]:
+    path = Path(path) if path is not None else default_profile_path()
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        # a corrupt profile file counts as empty, and is overwritten by the next save
+        return {}
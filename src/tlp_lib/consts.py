@@ -2,3 +2,12 @@ SQUARINGS_PER_SEC_UPPER_BOUND = {  # table 1 in doi.org/10.1145/3372297.3417263
     1024: 8_100_000,
     2048: 2_600_000,
 }
+
+# gas estimates for the batch endpoints of SmartContract.sol, used to fill batches up to a gas budget
+SC_GAS_BUDGET = 15_000_000  # half the 30M block gas limit
+SC_TX_GAS = 60_000  # intrinsic gas, cold reads and the solution counter, whose first write is from zero
+SC_STORAGE_WORD_GAS = 22_100  # SSTORE to an unused slot
+SC_CALLDATA_WORD_GAS = 32 * 16  # non-zero bytes
+SC_SOLUTION_GAS = 3_000  # decoding, slot hashing and copy loops of one solution
+SC_PAY_GAS = 20_000  # paidOut flag, cold coin slot and solver, and the transfer's value surcharge
+SC_PAGE_SIZE = 256  # puzzle parts per range read, well within eth_call gas and response size limits
@@ -0,0 +1,134 @@
+"""
+Pietrzak-style proofs of exponentiation for the repeated squaring in TLP.solve.
+
+A proof shows y = r^(2^t) mod n. The solver sends w = r^(2^(t-1)), so y = w^2 exactly, and proves
+w = ±r^(2^(t-1)) by halving the exponent T = t - 1 each round. In round k it sends the midpoint mu_k = x^(2^(T/2)),
+and both sides fold the claim into x' = x^c mu_k, y' = mu_k^c y with a challenge c hashed from the transcript.
+An odd T is first turned even by squaring y. After about log2(t) rounds T = 1, and the verifier squares once.
+Elements are compared up to sign, since -1 would otherwise let a cheating solver pass.
+
+The solver stores the values at the 2^depth positions the first `depth` midpoints need while squaring. The
+midpoints of those rounds are folded from the stored values with CHALLENGE_BITS-bit exponents. Later rounds square
+the current x directly, which costs about t / 2^depth extra squarings
+"""
+
+import hashlib
+from collections.abc import Callable
+from typing import Optional
+
+import gmpy2
+
+from tlp_lib.protocols import TLP_Proof
+from tlp_lib.wrappers.protocols import Squarer
+
+CHALLENGE_BITS = 128
+PROOF_MAX_DEPTH = 16  # at most 2^16 stored values
+_FOLD_COST_BITS = 13  # keep the folds' ~2^depth * CHALLENGE_BITS multiplications under t / 2^6
+
+
+def proof_depth(t: int) -> int:
+    return max(0, min(PROOF_MAX_DEPTH, (t - 1).bit_length() - _FOLD_COST_BITS))
+
+
+def prove(
+    r: int,
+    t: int,
+    n: int,
+    squarer: Squarer,
+    on_segment: Optional[Callable[[int], Optional[Callable[[int, int], None]]]] = None,
+) -> TLP_Proof:
+    """
+    Squares r t times and proves the result. `on_segment` is called with the number of squarings done before each
+    run of squarings towards r^(2^t) and may return an on_chunk callback for it
+    """
+    if t < 1:
+        raise ValueError("t must be greater than 0")
+    r, n = gmpy2.mpz(r), gmpy2.mpz(n)
+    rounds = _rounds(t - 1)
+    depth = min(proof_depth(t), len(rounds))
+
+    # positions (as numbers of squarings of r) of every value the first `depth` midpoints are folded from
+    positions = [0]
+    for _, h in rounds[:depth]:
+        positions += [p + h for p in positions]
+    values: dict[int, int] = {}
+    done, value = 0, r
+    for p in sorted(set(positions) | {t - 1, t}):
+        if p > done:
+            value = squarer.square(value, p - done, n, on_segment(done) if on_segment is not None else None)
+            done = p
+        values[p] = value
+    w, y = values[t - 1], values[t]
+
+    x_k, y_k = _norm(r, n), _norm(w, n)
+    challenges: list[int] = []
+    mu: list[int] = []
+    for k, (odd, h) in enumerate(rounds):
+        if odd:
+            y_k = _norm(y_k * y_k, n)
+        if k < depth:
+            mu_k = _fold([values[p + h] for p in positions[: 1 << k]], challenges, n)
+        else:
+            mu_k = squarer.square(x_k, h, n)
+        mu_k = _norm(mu_k, n)
+        c = _challenge(n, x_k, y_k, mu_k, h)
+        challenges.append(c)
+        mu.append(int(mu_k))
+        x_k = _norm(gmpy2.powmod(x_k, c, n) * mu_k, n)
+        y_k = _norm(gmpy2.powmod(mu_k, c, n) * y_k, n)
+
+    return TLP_Proof(int(r), int(y), int(w), mu)
+
+
+def verify_proof(n: int, t: int, proof: TLP_Proof) -> bool:
+    """
+    Checks that proof.y = proof.r^(2^t) mod n with about 2 * log2(t) exponentiations by CHALLENGE_BITS-bit numbers
+    """
+    r, y, w, mu = proof
+    if t < 1 or not 0 < r < n or y != w * w % n:
+        return False
+    rounds = _rounds(t - 1)
+    if len(mu) != len(rounds):
+        return False
+
+    n = gmpy2.mpz(n)
+    x_k, y_k, t_k = _norm(r, n), _norm(w, n), t - 1
+    for (odd, h), mu_k in zip(rounds, mu):
+        if not 0 < mu_k <= n // 2:
+            return False
+        if odd:
+            y_k = _norm(y_k * y_k, n)
+        c = _challenge(n, x_k, y_k, mu_k, h)
+        x_k = _norm(gmpy2.powmod(x_k, c, n) * mu_k, n)
+        y_k = _norm(gmpy2.powmod(mu_k, c, n) * y_k, n)
+        t_k = h
+    return _norm(gmpy2.powmod(x_k, 1 << t_k, n), n) == y_k
+
+
+def _rounds(t: int) -> list[tuple[bool, int]]:
+    # (whether t is odd and y gets squared first, half of the even t) for each round until t is at most 1
+    rounds: list[tuple[bool, int]] = []
+    while t > 1:
+        odd = t % 2 == 1
+        t = (t + odd) // 2
+        rounds.append((odd, t))
+    return rounds
+
+
+def _fold(values: list[int], challenges: list[int], n: int) -> int:
+    # combines the values the way x was folded in earlier rounds, latest challenge first
+    for c in reversed(challenges):
+        half = len(values) // 2
+        values = [gmpy2.powmod(values[i], c, n) * values[i + half] % n for i in range(half)]
+    return values[0]
+
+
+def _norm(x: int, n: int) -> int:
+    x = gmpy2.mpz(x) % n
+    return min(x, n - x)
+
+
+def _challenge(n: int, x: int, y: int, mu: int, t: int) -> int:
+    length = (n.bit_length() + 7) // 8
+    data = b"".join(gmpy2.mpz(v).to_bytes(length) for v in (n, x, y, mu)) + t.to_bytes(8)
+    return int.from_bytes(hashlib.sha256(data).digest()[: CHALLENGE_BITS // 8])
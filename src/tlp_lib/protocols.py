@@ -1,9 +1,21 @@
-from collections.abc import Sequence
+from collections.abc import Iterable, Sequence
 from typing import Generator, NamedTuple, NotRequired, Optional, Protocol, TypedDict, Unpack
 
 from tlp_lib import TLP
 from tlp_lib.wrappers import SHA512Wrapper
-from tlp_lib.wrappers.protocols import HashFunc, RandGen, RandGenModN, RSAKeyGen, SymEnc
+from tlp_lib.wrappers.protocols import (
+    Checkpointer,
+    HashFunc,
+    ProgressTracker,
+    RandGen,
+    RandGenModN,
+    Reader,
+    RSAKeyGen,
+    Squarer,
+    StreamEnc,
+    SymEnc,
+    Writer,
+)
 
 TLP_Public = NamedTuple("TLP_Public", [("n", int), ("t", int), ("r", int)])
 TLP_Public_Input = TLP_Public | tuple[int, int, int]
@@ -11,6 +23,7 @@ TLP_Secret = NamedTuple("TLP_Secret", [("p", int), ("q", int), ("phi_n", int), (
 TLP_Secret_Input = TLP_Secret | tuple[int, int, int, int]
 
 TLP_Puzzle = NamedTuple("TLP_Puzzle", [("encrypted_key", int), ("encrypted_message", bytes)])
+TLP_Proof = NamedTuple("TLP_Proof", [("r", int), ("y", int), ("w", int), ("mu", list[int])])
 type TLP_Puzzles = list[TLP_Puzzle]
 type TLP_Message = bytes
 type TLP_Messages = list[TLP_Message]
@@ -23,6 +36,8 @@ type TLP_Interval = int
 class TLPKwargs(TypedDict):
     sym_enc: NotRequired[SymEnc]
     gen_modulus: NotRequired[RSAKeyGen]
+    squarer: NotRequired[Squarer]
+    stream_enc: NotRequired[StreamEnc]
 
 
 class TLPInterface(Protocol):
@@ -33,13 +48,72 @@ class TLPInterface(Protocol):
         gen_modulus: Optional[RSAKeyGen] = None,
         seed: Optional[int] = None,
         random: Optional[RandGenModN] = None,
+        squarer: Optional[Squarer] = None,
+        stream_enc: Optional[StreamEnc] = None,
     ): ...
 
-    def setup(self, interval: TLP_Interval, squarings_per_second: int, keysize: int = 2048) -> TLP_Key: ...
+    def setup(
+        self, interval: TLP_Interval, squarings_per_second: Optional[int] = None, keysize: int = 2048
+    ) -> TLP_Key: ...
+
+    def generate(
+        self, pk: TLP_Public_Input, a: int, message: TLP_Message, factors: Optional[tuple[int, int]] = None
+    ) -> TLP_Puzzle: ...
 
-    def generate(self, pk: TLP_Public_Input, a: int, message: TLP_Message) -> TLP_Puzzle: ...
+    def generate_stream(
+        self,
+        pk: TLP_Public_Input,
+        a: int,
+        src: Reader,
+        dst: Writer,
+        trailer: bytes = b"",
+        factors: Optional[tuple[int, int]] = None,
+    ) -> int: ...
+
+    def setup_many(
+        self, intervals: Sequence[TLP_Interval], squarings_per_second: Optional[int] = None, keysize: int = 2048
+    ) -> list[TLP_Key]: ...
+
+    def generate_many(
+        self, pks: Sequence[TLP_Public_Input], a: Sequence[int], messages: Sequence[TLP_Message]
+    ) -> list[TLP_Puzzle]: ...
 
-    def solve(self, pk: TLP_Public_Input, puzzle: TLP_Puzzle) -> TLP_Message: ...
+    def solve(
+        self,
+        pk: TLP_Public_Input,
+        puzzle: TLP_Puzzle,
+        checkpointer: Optional[Checkpointer] = None,
+        index: int = 0,
+        progress: Optional[ProgressTracker] = None,
+    ) -> TLP_Message: ...
+
+    def solve_with_proof(
+        self,
+        pk: TLP_Public_Input,
+        puzzle: TLP_Puzzle,
+        index: int = 0,
+        progress: Optional[ProgressTracker] = None,
+    ) -> tuple[TLP_Message, TLP_Proof]: ...
+
+    def verify_proof(self, pk: TLP_Public_Input, proof: TLP_Proof) -> bool: ...
+
+    def decrypt_with_proof(self, pk: TLP_Public_Input, puzzle: TLP_Puzzle, proof: TLP_Proof) -> TLP_Message: ...
+
+    def solve_stream(
+        self,
+        pk: TLP_Public_Input,
+        encrypted_key: int,
+        src: Reader,
+        dst: Writer,
+        tail_length: int = 0,
+        checkpointer: Optional[Checkpointer] = None,
+        index: int = 0,
+        progress: Optional[ProgressTracker] = None,
+    ) -> bytes: ...
+
+    def solve_many(
+        self, items: Iterable[tuple[TLP_Public_Input, TLP_Puzzle]], workers: Optional[int] = None
+    ) -> Generator[tuple[int, TLP_Message], None, None]: ...
 
 
 TLP_type = type[TLPInterface]
@@ -66,6 +140,8 @@ class GCTLPKwargs(TypedDict):
     tlp: NotRequired[TLP_type]
     hash_func: NotRequired[HashFunc]
     gen_modulus: NotRequired[RSAKeyGen]
+    squarer: NotRequired[Squarer]
+    stream_enc: NotRequired[StreamEnc]
 
 
 class GCTLPInterface(Protocol):
@@ -80,19 +156,73 @@ class GCTLPInterface(Protocol):
     ): ...
 
     def setup(
-        self, intervals: GCTLP_Intervals, squaring_per_second: int, keysize: int = 2048
+        self, intervals: GCTLP_Intervals, squaring_per_second: Optional[int] = None, keysize: int = 2048
     ) -> tuple[GCTLP_Public, GCTLP_Secret]: ...
 
     def generate(
         self, m: TLP_Messages, pk: GCTLP_Public_Input, sk: GCTLP_Secret_Input
     ) -> tuple[TLP_Puzzles, TLP_Digests]: ...
 
+    def generate_iter(
+        self, m: Iterable[TLP_Message], pk: GCTLP_Public_Input, sk: GCTLP_Secret_Input
+    ) -> Generator[tuple[TLP_Puzzle, TLP_Digest], None, None]: ...
+
     def solve(
-        self, pk: GCTLP_Public_Input, puzz: TLP_Puzzles
+        self,
+        pk: GCTLP_Public_Input,
+        puzz: Iterable[TLP_Puzzle],
+        checkpointer: Optional[Checkpointer] = None,
+        progress: Optional[ProgressTracker] = None,
     ) -> Generator[tuple[TLP_Message, TLP_Digest], None, None]: ...
 
+    def solve_with_proofs(
+        self,
+        pk: GCTLP_Public_Input,
+        puzz: Iterable[TLP_Puzzle],
+        progress: Optional[ProgressTracker] = None,
+    ) -> Generator[tuple[TLP_Message, TLP_Digest, TLP_Proof], None, None]: ...
+
+    def verify_proof(self, pk: GCTLP_Public_Input, i: int, proof: TLP_Proof, r: Optional[int] = None) -> bool: ...
+
+    def open_with_proof(
+        self, pk: GCTLP_Public_Input, i: int, puzzle: TLP_Puzzle, proof: TLP_Proof
+    ) -> tuple[TLP_Message, TLP_Digest, int]: ...
+
+    def solve_pipelined(
+        self,
+        pk: GCTLP_Public_Input,
+        puzz: Iterable[TLP_Puzzle],
+        progress: Optional[ProgressTracker] = None,
+        h: Optional[Sequence[TLP_Digest]] = None,
+        depth: int = ...,
+    ) -> Generator[tuple[TLP_Message, TLP_Digest], None, None]: ...
+
+    def generate_stream(
+        self, files: Iterable[tuple[Reader, Writer]], pk: GCTLP_Public_Input, sk: GCTLP_Secret_Input
+    ) -> Generator[tuple[int, TLP_Digest], None, None]: ...
+
+    def solve_stream(
+        self,
+        pk: GCTLP_Public_Input,
+        encrypted_keys: Iterable[int],
+        files: Iterable[tuple[Reader, Writer]],
+        checkpointer: Optional[Checkpointer] = None,
+        progress: Optional[ProgressTracker] = None,
+    ) -> Generator[bytes, None, None]: ...
+
     def verify(self, m: TLP_Message, d: bytes, h: TLP_Digest) -> None: ...
 
+    def verify_stream(self, m: Reader, d: bytes, h: TLP_Digest) -> None: ...
+
+    def verify_many(
+        self,
+        solutions: Iterable[tuple[TLP_Message, bytes]],
+        h: Sequence[TLP_Digest],
+        *,
+        workers: Optional[int] = None,
+        batch_size: int = ...,
+    ) -> list[int]: ...
+
 
 GCTLP_type = type[GCTLPInterface]
 
@@ -0,0 +1,530 @@
+import asyncio
+import math
+import time
+from collections.abc import AsyncGenerator, Callable, Hashable, Sequence
+from contextlib import asynccontextmanager
+from logging import getLogger
+from typing import Any, Optional, Self
+from weakref import WeakKeyDictionary
+
+from eth.exceptions import OutOfGas
+from eth_tester import EthereumTester, PyEVMBackend
+from eth_tester.exceptions import TransactionFailed
+from eth_typing import ChecksumAddress
+from hexbytes import HexBytes
+from web3 import AsyncWeb3
+from web3.contract import AsyncContract
+from web3.contract.async_contract import AsyncContractFunction
+from web3.exceptions import ContractLogicError, Web3RPCError
+from web3.providers.eth_tester import AsyncEthereumTesterProvider
+from web3.types import Nonce, TxReceipt, Wei
+
+from tlp_lib.protocols import GCTLP_Encrypted_Message, GCTLP_Encrypted_Messages, TLP_Digest, TLP_Digests
+from tlp_lib.smartcontracts.artifacts import load_compiled_contract
+from tlp_lib.smartcontracts.BatchSizer import BatchSizer
+from tlp_lib.smartcontracts.ContractStats import ContractStats
+from tlp_lib.smartcontracts.EthereumSC import (
+    CONTRACT_NAME,
+    CONTRACT_PATH,
+    MAX_FEE_PER_GAS,
+    SOLC_VERSION,
+    ContractStatus,
+    TransactionException,
+    is_out_of_gas,
+    pipeline_exception,
+    tx_params,
+)
+from tlp_lib.smartcontracts.protocols import (
+    SC_CacheStats,
+    SC_Coins,
+    SC_ExtraTime,
+    SC_Solution,
+    SC_Solutions,
+    SC_UpperBounds,
+)
+from tlp_lib.smartcontracts.ReadCache import ReadCache
+
+logger = getLogger(__name__)
+
+# the local nonce counters of the accounts sending through a web3, shared by all contracts on it, and their locks
+_nonces: WeakKeyDictionary[AsyncWeb3, dict[ChecksumAddress, int]] = WeakKeyDictionary()
+_nonce_locks: WeakKeyDictionary[AsyncWeb3, dict[ChecksumAddress, asyncio.Lock]] = WeakKeyDictionary()
+
+
+class AsyncEthereumSC:
+    """
+    EthereumSC on AsyncWeb3, so one event loop can drive many contracts while their transactions are mined. Reads
+    are cached the same way as in EthereumSC.
+
+    Transactions are numbered with nonces counted locally per account and web3, and sent one at a time per account,
+    so contracts sharing a web3 and an account can send concurrently. Inside `pipeline()` their receipts are awaited
+    together on exit; batched writes are always sent that way
+    """
+
+    web3: AsyncWeb3
+    _account: Optional[ChecksumAddress]
+    __contract: Optional[AsyncContract] = None
+    _contract_path: str
+    _backend: Optional[PyEVMBackend] = None
+    _cache: ReadCache
+    _pending: Optional[list[tuple[str, int, float, Optional[HexBytes]]]] = None
+    _nonces: dict[ChecksumAddress, int]
+    _nonce_locks: dict[ChecksumAddress, asyncio.Lock]
+
+    def __init__(
+        self,
+        account: Optional[ChecksumAddress] = None,
+        web3: Optional[AsyncWeb3] = None,
+        contract_path: str = CONTRACT_PATH,
+    ):
+        self._initiate_network(web3)
+        self.account = account
+        self._nonces = _nonces.setdefault(self.web3, {})
+        self._nonce_locks = _nonce_locks.setdefault(self.web3, {})
+
+        self._contract_path = contract_path
+        self.stats = ContractStats()
+        self._cache = ReadCache()
+
+    # Public Methods #
+
+    async def commitments(self) -> TLP_Digests:
+        return await self._read(("commitments",), self._contract.functions.commitments(), ContractStatus.SOLVING)
+
+    async def set_commitments(self, commitments: TLP_Digests) -> None:
+        def set_commitments(
+            start_index: int, commitments_batch: Sequence[TLP_Digest]
+        ) -> tuple[AsyncContractFunction, int]:
+            return self._contract.functions.setCommitments(list(commitments_batch), start_index), 0
+
+        # each batch requires the commitment before its start index to be set
+        await self._send_in_batches("setCommitments", commitments, set_commitments, dependent=True)
+
+    async def get_commitment_at(self, i: int) -> TLP_Digest:
+        return await self._read(
+            ("getCommitmentAt", i), self._contract.functions.getCommitmentAt(i), is_final=lambda _: True
+        )
+
+    async def coins(self) -> SC_Coins:
+        return await self._read(("coins",), self._contract.functions.coins(), ContractStatus.SETTING_COMMITMENTS)
+
+    async def upper_bounds(self) -> SC_UpperBounds:
+        return await self._read(
+            ("upperBounds",), self._contract.functions.upperBounds(), ContractStatus.SETTING_COMMITMENTS
+        )
+
+    async def get_upper_bound_at(self, i: int) -> int:
+        return await self._read(
+            ("getUpperBoundAt", i),
+            self._contract.functions.getUpperBoundAt(i),
+            ContractStatus.SETTING_COMMITMENTS,
+        )
+
+    async def start_time(self) -> int:
+        return await self._read(
+            ("startTime",), self._contract.functions.startTime(), ContractStatus.SETTING_COMMITMENTS
+        )
+
+    async def solutions(self) -> SC_Solutions:
+        res = await self._read(("solutions",), self._contract.functions.solutions(), is_final=lambda res: all(res[2]))
+
+        return list(zip(res[0], res[1], res[2]))
+
+    async def get_solution_at(self, i: int) -> SC_Solution:
+        return await self._read(
+            ("getSolutionAt", i), self._contract.functions.getSolutionAt(i), is_final=lambda res: res[2] != 0
+        )
+
+    async def get_commitments_range(self, start: int, count: int) -> TLP_Digests:
+        return await self._read(
+            ("getCommitmentsRange", start, count),
+            self._contract.functions.getCommitmentsRange(start, count),
+            ContractStatus.SOLVING,
+        )
+
+    async def get_upper_bounds_range(self, start: int, count: int) -> SC_UpperBounds:
+        return await self._read(
+            ("getUpperBoundsRange", start, count),
+            self._contract.functions.getUpperBoundsRange(start, count),
+            ContractStatus.SETTING_COMMITMENTS,
+        )
+
+    async def get_solutions_range(self, start: int, count: int) -> SC_Solutions:
+        res = await self._read(
+            ("getSolutionsRange", start, count),
+            self._contract.functions.getSolutionsRange(start, count),
+            is_final=lambda res: all(res[2]),
+        )
+
+        return list(zip(res[0], res[1], res[2]))
+
+    async def amount_of_puzzle_parts(self) -> int:
+        return await self._read(
+            ("amountOfPuzzleParts",),
+            self._contract.functions.amountOfPuzzleParts(),
+            ContractStatus.SETTING_COMMITMENTS,
+        )
+
+    async def initial_timestamp(self) -> int:
+        return await self._read(
+            ("initialTimestamp",), self._contract.functions.initialTimestamp(), ContractStatus.SETTING_COMMITMENTS
+        )
+
+    async def status(self) -> ContractStatus:
+        return await self._status()
+
+    @property
+    def cache_stats(self) -> SC_CacheStats:
+        return self._cache.stats
+
+    @property
+    def account(self) -> ChecksumAddress:
+        if self._account is None:
+            raise RuntimeError("No Account set.  Please set an account to use the contract.")
+        return self._account
+
+    @account.setter
+    def account(self, value: Optional[ChecksumAddress]):
+        self._account = value
+
+    async def initiate(
+        self,
+        coins: SC_Coins,
+        start_time: int,
+        extra_time: SC_ExtraTime,
+        upper_bounds: SC_UpperBounds,
+        helper_id: int | ChecksumAddress,
+    ) -> Self:
+        """
+        Deploys the contract to the network and deposit the coins into the contract
+        """
+        abi, sc_bytecode = self._compile_contract()
+        contract_address = await self._deploy_contract(
+            sc_bytecode, abi, coins, start_time, extra_time, upper_bounds, helper_id
+        )
+        logger.info("Deployed Contract Successfully: %s", contract_address)
+        return self
+
+    def load_contract(self, contract_address: ChecksumAddress) -> None:
+        abi, _ = self._compile_contract()
+        self._contract = self.web3.eth.contract(address=contract_address, abi=abi)
+
+    @asynccontextmanager
+    async def pipeline(self) -> AsyncGenerator[None]:
+        """
+        Transactions sent in this context don't wait for their receipts; all receipts are awaited together on exit.
+        Their failures are then raised as one TransactionException with the indices, in order of sending, of the
+        transactions that failed and of those that ran out of gas. Nested contexts join the outer one. The context belongs to this instance, so
+        concurrent tasks sending through one instance share it
+        """
+        if self._pending is not None:
+            yield
+            return
+
+        self._pending = []
+        try:
+            yield
+            pending = self._pending
+        finally:
+            self._pending = None
+
+        receipts = await asyncio.gather(*(
+            self._record_receipt(name, calldata_bytes, start, tx_hash)
+            for name, calldata_bytes, start, tx_hash in pending
+            if tx_hash is not None
+        ))
+        received = iter(receipts)
+        all_receipts = [None if tx_hash is None else next(received) for *_, tx_hash in pending]
+        gas_limits = await asyncio.gather(*(self._failed_gas_limit(receipt) for receipt in all_receipts))
+        e = pipeline_exception(all_receipts, gas_limits)
+        if e is not None:
+            raise e
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    async def switch_to_account(self, account_index: int) -> None:
+        self.account = (await self.web3.eth.accounts)[account_index]
+
+    async def add_solution(self, solution: GCTLP_Encrypted_Message, witness: TLP_Digest) -> None:
+        if not await self._has_succeeded(self._contract.functions.addSolution(solution, witness)):
+            raise RuntimeError("Solution was not added correctly")
+
+    async def add_solutions(self, solutions: GCTLP_Encrypted_Messages, witnesses: TLP_Digests) -> None:
+        if not await self._has_succeeded(self._contract.functions.addSolutions(solutions, witnesses)):
+            raise RuntimeError("Solutions were not added correctly")
+
+    async def get_message_at(self, i: int) -> GCTLP_Encrypted_Message:
+        return (await self.get_solution_at(i))[0]
+
+    async def pay(self, i: int) -> None:
+        if not await self._has_succeeded(self._contract.functions.pay(i)):
+            raise RuntimeError("Payout was not successful")
+
+    async def pay_many(self, indices: list[int]) -> None:
+        if not await self._has_succeeded(self._contract.functions.payMany(indices)):
+            raise RuntimeError("Payouts were not successful")
+
+    async def pay_back(self, i: int) -> None:
+        if not await self._has_succeeded(self._contract.functions.payBack(i)):
+            raise RuntimeError("Payback was not successful")
+
+    # Private Properties #
+
+    @property
+    def _contract(self) -> AsyncContract:
+        if self.__contract is None:
+            raise RuntimeError("No Contract set.  Please load a contract or initiate it first.")
+        return self.__contract
+
+    @_contract.setter
+    def _contract(self, value: AsyncContract):
+        self.__contract = value
+        self.clear_cache()
+
+    # Private Methods #
+
+    _SC_PUZZLE_BATCH_SIZE: int = 250  # size of the first batch, later ones are sized by their gas estimates
+    _SC_BATCH_GAS_FRACTION: float = 0.5
+    _SC_DEPENDENT_GAS_MARGIN: float = 1.2
+
+    async def _read(
+        self,
+        key: Hashable,
+        fn: AsyncContractFunction,
+        final_from: Optional[ContractStatus] = None,
+        is_final: Optional[Callable[[Any], bool]] = None,
+        block: Optional[int] = None,
+    ) -> Any:
+        """
+        Reads through the cache, see EthereumSC._read
+        """
+        cached, value = self._cache.get(key)
+        if cached:
+            return value
+        if block is None:
+            block = await self.web3.eth.block_number
+        cached, value = self._cache.get(key, block)
+        if cached:
+            return value
+        final = final_from is not None and await self._status(block) >= final_from
+
+        start = time.perf_counter()
+        value = await fn.call()
+        self.stats.record_call(fn.fn_name, self._calldata_bytes(fn), time.perf_counter() - start)
+        self._cache.put(key, block, value, final or (is_final is not None and is_final(value)))
+        return value
+
+    async def _status(self, block: Optional[int] = None) -> ContractStatus:
+        return ContractStatus(
+            await self._read(
+                ("contractStatus",),
+                self._contract.functions.contractStatus(),
+                is_final=lambda status: status == ContractStatus.SOLVING,
+                block=block,
+            )
+        )
+
+    def _compile_contract(self) -> tuple[str, str]:
+        return load_compiled_contract(self._contract_path, CONTRACT_NAME, SOLC_VERSION)
+
+    async def _deploy_contract(
+        self,
+        bytecode: str,
+        abi: str,
+        coins: SC_Coins,
+        start_time: int,
+        extra_times: SC_ExtraTime,
+        upper_bounds: SC_UpperBounds,
+        helper_id: int | ChecksumAddress,
+    ) -> Optional[ChecksumAddress]:
+        ContractFactory = self.web3.eth.contract(abi=abi, bytecode=bytecode)
+
+        start = time.perf_counter()
+        tx_hash = await ContractFactory.constructor().transact({"from": self.account})
+
+        tx_receipt = await self.web3.eth.wait_for_transaction_receipt(tx_hash)
+        self.stats.record_transaction(
+            "constructor", tx_receipt["gasUsed"], (len(bytecode) - 2) // 2, time.perf_counter() - start
+        )
+
+        self._contract = self.web3.eth.contract(
+            address=tx_receipt["contractAddress"], abi=abi
+        )  # pyright: ignore[reportAttributeAccessIssue]
+
+        await self._initialize_in_batches(coins, start_time, extra_times, upper_bounds, helper_id)
+
+        return tx_receipt["contractAddress"]
+
+    async def _initialize_in_batches(
+        self,
+        coins: SC_Coins,
+        start_time: int,
+        extra_times: SC_ExtraTime,
+        upper_bounds: SC_UpperBounds,
+        helper_id: int | ChecksumAddress,
+    ) -> None:
+        assert len(coins) == len(extra_times) == len(upper_bounds), "All input lists must have the same length"
+
+        def initialize(start_index: int, coins_batch: Sequence[int]) -> tuple[AsyncContractFunction, int]:
+            end_index = start_index + len(coins_batch)
+
+            return (
+                self._contract.functions.initialize(
+                    list(coins_batch),
+                    start_time,
+                    list(map(int, extra_times[start_index:end_index])),
+                    list(map(int, upper_bounds[start_index:end_index])),
+                    helper_id,
+                ),
+                sum(coins_batch),
+            )
+
+        await self._send_in_batches("initialize", coins, initialize)
+
+    async def _send_in_batches[
+        T
+    ](
+        self,
+        name: str,
+        items: Sequence[T],
+        make_tx: Callable[[int, Sequence[T]], tuple[AsyncContractFunction, int]],
+        dependent: bool = False,
+    ) -> list[int]:
+        """
+        Sends `items` in pipelined batches sized by their gas estimates, see EthereumSC._send_in_batches
+        """
+        latest = await self.web3.eth.get_block("latest")
+        gas_limit = latest["gasLimit"]  # pyright: ignore[reportTypedDictNotRequiredAccess]
+        sizer = BatchSizer(self._SC_PUZZLE_BATCH_SIZE, len(items), int(gas_limit * self._SC_BATCH_GAS_FRACTION))
+        start_index = 0
+        while start_index < len(items):
+            gas_per_item: Optional[float] = None
+            sizer.start_pipeline()
+            try:
+                async with self.pipeline():
+                    while start_index < len(items):
+                        batch = items[start_index : start_index + sizer.size]
+                        tx, value = make_tx(start_index, batch)
+                        if gas_per_item is not None:
+                            gas = math.ceil(gas_per_item * len(batch))
+                        else:
+                            estimate_start = time.perf_counter()
+                            try:
+                                gas = await tx.estimate_gas({"from": self.account, "value": Wei(value)})
+                                self.stats.record_call(
+                                    f"{tx.fn_name} (estimate)",
+                                    self._calldata_bytes(tx),
+                                    time.perf_counter() - estimate_start,
+                                )
+                            except (ContractLogicError, TransactionFailed, Web3RPCError, OutOfGas) as e:
+                                if len(batch) == 1 or not is_out_of_gas(e):
+                                    raise
+                                sizer.split(len(batch))
+                                logger.info(
+                                    "%s batch of %d from %d failed to estimate (%s), splitting",
+                                    name,
+                                    len(batch),
+                                    start_index,
+                                    e,
+                                )
+                                continue
+                        if not sizer.fits(len(batch), gas):
+                            continue
+
+                        # concurrent tasks may send through the same pipeline, so the index is taken right before
+                        assert self._pending is not None
+                        index = len(self._pending)
+                        if not await self._has_succeeded(tx, value, gas):
+                            raise RuntimeError(f"{name} has failed for batch starting at index {start_index}")
+                        if dependent and gas_per_item is None:
+                            gas_per_item = gas / len(batch) * self._SC_DEPENDENT_GAS_MARGIN
+                        sizer.sent(index, start_index, len(batch), gas)
+                        start_index += len(batch)
+            except TransactionException as e:
+                split = sizer.resend(e.failed, e.out_of_gas)
+                if split is None:
+                    raise
+                start_index, failed_batch = split
+                logger.info("%s batch of %d from %d ran out of gas, splitting", name, failed_batch, start_index)
+
+        logger.info(
+            "%s sent %d items in batches of %s (gas target %d)", name, len(items), sizer.sizes, sizer.gas_target
+        )
+        return sizer.sizes
+
+    def _initiate_network(self, web3: Optional[AsyncWeb3] = None) -> None:
+        """
+        If no web3 is given, use the `AsyncEthereumTesterProvider` which runs a local testnet
+        """
+        if web3 is None:
+            self._backend = PyEVMBackend.from_mnemonic(
+                "test test test test test test test test test test test junk",
+                genesis_state_overrides={"balance": Wei(1_000_000 * 10**18)},
+            )
+
+            provider = AsyncEthereumTesterProvider()
+            provider.ethereum_tester = EthereumTester(backend=self._backend)
+            web3 = AsyncWeb3(provider)
+
+        self.web3 = web3
+
+    async def _has_succeeded(self, tx: AsyncContractFunction, value: int = 0, gas: Optional[int] = None) -> bool:
+        """
+        Inside `pipeline()` this only sends the transaction and returns True; its outcome is checked on exit
+        """
+        if not self._pending:
+            # the base fee is only checked once per pipeline, before its first transaction
+            await self._gas_fee_control(MAX_FEE_PER_GAS)
+
+        props = tx_params(self.account, value, gas)
+        calldata_bytes = self._calldata_bytes(tx)
+        start = time.perf_counter()
+        account = self.account
+        async with self._nonce_locks.setdefault(account, asyncio.Lock()):
+            if account not in self._nonces:
+                self._nonces[account] = await self.web3.eth.get_transaction_count(account, "pending")
+            props["nonce"] = Nonce(self._nonces[account])
+            try:
+                tx_hash = await tx.transact(props)
+            except (ContractLogicError, TransactionFailed) as e:
+                # rejected before it was sent, so its nonce is still free
+                if self._pending is None:
+                    raise
+                logger.warning("Transaction %d was rejected: %s", len(self._pending), e)
+                self._pending.append((tx.fn_name, calldata_bytes, start, None))
+                return True
+            except BaseException:
+                # the node may or may not have taken the nonce, so it is read again for the next transaction
+                del self._nonces[account]
+                raise
+            self._nonces[account] += 1
+
+        if self._pending is None:
+            return (await self._record_receipt(tx.fn_name, calldata_bytes, start, tx_hash))["status"] == 1
+        self._pending.append((tx.fn_name, calldata_bytes, start, tx_hash))
+        return True
+
+    async def _record_receipt(self, name: str, calldata_bytes: int, start: float, tx_hash: HexBytes) -> TxReceipt:
+        receipt = await self.web3.eth.wait_for_transaction_receipt(tx_hash)
+        self.stats.record_transaction(name, receipt["gasUsed"], calldata_bytes, time.perf_counter() - start)
+        return receipt
+
+    async def _failed_gas_limit(self, receipt: Optional[TxReceipt]) -> Optional[int]:
+        if receipt is None or receipt["status"] == 1:
+            return None
+        return (await self.web3.eth.get_transaction(receipt["transactionHash"])).get("gas")
+
+    def _calldata_bytes(self, fn: AsyncContractFunction) -> int:
+        data = self._contract.encode_abi(fn.abi_element_identifier, args=fn.args, kwargs=fn.kwargs)
+        return (len(data) - 2) // 2  # hex with 0x prefix
+
+    async def _gas_fee_control(self, max_fee_per_gas: int):
+        """
+        Mines a block if the base fee is too high for the transaction, see EthereumSC._gas_fee_control
+        """
+        latest_block = await self.web3.eth.get_block("latest")
+        base_fee_per_gas = latest_block["baseFeePerGas"]  # pyright: ignore[reportTypedDictNotRequiredAccess]
+
+        if base_fee_per_gas > max_fee_per_gas * 0.9 and self._backend is not None:
+            self._backend.mine_blocks(1)
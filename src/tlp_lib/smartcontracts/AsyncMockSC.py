@@ -0,0 +1,114 @@
+import asyncio
+from typing import Any, Optional, Self
+
+from tlp_lib.protocols import GCTLP_Encrypted_Message, GCTLP_Encrypted_Messages, TLP_Digest, TLP_Digests
+from tlp_lib.smartcontracts.MockSC import MockSC
+from tlp_lib.smartcontracts.protocols import SC_Coins, SC_ExtraTime, SC_Solution, SC_Solutions, SC_UpperBounds
+
+
+class AsyncMockSC:
+    """
+    MockSC behind the AsyncSCInterface. Each call first sleeps for `latency` seconds, standing in for the round trip
+    to a node
+    """
+
+    def __init__(self, mock: Optional[MockSC] = None, latency: float = 0):
+        if mock is None:
+            mock = MockSC()
+        self.mock = mock
+        self.latency = latency
+
+    async def initiate(
+        self,
+        coins: SC_Coins,
+        start_time: int,
+        extra_time: SC_ExtraTime,
+        upper_bounds: SC_UpperBounds,
+        helper_id: Any,
+    ) -> Self:
+        await asyncio.sleep(self.latency)
+        self.mock.initiate(coins, start_time, extra_time, upper_bounds, helper_id)
+        return self
+
+    async def add_solution(self, solution: GCTLP_Encrypted_Message, witness: TLP_Digest) -> None:
+        await asyncio.sleep(self.latency)
+        self.mock.add_solution(solution, witness)
+
+    async def add_solutions(self, solutions: GCTLP_Encrypted_Messages, witnesses: TLP_Digests, /) -> None:
+        await asyncio.sleep(self.latency)
+        self.mock.add_solutions(solutions, witnesses)
+
+    async def get_message_at(self, i: int, /) -> GCTLP_Encrypted_Message:
+        await asyncio.sleep(self.latency)
+        return self.mock.get_message_at(i)
+
+    async def switch_to_account(self, account: int, /) -> None:
+        self.mock.switch_to_account(account)
+
+    async def pay(self, i: int, /) -> None:
+        await asyncio.sleep(self.latency)
+        self.mock.pay(i)
+
+    async def pay_many(self, indices: list[int], /) -> None:
+        await asyncio.sleep(self.latency)
+        self.mock.pay_many(indices)
+
+    async def pay_back(self, i: int, /) -> None:
+        await asyncio.sleep(self.latency)
+        self.mock.pay_back(i)
+
+    async def get_commitment_at(self, i: int, /) -> TLP_Digest:
+        await asyncio.sleep(self.latency)
+        return self.mock.get_commitment_at(i)
+
+    async def get_solution_at(self, i: int, /) -> SC_Solution:
+        await asyncio.sleep(self.latency)
+        return self.mock.get_solution_at(i)
+
+    async def get_upper_bound_at(self, i: int, /) -> int:
+        await asyncio.sleep(self.latency)
+        return self.mock.get_upper_bound_at(i)
+
+    async def get_commitments_range(self, start: int, count: int, /) -> TLP_Digests:
+        await asyncio.sleep(self.latency)
+        return self.mock.get_commitments_range(start, count)
+
+    async def get_upper_bounds_range(self, start: int, count: int, /) -> SC_UpperBounds:
+        await asyncio.sleep(self.latency)
+        return self.mock.get_upper_bounds_range(start, count)
+
+    async def get_solutions_range(self, start: int, count: int, /) -> SC_Solutions:
+        await asyncio.sleep(self.latency)
+        return self.mock.get_solutions_range(start, count)
+
+    async def amount_of_puzzle_parts(self) -> int:
+        await asyncio.sleep(self.latency)
+        return self.mock.amount_of_puzzle_parts
+
+    async def upper_bounds(self) -> SC_UpperBounds:
+        await asyncio.sleep(self.latency)
+        return self.mock.upper_bounds
+
+    async def coins(self) -> SC_Coins:
+        await asyncio.sleep(self.latency)
+        return self.mock.coins
+
+    async def start_time(self) -> int:
+        await asyncio.sleep(self.latency)
+        return self.mock.start_time
+
+    async def commitments(self) -> TLP_Digests:
+        await asyncio.sleep(self.latency)
+        return self.mock.commitments
+
+    async def set_commitments(self, commitments: TLP_Digests, /) -> None:
+        await asyncio.sleep(self.latency)
+        self.mock.commitments = commitments
+
+    async def solutions(self) -> SC_Solutions:
+        await asyncio.sleep(self.latency)
+        return self.mock.solutions
+
+    async def initial_timestamp(self) -> int:
+        await asyncio.sleep(self.latency)
+        return self.mock.initial_timestamp
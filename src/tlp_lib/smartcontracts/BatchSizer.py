@@ -0,0 +1,59 @@
+from typing import Optional
+
+
+class BatchSizer:
+    """
+    The batch sizes of EthereumSC._send_in_batches and its async twin, from the gas of the batches tried so far.
+    `size` is the size of the next batch to try, and `sizes` those of the batches sent
+    """
+
+    def __init__(self, first_size: int, items: int, gas_target: int):
+        self.size = first_size
+        self.gas_target = gas_target
+        self.sizes: list[int] = []
+        self._failed_size = items + 1  # later batches stay below the smallest batch that ran out of gas
+        self._sent: dict[int, tuple[int, int]] = {}  # start index and size of the batches, by index in the pipeline
+
+    def fits(self, batch: int, gas: int) -> bool:
+        """
+        Whether a batch of `batch` items needing `gas` is within the target; if not, the next one is shrunk to fit
+        """
+        if gas <= self.gas_target or batch == 1:
+            return True
+        self.size = max(1, batch * self.gas_target // gas)
+        return False
+
+    def split(self, batch: int) -> None:
+        """
+        A batch of `batch` items ran out of gas, so the next one is half of it
+        """
+        self._failed_size = min(self._failed_size, batch)
+        self.size = batch // 2
+
+    def start_pipeline(self) -> None:
+        self._sent = {}
+
+    def sent(self, index: int, start_index: int, batch: int, gas: int) -> None:
+        """
+        A batch of `batch` items from `start_index` was sent with `gas` as transaction `index` of the pipeline; the
+        next one is scaled by how far it was from the target, at most doubling
+        """
+        self._sent[index] = (start_index, batch)
+        self.sizes.append(batch)
+        self.size = max(1, min(2 * batch, self._failed_size - 1, batch * self.gas_target // gas))
+
+    def resend(self, failed: list[int], out_of_gas: list[int]) -> Optional[tuple[int, int]]:
+        """
+        After the transactions `failed` of the pipeline, `out_of_gas` of them by running out, the start index and
+        size of the batch to resend from, split in half, or None if the failure can't be fixed that way. That batch
+        must have run out of gas, have more than one item and be the pipeline's first failure, and every transaction
+        that failed must be that batch or a later one of this sizer, which then all failed, so resending keeps the
+        items in order
+        """
+        first = failed[0]
+        later = [i for i in sorted(self._sent) if i >= first]
+        if first not in self._sent or first not in out_of_gas or failed != later or self._sent[first][1] == 1:
+            return None
+        del self.sizes[len(self.sizes) - len(later) :]
+        self.split(self._sent[first][1])
+        return self._sent[first]
@@ -0,0 +1,62 @@
+from collections.abc import Iterable
+from typing import NamedTuple
+
+FunctionStats = NamedTuple(
+    "FunctionStats", [("count", int), ("gas_used", int), ("calldata_bytes", int), ("seconds", float)]
+)
+
+_EMPTY = FunctionStats(0, 0, 0, 0.0)
+
+
+class ContractStats:
+    """
+    Totals per contract function of the transactions sent and the calls made by EthereumSC. The seconds of a
+    transaction run from sending it to having its receipt; calls don't use gas
+    """
+
+    def __init__(self):
+        self.transactions: dict[str, FunctionStats] = {}
+        self.calls: dict[str, FunctionStats] = {}
+
+    def record_transaction(self, name: str, gas_used: int, calldata_bytes: int, seconds: float) -> None:
+        self.transactions[name] = _add(self.transactions.get(name, _EMPTY), gas_used, calldata_bytes, seconds)
+
+    def record_call(self, name: str, calldata_bytes: int, seconds: float) -> None:
+        self.calls[name] = _add(self.calls.get(name, _EMPTY), 0, calldata_bytes, seconds)
+
+    @property
+    def transaction_total(self) -> FunctionStats:
+        return _sum(self.transactions.values())
+
+    @property
+    def call_total(self) -> FunctionStats:
+        return _sum(self.calls.values())
+
+    def reset(self) -> None:
+        self.transactions.clear()
+        self.calls.clear()
+
+    def __str__(self) -> str:
+        lines = [f"{'function':>24} {'count':>8} {'gas used':>14} {'calldata':>12} {'seconds':>10}"]
+        for kind, stats in (("tx", self.transactions), ("call", self.calls)):
+            for name, (count, gas_used, calldata_bytes, seconds) in sorted(stats.items()):
+                lines.append(
+                    f"{kind + ' ' + name:>24} {count:>8} {gas_used:>14} {calldata_bytes:>11}B {seconds:>9.3f}s"
+                )
+        return "\n".join(lines)
+
+
+def _add(stats: FunctionStats, gas_used: int, calldata_bytes: int, seconds: float) -> FunctionStats:
+    return FunctionStats(
+        stats.count + 1, stats.gas_used + gas_used, stats.calldata_bytes + calldata_bytes, stats.seconds + seconds
+    )
+
+
+def _sum(stats: Iterable[FunctionStats]) -> FunctionStats:
+    stats = list(stats)
+    return FunctionStats(
+        sum(s.count for s in stats),
+        sum(s.gas_used for s in stats),
+        sum(s.calldata_bytes for s in stats),
+        sum((s.seconds for s in stats), 0.0),
+    )
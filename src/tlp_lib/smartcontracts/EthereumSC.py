@@ -1,18 +1,35 @@
-import itertools
+import math
+import time
+from collections.abc import Callable, Generator, Hashable, Sequence
+from contextlib import contextmanager
+from enum import IntEnum
 from logging import getLogger
 from pathlib import Path
-from typing import Literal, Optional, Self
+from typing import Any, Optional, Self
 
+from eth.exceptions import OutOfGas
 from eth_tester import EthereumTester, PyEVMBackend
+from eth_tester.exceptions import TransactionFailed
 from eth_typing import ChecksumAddress
-from solcx import compile_files, install_solc  # pyright: ignore[reportUnknownVariableType]
 from web3 import EthereumTesterProvider, Web3
 from web3.contract import Contract  # pyright: ignore[reportPrivateImportUsage]
 from web3.contract.contract import ContractFunction, HexBytes  # pyright: ignore[reportPrivateImportUsage]
-from web3.types import TxParams, TxReceipt, Wei
-
-from tlp_lib.protocols import GCTLP_Encrypted_Message, TLP_Digest, TLP_Digests
-from tlp_lib.smartcontracts.protocols import SC_Coins, SC_ExtraTime, SC_Solution, SC_Solutions, SC_UpperBounds
+from web3.exceptions import ContractLogicError, Web3RPCError
+from web3.types import Nonce, TxParams, TxReceipt, Wei
+
+from tlp_lib.protocols import GCTLP_Encrypted_Message, GCTLP_Encrypted_Messages, TLP_Digest, TLP_Digests
+from tlp_lib.smartcontracts.artifacts import load_compiled_contract
+from tlp_lib.smartcontracts.BatchSizer import BatchSizer
+from tlp_lib.smartcontracts.ContractStats import ContractStats
+from tlp_lib.smartcontracts.protocols import (
+    SC_CacheStats,
+    SC_Coins,
+    SC_ExtraTime,
+    SC_Solution,
+    SC_Solutions,
+    SC_UpperBounds,
+)
+from tlp_lib.smartcontracts.ReadCache import ReadCache
 
 SOLC_VERSION = "0.8.0"
 CONTRACT_NAME = "SmartContract"
@@ -20,13 +37,82 @@ CONTRACT_PATH = str((Path(__file__) / "../../../contracts/SmartContract.sol").re
 
 logger = getLogger(__name__)
 
+# how nodes word a gas estimate failing because the transaction needs more gas than a block allows
+OUT_OF_GAS_MESSAGES = ("out of gas", "gas required exceeds", "exceeds block gas limit")
+MAX_FEE_PER_GAS = 1_000_000_000
+MAX_PRIORITY_FEE_PER_GAS = 1_000_000_000
+
+
+class ContractStatus(IntEnum):
+    """
+    Mirrors the Status enum of the contract; each phase only moves forward
+    """
+
+    SETUP = 0
+    SETTING_COMMITMENTS = 1
+    SOLVING = 2
+
+
+class TransactionException(RuntimeError):
+    message = "Transactions failed"
+
+    def __init__(self, failed: list[int], out_of_gas: Optional[list[int]] = None):
+        super().__init__(f"{self.message} at indices {failed}")
+        self.failed = failed
+        self.out_of_gas = out_of_gas or []
+
+
+def is_out_of_gas(e: Exception) -> bool:
+    """
+    Whether a failed gas estimate means the transaction is too big for a block, rather than that it reverts
+    """
+    return isinstance(e, OutOfGas) or any(message in str(e).lower() for message in OUT_OF_GAS_MESSAGES)
+
+
+def pipeline_exception(
+    receipts: Sequence[Optional[TxReceipt]], gas_limits: Sequence[Optional[int]]
+) -> Optional[TransactionException]:
+    """
+    The TransactionException of a pipeline from the receipts of its transactions, None for one rejected before it
+    was sent, or None if all succeeded. A failed transaction that used its whole gas limit, from `gas_limits`, ran
+    out of gas; a revert refunds what it didn't use
+    """
+    failed = [i for i, receipt in enumerate(receipts) if receipt is None or receipt["status"] != 1]
+    out_of_gas = [i for i in failed if (receipt := receipts[i]) is not None and receipt["gasUsed"] == gas_limits[i]]
+    return TransactionException(failed, out_of_gas) if failed else None
+
+
+def tx_params(account: ChecksumAddress, value: int = 0, gas: Optional[int] = None) -> TxParams:
+    """
+    The parameters of a transaction from `account`, with its gas limit estimated by web3 if `gas` is None
+    """
+    props: TxParams = {
+        "from": account,
+        "value": Wei(value),
+        "maxFeePerGas": Wei(MAX_FEE_PER_GAS),
+        "maxPriorityFeePerGas": Wei(MAX_PRIORITY_FEE_PER_GAS),
+    }
+    if gas is not None:
+        props["gas"] = gas
+    return props
+
 
 class EthereumSC:
+    """
+    Contract reads go through a client-side cache. Values the contract can no longer change in its current status
+    phase are fetched once; anything else is only reused within the block it was read in.
+
+    Transactions sent inside `pipeline()` don't wait for their receipts; batched writes are always sent that way
+    """
+
     web3: Web3
     _account: Optional[ChecksumAddress]
     __contract: Optional[Contract] = None
     _contract_path: str
     _backend: Optional[PyEVMBackend] = None
+    _cache: ReadCache
+    _pending: Optional[list[tuple[str, int, float, Optional[HexBytes]]]] = None
+    _nonces: dict[ChecksumAddress, int]
 
     def __init__(
         self, account: Optional[ChecksumAddress] = None, web3: Optional[Web3] = None, contract_path: str = CONTRACT_PATH
@@ -37,54 +123,104 @@ class EthereumSC:
         self.account = account
 
         self._contract_path = contract_path
+        self._nonces = {}
+        self.stats = ContractStats()
+        self._cache = ReadCache()
 
     # Public Properties #
 
     @property
     def commitments(self) -> TLP_Digests:
-        return self._contract.functions.commitments().call()
+        return self._read(("commitments",), self._contract.functions.commitments(), ContractStatus.SOLVING)
 
     @commitments.setter
     def commitments(self, commitments: TLP_Digests):
-        start_index = 0
-        for commitments_batch in itertools.batched(commitments, self._SC_PUZZLE_BATCH_SIZE):
-
+        def set_commitments(start_index: int, commitments_batch: Sequence[TLP_Digest]) -> tuple[ContractFunction, int]:
             # Call the setCommitments function for the current batch with the appropriate start index
-            if not self._has_succeeded(self._contract.functions.setCommitments(commitments_batch, start_index)):
-                raise RuntimeError(f"Commitments were not set correctly for batch starting at index {start_index}")
+            return self._contract.functions.setCommitments(list(commitments_batch), start_index), 0
 
-            start_index += len(commitments_batch)
+        # each batch requires the commitment before its start index to be set
+        self._send_in_batches("setCommitments", commitments, set_commitments, dependent=True)
 
     def get_commitment_at(self, i: int) -> TLP_Digest:
-        return self._contract.functions.getCommitmentAt(i).call()
+        # getCommitmentAt reverts until the commitment is set, and a set commitment can't be overwritten
+        return self._read(("getCommitmentAt", i), self._contract.functions.getCommitmentAt(i), is_final=lambda _: True)
 
     @property
     def coins(self) -> SC_Coins:
-        return self._contract.functions.coins().call()
+        return self._read(("coins",), self._contract.functions.coins(), ContractStatus.SETTING_COMMITMENTS)
 
     @property
     def upper_bounds(self) -> SC_UpperBounds:
-        return self._contract.functions.upperBounds().call()
+        return self._read(("upperBounds",), self._contract.functions.upperBounds(), ContractStatus.SETTING_COMMITMENTS)
 
     def get_upper_bound_at(self, i: int) -> int:
-        return self._contract.functions.getUpperBoundAt(i).call()
+        return self._read(
+            ("getUpperBoundAt", i),
+            self._contract.functions.getUpperBoundAt(i),
+            ContractStatus.SETTING_COMMITMENTS,
+        )
 
     @property
     def start_time(self) -> int:
-        return self._contract.functions.startTime().call()
+        return self._read(("startTime",), self._contract.functions.startTime(), ContractStatus.SETTING_COMMITMENTS)
 
     @property  # pyright: ignore
     def solutions(self) -> SC_Solutions:
-        res = self._contract.functions.solutions().call()
+        # solutions are only appended, so the list is final once every part has a timestamp
+        res = self._read(("solutions",), self._contract.functions.solutions(), is_final=lambda res: all(res[2]))
 
         return list(zip(res[0], res[1], res[2]))
 
     def get_solution_at(self, i: int) -> SC_Solution:
-        return self._contract.functions.getSolutionAt(i).call()
+        return self._read(
+            ("getSolutionAt", i), self._contract.functions.getSolutionAt(i), is_final=lambda res: res[2] != 0
+        )
+
+    def get_commitments_range(self, start: int, count: int) -> TLP_Digests:
+        return self._read(
+            ("getCommitmentsRange", start, count),
+            self._contract.functions.getCommitmentsRange(start, count),
+            ContractStatus.SOLVING,
+        )
+
+    def get_upper_bounds_range(self, start: int, count: int) -> SC_UpperBounds:
+        return self._read(
+            ("getUpperBoundsRange", start, count),
+            self._contract.functions.getUpperBoundsRange(start, count),
+            ContractStatus.SETTING_COMMITMENTS,
+        )
+
+    def get_solutions_range(self, start: int, count: int) -> SC_Solutions:
+        res = self._read(
+            ("getSolutionsRange", start, count),
+            self._contract.functions.getSolutionsRange(start, count),
+            is_final=lambda res: all(res[2]),
+        )
+
+        return list(zip(res[0], res[1], res[2]))
+
+    @property
+    def amount_of_puzzle_parts(self) -> int:
+        return self._read(
+            ("amountOfPuzzleParts",),
+            self._contract.functions.amountOfPuzzleParts(),
+            ContractStatus.SETTING_COMMITMENTS,
+        )
 
     @property  # pyright: ignore[reportPropertyTypeMismatch]
     def initial_timestamp(self) -> int:
-        return self._contract.functions.initialTimestamp().call()
+        return self._read(
+            ("initialTimestamp",), self._contract.functions.initialTimestamp(), ContractStatus.SETTING_COMMITMENTS
+        )
+
+    @property
+    def status(self) -> ContractStatus:
+        return self._status()
+
+    @property
+    def cache_stats(self) -> SC_CacheStats:
+        return self._cache.stats
 
     @property
     def account(self) -> ChecksumAddress:
@@ -121,6 +257,40 @@ class EthereumSC:
         abi, _ = self._compile_contract()
         self._contract = self.web3.eth.contract(address=contract_address, abi=abi)
 
+    @contextmanager
+    def pipeline(self) -> Generator[None]:
+        """
+        Transactions sent in this context are numbered with locally counted nonces and don't wait for their receipts;
+        all receipts are awaited together on exit. Their failures are then raised as one TransactionException with
+        the indices, in order of sending, of the transactions that failed and of those that ran out of gas. Nested
+        contexts join the outer one.
+
+        Gas is estimated against the mined state, so a transaction that depends on an earlier one of the pipeline must
+        be sent with an explicit gas limit, as _send_in_batches does for dependent batches
+        """
+        if self._pending is not None:
+            yield
+            return
+
+        self._pending = []
+        try:
+            yield
+            pending = self._pending
+        finally:
+            self._pending = None
+            self._nonces.clear()
+
+        receipts = [
+            None if tx_hash is None else self._record_receipt(name, calldata_bytes, start, tx_hash)
+            for name, calldata_bytes, start, tx_hash in pending
+        ]
+        e = pipeline_exception(receipts, [self._failed_gas_limit(receipt) for receipt in receipts])
+        if e is not None:
+            raise e
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
     def switch_to_account(self, account_index: int) -> None:
         self.account = self.web3.eth.accounts[account_index]
 
@@ -128,13 +298,21 @@ class EthereumSC:
         if not self._has_succeeded(self._contract.functions.addSolution(solution, witness)):
             raise RuntimeError("Solution was not added correctly")
 
+    def add_solutions(self, solutions: GCTLP_Encrypted_Messages, witnesses: TLP_Digests) -> None:
+        if not self._has_succeeded(self._contract.functions.addSolutions(solutions, witnesses)):
+            raise RuntimeError("Solutions were not added correctly")
+
     def get_message_at(self, i: int) -> GCTLP_Encrypted_Message:
-        return self._contract.functions.getSolutionAt(i).call()[0]
+        return self.get_solution_at(i)[0]
 
     def pay(self, i: int) -> None:
         if not self._has_succeeded(self._contract.functions.pay(i)):
             raise RuntimeError("Payout was not successful")
 
+    def pay_many(self, indices: list[int]) -> None:
+        if not self._has_succeeded(self._contract.functions.payMany(indices)):
+            raise RuntimeError("Payouts were not successful")
+
     def pay_back(self, i: int) -> None:
         if not self._has_succeeded(self._contract.functions.payBack(i)):
             raise RuntimeError("Payback was not successful")
@@ -150,33 +328,58 @@ class EthereumSC:
     @_contract.setter
     def _contract(self, value: Contract):
         self.__contract = value
+        self.clear_cache()
 
     # Private Methods #
 
-    _SC_PUZZLE_BATCH_SIZE: int = 250
+    _SC_PUZZLE_BATCH_SIZE: int = 250  # size of the first batch, later ones are sized by their gas estimates
+    _SC_BATCH_GAS_FRACTION: float = 0.5
+    _SC_DEPENDENT_GAS_MARGIN: float = 1.2
 
-    def _compile_contract(self) -> tuple[str, str]:
+    def _read(
+        self,
+        key: Hashable,
+        fn: ContractFunction,
+        final_from: Optional[ContractStatus] = None,
+        is_final: Optional[Callable[[Any], bool]] = None,
+        block: Optional[int] = None,
+    ) -> Any:
         """
-        Loads in the ABI of the EDTLP contract
+        Reads through the cache. The value is kept for good if the contract is at least in status `final_from` or
+        `is_final` holds for it, and otherwise only for the block it was read in. The status is read through the cache
+        too, so it costs an RPC at most once per block
         """
-
-        install_solc(SOLC_VERSION)
-
-        compiled_sol: dict[str, dict[Literal["abi", "bin"], str]] = compile_files(
-            [self._contract_path],
-            output_values=["abi", "bin"],
-            solc_version=SOLC_VERSION,
+        cached, value = self._cache.get(key)
+        if cached:
+            return value
+        if block is None:
+            block = self.web3.eth.block_number
+        cached, value = self._cache.get(key, block)
+        if cached:
+            return value
+        final = final_from is not None and self._status(block) >= final_from
+
+        start = time.perf_counter()
+        value = fn.call()
+        self.stats.record_call(fn.fn_name, self._calldata_bytes(fn), time.perf_counter() - start)
+        self._cache.put(key, block, value, final or (is_final is not None and is_final(value)))
+        return value
+
+    def _status(self, block: Optional[int] = None) -> ContractStatus:
+        return ContractStatus(
+            self._read(
+                ("contractStatus",),
+                self._contract.functions.contractStatus(),
+                is_final=lambda status: status == ContractStatus.SOLVING,
+                block=block,
+            )
         )
 
-        compiled_contract = compiled_sol[self._contract_path + ":" + CONTRACT_NAME]
-
-        abi: Optional[str] = compiled_contract["abi"]
-        bytecode: Optional[str] = compiled_contract["bin"]
-
-        assert abi is not None
-        assert bytecode is not None
-
-        return abi, bytecode
+    def _compile_contract(self) -> tuple[str, str]:
+        """
+        Loads in the ABI of the EDTLP contract, compiling it only if no artifact of the current source is cached
+        """
+        return load_compiled_contract(self._contract_path, CONTRACT_NAME, SOLC_VERSION)
 
     def _deploy_contract(
         self,
@@ -195,9 +398,13 @@ class EthereumSC:
 
         contract = ContractFactory.constructor()
 
+        start = time.perf_counter()
         tx_hash: HexBytes = contract.transact({"from": self.account})
 
         tx_receipt: TxReceipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
+        self.stats.record_transaction(
+            "constructor", tx_receipt["gasUsed"], (len(bytecode) - 2) // 2, time.perf_counter() - start
+        )
 
         self._contract = self.web3.eth.contract(
             address=tx_receipt["contractAddress"], abi=abi
@@ -218,25 +425,103 @@ class EthereumSC:
         # Ensure that all lists have the same length
         assert len(coins) == len(extra_times) == len(upper_bounds), "All input lists must have the same length"
 
-        batches = [itertools.batched(lst, self._SC_PUZZLE_BATCH_SIZE) for lst in (coins, extra_times, upper_bounds)]
+        def initialize(start_index: int, coins_batch: Sequence[int]) -> tuple[ContractFunction, int]:
+            end_index = start_index + len(coins_batch)
 
-        for coins_batch, extra_times_batch, upper_bounds_batch in zip(*batches):
-
-            # Calculate the value to send with this batch
-            value_to_send = sum(coins_batch)
-
-            # Call the initialize function for the current batch
-            if not self._has_succeeded(
+            # Call the initialize function for the current batch, sending the coins of the batch with it
+            return (
                 self._contract.functions.initialize(
-                    coins_batch,
+                    list(coins_batch),
                     start_time,
-                    list(map(int, extra_times_batch)),
-                    list(map(int, upper_bounds_batch)),
+                    list(map(int, extra_times[start_index:end_index])),
+                    list(map(int, upper_bounds[start_index:end_index])),
                     helper_id,
                 ),
-                value_to_send,
-            ):
-                raise RuntimeError("Initialize has failed for batch")
+                sum(coins_batch),
+            )
+
+        self._send_in_batches("initialize", coins, initialize)
+
+    def _send_in_batches[
+        T
+    ](
+        self,
+        name: str,
+        items: Sequence[T],
+        make_tx: Callable[[int, Sequence[T]], tuple[ContractFunction, int]],
+        dependent: bool = False,
+    ) -> list[int]:
+        """
+        Sends `items` in pipelined batches made by `make_tx(start_index, batch)`, sized by estimate_gas to use about
+        _SC_BATCH_GAS_FRACTION of the block gas limit. The first batch has _SC_PUZZLE_BATCH_SIZE items, and each
+        next one is scaled by how far the last estimate was from the target, at most doubling. A batch over the
+        target is shrunk to fit, and one whose estimate runs out of gas is split in half and retried; later batches
+        then stay below that failed size. Any other estimate failure is raised. Returns the batch sizes
+
+        If the batches are `dependent`, each one reverts until the one before it is mined, so only the first is
+        estimated. Later ones are sent with the gas per item of that estimate, times _SC_DEPENDENT_GAS_MARGIN
+
+        A batch that is mined but runs out of gas is split the same way once the receipts are in, provided the
+        batches sent after it failed too, and the items are resent from its start, estimating the first batch again.
+        Inside an enclosing pipeline the receipts are only checked on its exit, so such a batch fails it instead
+        """
+        gas_limit = self.web3.eth.get_block("latest")["gasLimit"]  # pyright: ignore[reportTypedDictNotRequiredAccess]
+        sizer = BatchSizer(self._SC_PUZZLE_BATCH_SIZE, len(items), int(gas_limit * self._SC_BATCH_GAS_FRACTION))
+        start_index = 0
+        while start_index < len(items):
+            gas_per_item: Optional[float] = None
+            sizer.start_pipeline()
+            try:
+                with self.pipeline():
+                    while start_index < len(items):
+                        batch = items[start_index : start_index + sizer.size]
+                        tx, value = make_tx(start_index, batch)
+                        if gas_per_item is not None:
+                            gas = math.ceil(gas_per_item * len(batch))
+                        else:
+                            estimate_start = time.perf_counter()
+                            try:
+                                gas = tx.estimate_gas({"from": self.account, "value": Wei(value)})
+                                self.stats.record_call(
+                                    f"{tx.fn_name} (estimate)",
+                                    self._calldata_bytes(tx),
+                                    time.perf_counter() - estimate_start,
+                                )
+                            except (ContractLogicError, TransactionFailed, Web3RPCError, OutOfGas) as e:
+                                # a batch that reverts would revert at any size
+                                if len(batch) == 1 or not is_out_of_gas(e):
+                                    raise
+                                sizer.split(len(batch))
+                                logger.info(
+                                    "%s batch of %d from %d failed to estimate (%s), splitting",
+                                    name,
+                                    len(batch),
+                                    start_index,
+                                    e,
+                                )
+                                continue
+                        if not sizer.fits(len(batch), gas):
+                            continue
+
+                        assert self._pending is not None
+                        index = len(self._pending)
+                        if not self._has_succeeded(tx, value, gas):
+                            raise RuntimeError(f"{name} has failed for batch starting at index {start_index}")
+                        if dependent and gas_per_item is None:
+                            gas_per_item = gas / len(batch) * self._SC_DEPENDENT_GAS_MARGIN
+                        sizer.sent(index, start_index, len(batch), gas)
+                        start_index += len(batch)
+            except TransactionException as e:
+                split = sizer.resend(e.failed, e.out_of_gas)
+                if split is None:
+                    raise
+                start_index, failed_batch = split
+                logger.info("%s batch of %d from %d ran out of gas, splitting", name, failed_batch, start_index)
+
+        logger.info(
+            "%s sent %d items in batches of %s (gas target %d)", name, len(items), sizer.sizes, sizer.gas_target
+        )
+        return sizer.sizes
 
     def _initiate_network(self, web3: Optional[Web3] = None) -> None:
         """
@@ -257,21 +542,53 @@ class EthereumSC:
 
         assert self.web3.is_connected()
 
-    def _has_succeeded(self, tx: ContractFunction, value: int = 0) -> bool:
-        max_fee_per_gas = 1_000_000_000
-        max_priority_fee_per_gas = 1_000_000_000
-
-        self._gas_fee_control(1_000_000_000)
-
-        props: TxParams = {
-            "from": self.account,
-            "value": Wei(value),
-            "maxFeePerGas": Wei(max_fee_per_gas),
-            "maxPriorityFeePerGas": Wei(max_priority_fee_per_gas),
-        }
-
-        tx_hash = tx.transact(props)
-        return self.web3.eth.wait_for_transaction_receipt(tx_hash)["status"] == 1
+    def _has_succeeded(self, tx: ContractFunction, value: int = 0, gas: Optional[int] = None) -> bool:
+        """
+        Inside `pipeline()` this only sends the transaction and returns True; its outcome is checked on exit
+        """
+        if not self._pending:
+            # the base fee is only checked once per pipeline, before its first transaction
+            self._gas_fee_control(MAX_FEE_PER_GAS)
+
+        props = tx_params(self.account, value, gas)
+        calldata_bytes = self._calldata_bytes(tx)
+        start = time.perf_counter()
+        if self._pending is None:
+            tx_hash = tx.transact(props)
+            return self._record_receipt(tx.fn_name, calldata_bytes, start, tx_hash)["status"] == 1
+
+        account = self.account
+        if account not in self._nonces:
+            self._nonces[account] = self.web3.eth.get_transaction_count(account, "pending")
+        props["nonce"] = Nonce(self._nonces[account])
+        try:
+            tx_hash = tx.transact(props)
+        except (ContractLogicError, TransactionFailed) as e:
+            # rejected before it was sent, so its nonce is still free
+            logger.warning("Transaction %d was rejected: %s", len(self._pending), e)
+            self._pending.append((tx.fn_name, calldata_bytes, start, None))
+        else:
+            self._nonces[account] += 1
+            self._pending.append((tx.fn_name, calldata_bytes, start, tx_hash))
+        return True
+
+    def _record_receipt(self, name: str, calldata_bytes: int, start: float, tx_hash: HexBytes) -> TxReceipt:
+        """
+        Waits for the receipt of a transaction sent at `start`, records it in stats and returns it
+        """
+        receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
+        self.stats.record_transaction(name, receipt["gasUsed"], calldata_bytes, time.perf_counter() - start)
+        return receipt
+
+    def _failed_gas_limit(self, receipt: Optional[TxReceipt]) -> Optional[int]:
+        # only needed, and so only fetched, for the transactions that failed
+        if receipt is None or receipt["status"] == 1:
+            return None
+        return self.web3.eth.get_transaction(receipt["transactionHash"]).get("gas")
+
+    def _calldata_bytes(self, fn: ContractFunction) -> int:
+        data = self._contract.encode_abi(fn.abi_element_identifier, args=fn.args, kwargs=fn.kwargs)
+        return (len(data) - 2) // 2  # hex with 0x prefix
 
     def _gas_fee_control(self, max_fee_per_gas: int):
         """
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Any, Self
 
-from tlp_lib.protocols import GCTLP_Encrypted_Message, TLP_Digest, TLP_Digests
+from tlp_lib.protocols import GCTLP_Encrypted_Message, GCTLP_Encrypted_Messages, TLP_Digest, TLP_Digests
 from tlp_lib.smartcontracts.protocols import SC_Coins, SC_ExtraTime, SC_Solution, SC_Solutions, SC_UpperBounds
 
 
@@ -37,6 +37,11 @@ class MockSC:
         time = int(datetime.now().timestamp())
         self.solutions.append((solution, witness, time))
 
+    def add_solutions(self, solutions: GCTLP_Encrypted_Messages, witnesses: TLP_Digests, /):
+        assert len(solutions) == len(witnesses)
+        for solution, witness in zip(solutions, witnesses):
+            self.add_solution(solution, witness)
+
     def get_message_at(self, i: int, /) -> GCTLP_Encrypted_Message:
         return self.solutions[i][0]
 
@@ -46,6 +51,10 @@ class MockSC:
     def pay(self, i: int, /):
         print(f"paying TPH {self.coins[i]}")
 
+    def pay_many(self, indices: list[int], /):
+        for i in indices:
+            self.pay(i)
+
     def pay_back(self, i: int, /):
         print(f"paying back {self.coins[i]}")
 
@@ -57,3 +66,18 @@ class MockSC:
 
     def get_upper_bound_at(self, i: int, /) -> int:
         return self.upper_bounds[i]
+
+    def get_commitments_range(self, start: int, count: int, /) -> TLP_Digests:
+        return self.commitments[start : start + count]
+
+    def get_upper_bounds_range(self, start: int, count: int, /) -> SC_UpperBounds:
+        return self.upper_bounds[start : start + count]
+
+    def get_solutions_range(self, start: int, count: int, /) -> SC_Solutions:
+        # unsolved parts are empty, as in the contract
+        end = min(start + count, len(self.coins))
+        return self.solutions[start:end] + [(b"", b"", 0)] * (end - max(start, len(self.solutions)))
+
+    @property
+    def amount_of_puzzle_parts(self) -> int:
+        return len(self.coins)
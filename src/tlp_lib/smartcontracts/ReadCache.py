@@ -0,0 +1,49 @@
+from collections.abc import Hashable
+from typing import Any, Optional
+
+from tlp_lib.smartcontracts.protocols import SC_CacheStats
+
+
+class ReadCache:
+    """
+    The client-side cache of contract reads shared by EthereumSC and AsyncEthereumSC. A final value, one the contract
+    can no longer change, is kept for good; anything else only for the block it was read in
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    @property
+    def stats(self) -> SC_CacheStats:
+        return SC_CacheStats(self.hits, self.misses)
+
+    def clear(self) -> None:
+        self._final_values: dict[Hashable, Any] = {}
+        self._block_values: dict[Hashable, tuple[int, Any]] = {}
+
+    def get(self, key: Hashable, block: Optional[int] = None) -> tuple[bool, Any]:
+        """
+        Whether `key` is cached and its value: a final one, or with `block` also one read in that block. A lookup
+        with a block that misses counts as a miss, as the value is then read from the contract
+        """
+        if key in self._final_values:
+            self.hits += 1
+            return True, self._final_values[key]
+        if block is None:
+            return False, None
+
+        cached = self._block_values.get(key)
+        if cached is not None and cached[0] == block:
+            self.hits += 1
+            return True, cached[1]
+        self.misses += 1
+        return False, None
+
+    def put(self, key: Hashable, block: int, value: Any, final: bool) -> None:
+        if final:
+            self._final_values[key] = value
+            self._block_values.pop(key, None)
+        else:
+            self._block_values[key] = (block, value)
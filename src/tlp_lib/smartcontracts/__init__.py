@@ -1,2 +1,5 @@
+from tlp_lib.smartcontracts.AsyncEthereumSC import AsyncEthereumSC as AsyncEthereumSC
+from tlp_lib.smartcontracts.AsyncMockSC import AsyncMockSC as AsyncMockSC
+from tlp_lib.smartcontracts.ContractStats import ContractStats as ContractStats
 from tlp_lib.smartcontracts.EthereumSC import EthereumSC as EthereumSC
 from tlp_lib.smartcontracts.MockSC import MockSC as MockSC
@@ -0,0 +1,32 @@
+"""
+python -m tlp_lib.smartcontracts [--check]
+
+Bundles the compiled contract next to its source, to be committed whenever the contract changes. With --check, exits
+with an error instead if the bundled artifact is missing or doesn't match the current source
+"""
+
+import sys
+
+from tlp_lib.smartcontracts.artifacts import bundle_artifact, bundled_artifact_path, is_bundled
+from tlp_lib.smartcontracts.EthereumSC import CONTRACT_NAME, CONTRACT_PATH, SOLC_VERSION
+
+
+def main(argv: list[str]) -> int:
+    if argv == ["--check"]:
+        if is_bundled(CONTRACT_PATH, CONTRACT_NAME, SOLC_VERSION):
+            return 0
+        print(
+            f"{bundled_artifact_path(CONTRACT_PATH)} is missing or stale, regenerate it with"
+            " python -m tlp_lib.smartcontracts",
+            file=sys.stderr,
+        )
+        return 1
+    if argv:
+        print(__doc__, file=sys.stderr)
+        return 2
+    print(bundle_artifact(CONTRACT_PATH, CONTRACT_NAME, SOLC_VERSION))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,125 @@
+"""
+On-disk cache of the compiled contract, keyed by the hash of its source and the solc version, so solc runs once per
+contract version and machine instead of on every deployment. Processes compiling the same contract wait on a lock
+file, so a pool of workers compiles it once.
+
+An artifact next to the source (SmartContract.json) that matches the key is used before the cache, so a checkout
+that ships one needs no solc at all; bundle_artifact writes it, see `python -m tlp_lib.smartcontracts`.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Literal, Optional
+
+from solcx import compile_files, install_solc  # pyright: ignore[reportUnknownVariableType]
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks on Windows; processes may then compile concurrently
+    fcntl = None
+
+ARTIFACT_SUFFIX = ".json"
+
+
+def default_artifact_dir() -> Path:
+    cache = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache) / "tlp_lib" / "contracts"
+
+
+def artifact_key(contract_path: str | os.PathLike[str], contract_name: str, solc_version: str) -> str:
+    source = Path(contract_path).read_bytes()
+    return hashlib.sha256(b"\0".join((source, contract_name.encode(), solc_version.encode()))).hexdigest()
+
+
+def load_compiled_contract(
+    contract_path: str | os.PathLike[str],
+    contract_name: str,
+    solc_version: str,
+    cache_dir: Optional[str | os.PathLike[str]] = None,
+) -> tuple[Any, str]:
+    """
+    The ABI and bytecode of `contract_name`, from the bundled artifact or the cache if either matches the current
+    source, otherwise compiled and added to the cache
+    """
+    key = artifact_key(contract_path, contract_name, solc_version)
+    artifact = _read_artifact(bundled_artifact_path(contract_path), key)
+    if artifact is not None:
+        return artifact
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else default_artifact_dir()
+    path = cache_dir / (key + ARTIFACT_SUFFIX)
+    artifact = _read_artifact(path, key)
+    if artifact is not None:
+        return artifact
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with open(cache_dir / (key + ".lock"), "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        # another process may have compiled it while this one waited for the lock
+        artifact = _read_artifact(path, key)
+        if artifact is None:
+            artifact = compile_contract(contract_path, contract_name, solc_version)
+            _write_artifact(path, key, *artifact)
+    return artifact
+
+
+def bundled_artifact_path(contract_path: str | os.PathLike[str]) -> Path:
+    return Path(contract_path).with_suffix(ARTIFACT_SUFFIX)
+
+
+def bundle_artifact(contract_path: str | os.PathLike[str], contract_name: str, solc_version: str) -> Path:
+    """
+    Writes the compiled contract next to its source, to be committed along with it
+    """
+    abi, bytecode = load_compiled_contract(contract_path, contract_name, solc_version)
+    path = bundled_artifact_path(contract_path)
+    _write_artifact(path, artifact_key(contract_path, contract_name, solc_version), abi, bytecode)
+    return path
+
+
+def is_bundled(contract_path: str | os.PathLike[str], contract_name: str, solc_version: str) -> bool:
+    """
+    Whether the artifact next to the source matches the current source and solc version
+    """
+    key = artifact_key(contract_path, contract_name, solc_version)
+    return _read_artifact(bundled_artifact_path(contract_path), key) is not None
+
+
+def compile_contract(contract_path: str | os.PathLike[str], contract_name: str, solc_version: str) -> tuple[Any, str]:
+    install_solc(solc_version)
+
+    compiled_sol: dict[str, dict[Literal["abi", "bin"], Any]] = compile_files(
+        [str(contract_path)],
+        output_values=["abi", "bin"],
+        solc_version=solc_version,
+    )
+
+    compiled_contract = compiled_sol[str(contract_path) + ":" + contract_name]
+
+    abi: Optional[Any] = compiled_contract["abi"]
+    bytecode: Optional[str] = compiled_contract["bin"]
+
+    assert abi is not None
+    assert bytecode is not None
+
+    return abi, bytecode
+
+
+def _read_artifact(path: Path, key: str) -> Optional[tuple[Any, str]]:
+    try:
+        artifact = json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        # a corrupt artifact is a miss too, and a cached one gets overwritten once compiled again
+        return None
+    if artifact.get("key") != key:
+        return None
+    return artifact["abi"], artifact["bytecode"]
+
+
+def _write_artifact(path: Path, key: str, abi: Any, bytecode: str) -> None:
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps({"key": key, "abi": abi, "bytecode": bytecode}))
+    os.replace(tmp_path, path)
@@ -1,14 +1,15 @@
-from typing import Protocol, Self
+from typing import NamedTuple, Protocol, Self
 
 from eth_typing import ChecksumAddress
 
-from tlp_lib.protocols import GCTLP_Encrypted_Message, TLP_Digest, TLP_Digests
+from tlp_lib.protocols import GCTLP_Encrypted_Message, GCTLP_Encrypted_Messages, TLP_Digest, TLP_Digests
 
 SC_Coins = list[int]
 SC_UpperBounds = list[int]
 SC_ExtraTime = list[float]
 SC_Solution = tuple[GCTLP_Encrypted_Message, TLP_Digest, int]
 SC_Solutions = list[SC_Solution]
+SC_CacheStats = NamedTuple("SC_CacheStats", [("hits", int), ("misses", int)])
 
 
 class SCInterface(Protocol):
@@ -24,10 +25,14 @@ class SCInterface(Protocol):
 
     def add_solution(self, solution: GCTLP_Encrypted_Message, witness: TLP_Digest) -> None: ...
 
+    def add_solutions(self, solutions: GCTLP_Encrypted_Messages, witnesses: TLP_Digests, /) -> None: ...
+
     def get_message_at(self, i: int, /) -> GCTLP_Encrypted_Message: ...
 
     def pay(self, i: int, /) -> None: ...
 
+    def pay_many(self, indices: list[int], /) -> None: ...
+
     def pay_back(self, i: int, /) -> None: ...
 
     def switch_to_account(self, account: int, /) -> None: ...
@@ -38,6 +43,15 @@ class SCInterface(Protocol):
 
     def get_upper_bound_at(self, i: int, /) -> int: ...
 
+    def get_commitments_range(self, start: int, count: int, /) -> TLP_Digests: ...
+
+    def get_upper_bounds_range(self, start: int, count: int, /) -> SC_UpperBounds: ...
+
+    def get_solutions_range(self, start: int, count: int, /) -> SC_Solutions: ...
+
+    @property
+    def amount_of_puzzle_parts(self) -> int: ...
+
     @property
     def upper_bounds(self) -> SC_UpperBounds: ...
 
@@ -58,3 +72,60 @@ class SCInterface(Protocol):
 
     @property
     def initial_timestamp(self) -> int: ...
+
+
+class AsyncSCInterface(Protocol):
+    """
+    SCInterface for asyncio, with the properties as coroutine methods
+    """
+
+    async def initiate(
+        self,
+        coins: SC_Coins,
+        start_time: int,
+        extra_time: SC_ExtraTime,
+        upper_bounds: SC_UpperBounds,
+        helper_id: int | ChecksumAddress,
+    ) -> Self: ...
+
+    async def add_solution(self, solution: GCTLP_Encrypted_Message, witness: TLP_Digest) -> None: ...
+
+    async def add_solutions(self, solutions: GCTLP_Encrypted_Messages, witnesses: TLP_Digests, /) -> None: ...
+
+    async def get_message_at(self, i: int, /) -> GCTLP_Encrypted_Message: ...
+
+    async def pay(self, i: int, /) -> None: ...
+
+    async def pay_many(self, indices: list[int], /) -> None: ...
+
+    async def pay_back(self, i: int, /) -> None: ...
+
+    async def switch_to_account(self, account: int, /) -> None: ...
+
+    async def get_commitment_at(self, i: int, /) -> TLP_Digest: ...
+
+    async def get_solution_at(self, i: int, /) -> SC_Solution: ...
+
+    async def get_upper_bound_at(self, i: int, /) -> int: ...
+
+    async def get_commitments_range(self, start: int, count: int, /) -> TLP_Digests: ...
+
+    async def get_upper_bounds_range(self, start: int, count: int, /) -> SC_UpperBounds: ...
+
+    async def get_solutions_range(self, start: int, count: int, /) -> SC_Solutions: ...
+
+    async def amount_of_puzzle_parts(self) -> int: ...
+
+    async def upper_bounds(self) -> SC_UpperBounds: ...
+
+    async def coins(self) -> SC_Coins: ...
+
+    async def start_time(self) -> int: ...
+
+    async def commitments(self) -> TLP_Digests: ...
+
+    async def set_commitments(self, commitments: TLP_Digests, /) -> None: ...
+
+    async def solutions(self) -> SC_Solutions: ...
+
+    async def initial_timestamp(self) -> int: ...
@@ -0,0 +1,125 @@
+import io
+import os
+import struct
+from collections.abc import Generator
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from tlp_lib.wrappers.protocols import Reader, Writer
+
+KEY_LENGTH = 32
+NONCE_LENGTH = 12
+TAG_LENGTH = 16
+STREAM_CHUNK_SIZE = 1 << 20
+_STREAM_PREFIX_LENGTH = 7
+
+_STREAM_HEADER = struct.Struct(">7sI")  # nonce prefix, chunk size
+_STREAM_NONCE = struct.Struct(">7sIB")  # nonce prefix, chunk counter, last chunk flag
+
+
+def _read_exact(src: Reader, size: int) -> bytes:
+    data = src.read(size)
+    if len(data) == size or not data:
+        return data
+    buffer = bytearray(data)
+    while len(buffer) < size and (data := src.read(size - len(buffer))):
+        buffer += data
+    return bytes(buffer)
+
+
+def _read_chunks(src: Reader, trailer: bytes, chunk_size: int) -> Generator[bytes | bytearray, None, None]:
+    # yields full chunks of src followed by trailer, then a final chunk that is always shorter than chunk_size
+    buffer = bytearray()
+    for source in (src, io.BytesIO(trailer)):
+        while data := source.read(chunk_size - len(buffer)):
+            if not buffer and len(data) == chunk_size:
+                yield data
+                continue
+            buffer += data
+            if len(buffer) == chunk_size:
+                yield buffer
+                buffer = bytearray()
+    yield buffer
+
+
+class AESGCMWrapper:
+    """
+    AES-256-GCM with binary output: a 12 byte nonce followed by the ciphertext and 16 byte tag.
+    Keys are 256 bit ints.
+
+    The stream methods encrypt payloads of any size in chunks of `chunk_size` bytes, following the STREAM
+    construction: each chunk is sealed with a nonce made of a random prefix, its position and whether it is the
+    last chunk, so chunks can't be reordered, dropped or truncated without decryption failing
+    """
+
+    @staticmethod
+    def generate_key() -> int:
+        key = AESGCM.generate_key(KEY_LENGTH * 8)
+        key_int = int.from_bytes(key, "big")
+        return key_int
+
+    @staticmethod
+    def __get_sym_cipher(key_int: int) -> AESGCM:
+        key_bytes = int.to_bytes(key_int, length=KEY_LENGTH, byteorder="big")
+        return AESGCM(key_bytes)
+
+    @classmethod
+    def encrypt(cls, key_int: int, message: bytes) -> bytes:
+        cipher = cls.__get_sym_cipher(key_int)
+        nonce = os.urandom(NONCE_LENGTH)
+        return nonce + cipher.encrypt(nonce, message, None)
+
+    @classmethod
+    def decrypt(cls, key_int: int, encrypted_message: bytes) -> bytes:
+        cipher = cls.__get_sym_cipher(key_int)
+        return cipher.decrypt(encrypted_message[:NONCE_LENGTH], encrypted_message[NONCE_LENGTH:], None)
+
+    @classmethod
+    def encrypt_stream(
+        cls, key_int: int, src: Reader, dst: Writer, trailer: bytes = b"", chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> None:
+        """
+        Encrypts everything read from `src` followed by `trailer` to `dst`
+        """
+        cipher = cls.__get_sym_cipher(key_int)
+        prefix = os.urandom(_STREAM_PREFIX_LENGTH)
+        dst.write(_STREAM_HEADER.pack(prefix, chunk_size))
+        for counter, chunk in enumerate(_read_chunks(src, trailer, chunk_size)):
+            nonce = _STREAM_NONCE.pack(prefix, counter, len(chunk) < chunk_size)
+            dst.write(cipher.encrypt(nonce, chunk, None))
+
+    @classmethod
+    def decrypt_stream(cls, key_int: int, src: Reader, dst: Writer, tail_length: int = 0) -> bytes:
+        """
+        Decrypts everything read from `src` to `dst`, except the last `tail_length` bytes, which are returned
+        """
+        cipher = cls.__get_sym_cipher(key_int)
+        prefix, chunk_size = _STREAM_HEADER.unpack(_read_exact(src, _STREAM_HEADER.size))
+        block_size = chunk_size + TAG_LENGTH
+
+        tail = bytearray()
+        counter = 0
+        while True:
+            block = _read_exact(src, block_size)
+            last = len(block) < block_size
+            chunk = memoryview(cipher.decrypt(_STREAM_NONCE.pack(prefix, counter, last), block, None))
+
+            # hold back the last tail_length bytes seen so far
+            if len(chunk) >= tail_length:
+                split = len(chunk) - tail_length
+                dst.write(tail)
+                dst.write(chunk[:split])
+                tail = bytearray(chunk[split:])
+            else:
+                tail += chunk
+                if (excess := len(tail) - tail_length) > 0:
+                    dst.write(tail[:excess])
+                    del tail[:excess]
+
+            if last:
+                break
+            counter += 1
+
+        if len(tail) < tail_length:
+            raise ValueError("encrypted stream is shorter than its tail")
+        return bytes(tail)
@@ -0,0 +1,78 @@
+import queue
+import threading
+from collections.abc import Iterable
+from typing import Self
+
+DEFAULT_DEPTH = 2
+_POLL_SECONDS = 0.1
+
+
+class _Done:
+    pass
+
+
+class BackgroundIterator[T]:
+    """
+    Consumes `items` on a daemon thread, staying at most `depth` items ahead of the consumer, and yields them in
+    order. An exception raised by `items` is re-raised to the consumer once the items before it are taken.
+    Closing stops the thread after the item it is working on and closes `items` if it is a generator
+    """
+
+    def __init__(self, items: Iterable[T], depth: int = DEFAULT_DEPTH):
+        if depth < 1:
+            raise ValueError("depth must be greater than 0")
+        self._items = items
+        self._queue: queue.Queue[T | BaseException | _Done] = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __iter__(self) -> Self:
+        return self
+
+    def __next__(self) -> T:
+        if self._finished:
+            raise StopIteration
+        item = self._queue.get()
+        if isinstance(item, _Done):
+            self._finished = True
+            raise StopIteration
+        if isinstance(item, BaseException):
+            self._finished = True
+            raise item
+        return item
+
+    def close(self) -> None:
+        self._finished = True
+        self._stop.set()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        iterator = iter(self._items)
+        try:
+            for item in iterator:
+                if not self._put(item):
+                    return
+        except BaseException as e:
+            self._put(e)
+        else:
+            self._put(_Done())
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def _put(self, item: T | BaseException | _Done) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                pass
+        return False
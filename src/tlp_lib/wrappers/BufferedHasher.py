@@ -0,0 +1,25 @@
+from collections.abc import Buffer
+
+from tlp_lib.wrappers.protocols import Hasher, HashFunc, IncrementalHashFunc
+
+
+class BufferedHasher:
+    """
+    Hasher for a hash function without `new`: the data is collected and digested in one call at the end
+    """
+
+    def __init__(self, hash_func: HashFunc):
+        self.hash_func = hash_func
+        self._parts: list[bytes] = []
+
+    def update(self, data: Buffer, /) -> None:
+        self._parts.append(bytes(data))
+
+    def digest(self) -> bytes:
+        return self.hash_func.digest(b"".join(self._parts))
+
+
+def new_hasher(hash_func: HashFunc) -> Hasher:
+    if isinstance(hash_func, IncrementalHashFunc):
+        return hash_func.new()
+    return BufferedHasher(hash_func)
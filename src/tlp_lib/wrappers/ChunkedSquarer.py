@@ -0,0 +1,38 @@
+from collections.abc import Callable
+from typing import Optional
+
+import gmpy2
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+class ChunkedSquarer:
+    """
+    Computes r^(2^t) mod n by handing blocks of `chunk_size` squarings to GMP in a single powmod call,
+    keeping the interpreter out of the inner loop. The GIL is released during each call, so other threads keep
+    running while a chunk is squared
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be greater than 0")
+        self.chunk_size = chunk_size
+        self._chunk_exponent = gmpy2.mpz(1) << chunk_size
+
+    def square(self, r: int, t: int, n: int, on_chunk: Optional[Callable[[int, int], None]] = None) -> int:
+        chunks, remainder = divmod(t, self.chunk_size)
+        exponent = self._chunk_exponent
+        r = gmpy2.mpz(r)
+        with gmpy2.context(gmpy2.get_context(), allow_release_gil=True):
+            if on_chunk is None:
+                for _ in range(chunks):
+                    r = gmpy2.powmod(r, exponent, n)
+            else:
+                for i in range(1, chunks + 1):
+                    r = gmpy2.powmod(r, exponent, n)
+                    on_chunk(i * self.chunk_size, r)
+            if remainder:
+                r = gmpy2.powmod(r, gmpy2.mpz(1) << remainder, n)
+                if on_chunk is not None:
+                    on_chunk(t, r)
+        return r
@@ -0,0 +1,97 @@
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Optional
+
+import gmpy2
+
+from tlp_lib.wrappers.protocols import Checkpoint
+
+_MAGIC = b"TLPC"
+_VERSION = 1
+_HEADER = struct.Struct(">4sBQQI")  # magic, version, index, squarings, length of r
+
+
+class FileCheckpointer:
+    """
+    Persists the solving state to `path` every `every_squarings` squarings or `every_seconds` seconds,
+    whichever comes first. Files are written to a temporary sibling and moved into place, so a crash mid-write
+    leaves the previous checkpoint intact
+    """
+
+    def __init__(self, path: str | os.PathLike[str], *, every_squarings: int = 0, every_seconds: float = 60):
+        if every_squarings <= 0 and every_seconds <= 0:
+            raise ValueError("either every_squarings or every_seconds must be greater than 0")
+        self.path = Path(path)
+        self.every_squarings = every_squarings
+        self.every_seconds = every_seconds
+        self._state: Optional[Checkpoint] = None
+        self._loaded = False
+        self._pending = 0
+        self._last_save = time.monotonic()
+
+    def load(self) -> Optional[Checkpoint]:
+        if not self._loaded:
+            self._state = self._read()
+            self._loaded = True
+        return self._state
+
+    def update(self, index: int, r: int, squarings: int) -> None:
+        state = self._state
+        if state is not None and state.index == index:
+            self._pending += squarings - state.squarings
+        else:
+            self._pending += squarings
+        self._state = Checkpoint(index, r, squarings)
+        self._loaded = True
+
+        if (self.every_squarings > 0 and self._pending >= self.every_squarings) or (
+            self.every_seconds > 0 and time.monotonic() - self._last_save >= self.every_seconds
+        ):
+            self.save()
+
+    def save(self) -> None:
+        if self._state is None:
+            return
+        index, r, squarings = self._state
+        r_bytes = gmpy2.mpz(r).to_bytes((r.bit_length() + 7) // 8)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, index, squarings, len(r_bytes)) + r_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        _fsync_dir(self.path.parent)
+        self._pending = 0
+        self._last_save = time.monotonic()
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+        self._state = None
+        self._pending = 0
+
+    def _read(self) -> Optional[Checkpoint]:
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return None
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{self.path} is not a valid checkpoint file")
+        magic, version, index, squarings, len_r = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION or len(data) != _HEADER.size + len_r:
+            raise ValueError(f"{self.path} is not a valid checkpoint file")
+        r = gmpy2.mpz.from_bytes(data[_HEADER.size :])
+        return Checkpoint(index, r, squarings)
+
+
+def _fsync_dir(path: Path) -> None:
+    # makes the rename durable; directories can't be opened for syncing on Windows
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,62 @@
+from collections.abc import Sequence
+
+import gmpy2
+
+DEFAULT_WINDOW = 4
+
+
+class FixedBasePow:
+    """
+    Computes base^e mod modulus for many exponents with the same base.
+    Single exponents use a windowed table of base^(d * 2^(j * window)), so each costs one multiplication per
+    window instead of a square per bit. Batches are computed once per distinct exponent, in sorted order, each
+    from the previous result
+    """
+
+    def __init__(self, base: int, modulus: int, window: int = DEFAULT_WINDOW):
+        if window < 1:
+            raise ValueError("window must be greater than 0")
+        self.base = gmpy2.mpz(base) % modulus
+        self.modulus = gmpy2.mpz(modulus)
+        self.window = window
+        self._mask = (1 << window) - 1
+        self._table: list[list[gmpy2.mpz]] = []
+
+    def pow(self, e: int) -> int:
+        result = gmpy2.mpz(1) % self.modulus
+        j = 0
+        while e:
+            d = e & self._mask
+            if d:
+                result = result * self._row(j)[d] % self.modulus
+            e >>= self.window
+            j += 1
+        return result
+
+    def pow_many(self, exponents: Sequence[int]) -> list[int]:
+        # multiplying by 2^delta is a shift; worth it while the shifted value stays near the size of the modulus
+        shift_limit = self.modulus.bit_length() if self.base == 2 else 0
+
+        powers: dict[int, int] = {}
+        prev_e, prev = 0, gmpy2.mpz(1) % self.modulus
+        for e in sorted(set(exponents)):
+            delta = e - prev_e
+            if delta <= shift_limit:
+                prev = (prev << delta) % self.modulus
+            else:
+                prev = prev * self.pow(delta) % self.modulus
+            prev_e = e
+            powers[e] = prev
+        return [powers[e] for e in exponents]
+
+    def _row(self, j: int) -> list[gmpy2.mpz]:
+        while len(self._table) <= j:
+            if self._table:
+                row_base = gmpy2.powmod(self._table[-1][1], 1 << self.window, self.modulus)
+            else:
+                row_base = self.base
+            row = [gmpy2.mpz(1) % self.modulus]
+            for _ in range(self._mask):
+                row.append(row[-1] * row_base % self.modulus)
+            self._table.append(row)
+        return self._table[j]
@@ -0,0 +1,16 @@
+from tlp_lib.wrappers.protocols import Hasher, Reader
+
+
+class HashingReader:
+    """
+    Passes reads through from `src`, feeding everything read to `hasher`
+    """
+
+    def __init__(self, src: Reader, hasher: Hasher):
+        self.src = src
+        self.hasher = hasher
+
+    def read(self, size: int = -1, /) -> bytes:
+        data = self.src.read(size)
+        self.hasher.update(data)
+        return data
@@ -0,0 +1,66 @@
+import threading
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional, Self
+
+from tlp_lib.wrappers.protocols import RSAKeyGen
+from tlp_lib.wrappers.RsaWrapper import rsa_gen_key
+
+type Modulus = tuple[int, int, int, int]
+
+
+class ModulusPool:
+    """
+    Keeps `size` fresh moduli per keysize generated ahead of time on background worker processes and can be used
+    as a `gen_modulus` callable. Each modulus is handed out once and immediately replaced by a new one; a call only
+    blocks if none are ready yet. `gen_modulus` must be picklable, so seeded generators are not supported
+    """
+
+    def __init__(
+        self,
+        gen_modulus: RSAKeyGen = rsa_gen_key,
+        *,
+        size: int = 4,
+        keysizes: Iterable[int] = (2048,),
+        workers: Optional[int] = None,
+    ):
+        if size < 1:
+            raise ValueError("size must be greater than 0")
+        self.gen_modulus = gen_modulus
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._executor = ProcessPoolExecutor(workers)
+        self._lock = threading.Lock()
+        self._pending: dict[int, deque[Future[Modulus]]] = {}
+        for keysize in keysizes:
+            self._fill(keysize)
+
+    def __call__(self, *, keysize: int = 2048) -> Modulus:
+        with self._lock:
+            self._fill(keysize)
+            pending = self._pending[keysize]
+            future = next((f for f in pending if f.done()), None)
+            if future is None:
+                self.misses += 1
+                future = pending[0]
+            else:
+                self.hits += 1
+            pending.remove(future)
+            self._fill(keysize)
+        return future.result()
+
+    def close(self) -> None:
+        self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def _fill(self, keysize: int) -> None:
+        pending = self._pending.setdefault(keysize, deque())
+        while len(pending) < self.size:
+            pending.append(self._executor.submit(self.gen_modulus, keysize=keysize))
@@ -0,0 +1,21 @@
+from collections.abc import Callable
+from typing import Optional
+
+from tlp_lib.wrappers.ChunkedSquarer import DEFAULT_CHUNK_SIZE
+
+
+class NaiveSquarer:
+    @staticmethod
+    def square(r: int, t: int, n: int, on_chunk: Optional[Callable[[int, int], None]] = None) -> int:
+        if on_chunk is None:
+            for _ in range(t):
+                r = r**2 % n
+            return r
+
+        done = 0
+        while done < t:
+            for _ in range(min(DEFAULT_CHUNK_SIZE, t - done)):
+                r = r**2 % n
+            done = min(done + DEFAULT_CHUNK_SIZE, t)
+            on_chunk(done, r)
+        return r
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections.abc import Callable
+from typing import Optional
+
+from tlp_lib.wrappers.protocols import Progress
+
+DEFAULT_REPORT_INTERVAL = 1 << 22  # squarings
+
+
+class SolveCancelled(Exception):
+    message = "Solve was cancelled"
+
+
+class CancellationToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class ProgressMonitor:
+    """
+    Tracks squarings done during a solve and reports the rate and estimated time left to `callback`
+    every `every_squarings` squarings. The token is checked after every chunk of squarings; once it is
+    cancelled the solve raises SolveCancelled
+    """
+
+    def __init__(
+        self,
+        callback: Optional[Callable[[Progress], None]] = None,
+        *,
+        token: Optional[CancellationToken] = None,
+        every_squarings: int = DEFAULT_REPORT_INTERVAL,
+    ):
+        self.callback = callback
+        self.token = token
+        self.every_squarings = every_squarings
+        self.running = False
+        self.total = 0
+        self.squarings = 0
+        self._pending = 0
+        self._start = 0.0
+
+    def begin(self, total: int) -> None:
+        self.running = True
+        self.total = total
+        self.squarings = 0
+        self._pending = 0
+        self._start = time.monotonic()
+
+    def advance(self, index: int, squarings: int) -> None:
+        if self.token is not None and self.token.cancelled:
+            raise SolveCancelled
+        self.squarings += squarings
+        self._pending += squarings
+        if self.callback is not None and self._pending >= self.every_squarings:
+            self._pending = 0
+            self.callback(self.progress(index))
+
+    def finish(self) -> None:
+        self.running = False
+
+    def progress(self, index: int) -> Progress:
+        elapsed = time.monotonic() - self._start
+        rate = self.squarings / elapsed if elapsed > 0 else 0.0
+        if rate > 0 and self.total > 0:
+            seconds_left = max(self.total - self.squarings, 0) / rate
+        else:
+            seconds_left = float("inf")  # total of 0 means the number of squarings isn't known
+        return Progress(index, self.squarings, self.total, rate, seconds_left)
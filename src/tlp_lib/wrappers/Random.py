@@ -1,12 +1,25 @@
+import hashlib
+import itertools
 import random
 import secrets
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 
 import gmpy2
 
+SUBSTREAM_BLOCK_SIZE = 1024
+
+
+def _gen_random_generators_mod_n(seed: int, n: int, count: int) -> list[int]:
+    rand = Random(seed=seed)
+    return [rand.gen_random_generator_mod_n(n) for _ in range(count)]
+
 
 class Random:
-    def __init__(self, *, seed: Optional[int] = None):
+    def __init__(self, *, seed: Optional[int] = None, workers: int = 1):
+        self.seed = seed
+        self.workers = workers
+        self._substreams = 0
         if seed is not None:
             self.random_state = gmpy2.random_state(seed)
             self.rand = random.Random(seed)
@@ -21,6 +34,23 @@ class Random:
                 break
         return r
 
+    def gen_random_generators_mod_n(self, n: int, count: int) -> list[int]:
+        """
+        Draws `count` generators from substreams of SUBSTREAM_BLOCK_SIZE generators each, seeded from this
+        instance's seed and the block's position, so the output for a seed doesn't depend on the number of workers
+        """
+        call = self._substreams
+        self._substreams += 1
+        sizes = [min(SUBSTREAM_BLOCK_SIZE, count - i) for i in range(0, count, SUBSTREAM_BLOCK_SIZE)]
+        seeds = [self._substream_seed(call, block) for block in range(len(sizes))]
+
+        if self.workers > 1 and len(sizes) > 1:
+            with ProcessPoolExecutor(min(self.workers, len(sizes))) as executor:
+                blocks = list(executor.map(_gen_random_generators_mod_n, seeds, itertools.repeat(n), sizes))
+        else:
+            blocks = list(map(_gen_random_generators_mod_n, seeds, itertools.repeat(n), sizes))
+        return list(itertools.chain.from_iterable(blocks))
+
     def gen_random_prime(self, bits: int) -> int:
         p = gmpy2.mpz_urandomb(self.random_state, bits)
         p |= 1 << (bits // 2 - 1)
@@ -29,3 +59,13 @@ class Random:
 
     def gen_random_bytes(self, length: int) -> bytes:
         return self.rand.randbytes(length)
+
+    def gen_random_bytes_many(self, length: int, count: int) -> list[bytes]:
+        data = self.rand.randbytes(length * count)
+        return [data[i : i + length] for i in range(0, length * count, length)]
+
+    def _substream_seed(self, *key: int) -> int:
+        if self.seed is None:
+            return secrets.randbits(128)
+        digest = hashlib.sha256("/".join(map(str, (self.seed, *key))).encode()).digest()
+        return int.from_bytes(digest[:16])
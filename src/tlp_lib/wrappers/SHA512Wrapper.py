@@ -1,6 +1,7 @@
+import hashlib
 from typing import ClassVar
 
-from cryptography.hazmat.primitives import hashes
+from tlp_lib.wrappers.protocols import Hasher
 
 
 class SHA512Wrapper:
@@ -8,6 +9,8 @@ class SHA512Wrapper:
 
     @staticmethod
     def digest(message: bytes) -> bytes:
-        digest = hashes.Hash(hashes.SHA512())
-        digest.update(message)
-        return digest.finalize()
+        return hashlib.sha512(message).digest()
+
+    @staticmethod
+    def new() -> Hasher:
+        return hashlib.sha512()
@@ -1,4 +1,17 @@
+from tlp_lib.wrappers.AESGCMWrapper import AESGCMWrapper as AESGCMWrapper
+from tlp_lib.wrappers.BackgroundIterator import BackgroundIterator as BackgroundIterator
+from tlp_lib.wrappers.BufferedHasher import BufferedHasher as BufferedHasher
+from tlp_lib.wrappers.BufferedHasher import new_hasher as new_hasher
+from tlp_lib.wrappers.ChunkedSquarer import ChunkedSquarer as ChunkedSquarer
 from tlp_lib.wrappers.FernetWrapper import FernetWrapper as FernetWrapper
+from tlp_lib.wrappers.FileCheckpointer import FileCheckpointer as FileCheckpointer
+from tlp_lib.wrappers.FixedBasePow import FixedBasePow as FixedBasePow
+from tlp_lib.wrappers.HashingReader import HashingReader as HashingReader
+from tlp_lib.wrappers.ModulusPool import ModulusPool as ModulusPool
+from tlp_lib.wrappers.NaiveSquarer import NaiveSquarer as NaiveSquarer
+from tlp_lib.wrappers.ProgressMonitor import CancellationToken as CancellationToken
+from tlp_lib.wrappers.ProgressMonitor import ProgressMonitor as ProgressMonitor
+from tlp_lib.wrappers.ProgressMonitor import SolveCancelled as SolveCancelled
 from tlp_lib.wrappers.Random import Random as Random
 from tlp_lib.wrappers.RsaWrapper import rsa_gen_key as rsa_gen_key
 from tlp_lib.wrappers.SeededRSA import SeededRSA as SeededRSA
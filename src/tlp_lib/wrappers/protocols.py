@@ -1,4 +1,19 @@
-from typing import Protocol
+from collections.abc import Buffer, Callable
+from typing import NamedTuple, Optional, Protocol, runtime_checkable
+
+
+class Reader(Protocol):
+    def read(self, size: int = -1, /) -> bytes: ...
+
+
+class Writer(Protocol):
+    def write(self, data: Buffer, /) -> int: ...
+
+
+class Hasher(Protocol):
+    def update(self, data: Buffer, /) -> None: ...
+
+    def digest(self) -> bytes: ...
 
 
 class HashFunc(Protocol):
@@ -7,6 +22,11 @@ class HashFunc(Protocol):
     def digest(self, message: bytes) -> bytes: ...
 
 
+@runtime_checkable
+class IncrementalHashFunc(HashFunc, Protocol):
+    def new(self) -> Hasher: ...
+
+
 class SymEnc(Protocol):
     def generate_key(self) -> int: ...
 
@@ -15,15 +35,58 @@ class SymEnc(Protocol):
     def decrypt(self, key_int: int, encrypted_message: bytes) -> bytes: ...
 
 
+class StreamEnc(SymEnc, Protocol):
+    def encrypt_stream(self, key_int: int, src: Reader, dst: Writer, trailer: bytes = b"") -> None: ...
+
+    def decrypt_stream(self, key_int: int, src: Reader, dst: Writer, tail_length: int = 0) -> bytes: ...
+
+
 class RandGenModN(Protocol):
     def gen_random_generator_mod_n(self, n: int) -> int: ...
 
 
 class RandGen(RandGenModN, Protocol):
+    def gen_random_generators_mod_n(self, n: int, count: int) -> list[int]: ...
+
     def gen_random_prime(self, bits: int) -> int: ...
 
     def gen_random_bytes(self, length: int) -> bytes: ...
 
+    def gen_random_bytes_many(self, length: int, count: int) -> list[bytes]: ...
+
 
 class RSAKeyGen(Protocol):
     def __call__(self, *, keysize: int) -> tuple[int, int, int, int]: ...
+
+
+class Squarer(Protocol):
+    def square(self, r: int, t: int, n: int, on_chunk: Optional[Callable[[int, int], None]] = None) -> int: ...
+
+
+Checkpoint = NamedTuple("Checkpoint", [("index", int), ("r", int), ("squarings", int)])
+
+
+class Checkpointer(Protocol):
+    def load(self) -> Optional[Checkpoint]: ...
+
+    def update(self, index: int, r: int, squarings: int) -> None: ...
+
+    def save(self) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+Progress = NamedTuple(
+    "Progress",
+    [("index", int), ("squarings", int), ("total", int), ("rate", float), ("seconds_left", float)],
+)
+
+
+class ProgressTracker(Protocol):
+    running: bool
+
+    def begin(self, total: int) -> None: ...
+
+    def advance(self, index: int, squarings: int) -> None: ...
+
+    def finish(self) -> None: ...
@@ -0,0 +1,148 @@
+import asyncio
+import time
+from unittest.mock import Mock, call
+
+import pytest
+
+from tlp_lib import AsyncEDTLP
+from tlp_lib.EDTLP import CoinException
+from tlp_lib.protocols import Server_Info
+from tlp_lib.smartcontracts import AsyncMockSC, MockSC
+from tlp_lib.wrappers import ChunkedSquarer
+
+
+async def _run_edtlp(messages: list[bytes], latency: float = 0, squarings: int = 1) -> list[bytes]:
+    intervals = [1] * len(messages)
+    server_info = Server_Info(squarings=squarings)
+    edtlp = AsyncEDTLP(smart_contract=AsyncMockSC(latency=latency))
+
+    csk = edtlp.client_setup()
+    encrypted_messages, start_time = edtlp.client_delegation(messages, csk)
+    _, sc = await edtlp.server_delegation(intervals, server_info, [1] * len(messages), start_time, 1, keysize=1024)
+    pk, sk = await edtlp.helper_setup(intervals, squarings, keysize=1024)
+    puzz_list = await edtlp.helper_generate(encrypted_messages, pk, sk, start_time, sc)
+
+    async for m, d in edtlp.solve(sc, server_info, pk, puzz_list, 1):
+        await edtlp.register(sc, m, d)
+    for i in range(len(messages)):
+        await edtlp.verify(sc, i)
+    await edtlp.pay_many(sc)
+    return [await edtlp.retrieve(sc, csk, i) for i in range(len(messages))]
+
+
+@pytest.mark.parametrize("messages", [[b""], [b"test1"], [b"test1", b"test2", b"test3"]])
+def test_async_edtlp(messages: list[bytes]):
+    assert asyncio.run(_run_edtlp(messages)) == messages
+
+
+@pytest.mark.parametrize("squarings", [1, 20_000])
+def test_async_edtlp_concurrent(squarings: int):
+    instances = [[f"instance {i} part {j}".encode() for j in range(2)] for i in range(8)]
+
+    async def run_all() -> list[list[bytes]]:
+        return await asyncio.gather(*(_run_edtlp(messages, 0.01, squarings) for messages in instances))
+
+    assert asyncio.run(run_all()) == instances
+
+
+def test_async_edtlp_solve_loop_latency():
+    # each instance is squared in a single powmod call of a few hundred milliseconds, the loop must keep running
+    squarings = 500_000
+    messages = [b"test1", b"test2"]
+    intervals = [1] * len(messages)
+    server_info = Server_Info(squarings=squarings)
+    edtlp = AsyncEDTLP(squarer=ChunkedSquarer(1 << 20))
+
+    async def tick(done: asyncio.Event) -> list[float]:
+        gaps: list[float] = []
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+        return gaps
+
+    async def run() -> tuple[float, list[float]]:
+        csk = edtlp.client_setup()
+        encrypted_messages, start_time = edtlp.client_delegation(messages, csk)
+        _, sc = await edtlp.server_delegation(intervals, server_info, [1, 1], start_time, 1, keysize=1024)
+        pk, sk = await edtlp.helper_setup(intervals, squarings, keysize=1024)
+        puzz_list = await edtlp.helper_generate(encrypted_messages, pk, sk, start_time, sc)
+
+        done = asyncio.Event()
+        ticker = asyncio.create_task(tick(done))
+        start = time.perf_counter()
+        solutions = [solution async for solution in edtlp.solve(sc, server_info, pk, puzz_list, 1)]
+        seconds = time.perf_counter() - start
+        done.set()
+        assert len(solutions) == len(messages)
+        return seconds, await ticker
+
+    seconds, gaps = asyncio.run(run())
+    assert seconds > 0.1
+    assert len(gaps) > 10 and max(gaps) < 0.1
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 5])
+def test_async_edtlp_verify_all(page_size: int):
+    messages = [b"test1", b"test2", b"test3", b"test4", b"test5"]
+    intervals = [1] * len(messages)
+    server_info = Server_Info(squarings=1)
+    edtlp = AsyncEDTLP(smart_contract=AsyncMockSC(MockSC()))
+
+    async def run() -> None:
+        csk = edtlp.client_setup()
+        encrypted_messages, start_time = edtlp.client_delegation(messages, csk)
+        _, sc = await edtlp.server_delegation(intervals, server_info, [1] * len(messages), start_time, 1)
+        pk, sk = await edtlp.helper_setup(intervals, 1)
+        puzz_list = await edtlp.helper_generate(encrypted_messages, pk, sk, start_time, sc)
+
+        solutions = [solution async for solution in edtlp.solve(sc, server_info, pk, puzz_list, 1)]
+        await edtlp.register_many(sc, solutions[:-1])
+        assert await edtlp.verify_all(sc, page_size) == [4]
+
+        await edtlp.register(sc, *solutions[-1])
+        assert await edtlp.verify_all(sc, page_size) == []
+        assert [m async for m in edtlp.retrieve_all(sc, csk, page_size)] == messages
+
+    asyncio.run(run())
+
+
+def test_async_edtlp_pay_many_failed(monkeypatch: pytest.MonkeyPatch):
+    messages = [b"test1", b"test2", b"test3", b"test4", b"test5"]
+    intervals = [1] * len(messages)
+    server_info = Server_Info(squarings=1)
+    mock = MockSC()
+    edtlp = AsyncEDTLP(smart_contract=AsyncMockSC(mock))
+
+    async def run() -> Mock:
+        csk = edtlp.client_setup()
+        encrypted_messages, start_time = edtlp.client_delegation(messages, csk)
+        _, sc = await edtlp.server_delegation(intervals, server_info, [1] * len(messages), start_time, 1)
+        pk, sk = await edtlp.helper_setup(intervals, 1)
+        puzz_list = await edtlp.helper_generate(encrypted_messages, pk, sk, start_time, sc)
+        await edtlp.register_many(sc, [solution async for solution in edtlp.solve(sc, server_info, pk, puzz_list, 1)])
+
+        mock.solutions[2] = (mock.solutions[2][0], b"", mock.solutions[2][2])
+        calls = Mock()
+        for name in ["pay_many", "pay_back"]:
+            method = Mock(wraps=getattr(mock, name))
+            monkeypatch.setattr(mock, name, method)
+            calls.attach_mock(method, name)
+        await edtlp.pay_many(sc)
+        return calls
+
+    assert asyncio.run(run()).mock_calls == [call.pay_many([0, 1, 3, 4]), call.pay_back(2)]
+
+
+def test_async_edtlp_too_few_coins():
+    edtlp = AsyncEDTLP()
+
+    async def run() -> None:
+        _, sc = await edtlp.server_delegation([1], Server_Info(1), [0], 0, 1, squarings_upper_bound=1)
+        async for _ in edtlp.solve(sc, Server_Info(1), (), [], 1):  # type: ignore
+            ...
+
+    with pytest.raises(CoinException):
+        asyncio.run(run())
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+from typing import Any, cast
+
+import pytest
+from eth_tester import EthereumTester, PyEVMBackend
+from web3 import AsyncWeb3
+from web3.providers.eth_tester import AsyncEthereumTesterProvider
+
+from tlp_lib.smartcontracts import AsyncEthereumSC
+from tlp_lib.smartcontracts.EthereumSC import ContractStatus, TransactionException
+
+# pay(i) stops if i is 0 and reverts otherwise
+_PAY_ABI = [{
+    "type": "function",
+    "name": "pay",
+    "inputs": [{"name": "i", "type": "uint256"}],
+    "outputs": [],
+    "stateMutability": "nonpayable",
+}]
+_PAY_BYTECODE = "0x600c80600b6000396000f3" + "600435600757005b600080fd"
+
+
+def test_async_ethereum_sc_pipeline():
+    async def run() -> None:
+        provider = AsyncEthereumTesterProvider()
+        provider.ethereum_tester = EthereumTester(backend=PyEVMBackend())
+        web3 = AsyncWeb3(provider)
+        contracts = [AsyncEthereumSC(web3=web3) for _ in range(3)]
+        for sc in contracts:
+            await sc.switch_to_account(0)
+            tx_hash = (
+                await web3.eth.contract(abi=_PAY_ABI, bytecode=_PAY_BYTECODE)
+                .constructor()
+                .transact({"from": sc.account})
+            )
+            receipt = await web3.eth.wait_for_transaction_receipt(tx_hash)
+            setattr(sc, "_contract", web3.eth.contract(address=receipt["contractAddress"], abi=_PAY_ABI))
+        account = contracts[0].account
+        sent = await web3.eth.get_transaction_count(account)
+
+        async def pay(sc: AsyncEthereumSC, indices: list[int]) -> None:
+            async with sc.pipeline():
+                for i in indices:
+                    await sc.pay(i)
+
+        # contracts sharing an account send concurrently, each transaction with its own locally counted nonce
+        await asyncio.gather(*(pay(sc, [0, 0]) for sc in contracts))
+        assert await web3.eth.get_transaction_count(account) == sent + 6
+        await asyncio.gather(*(sc.pay(0) for sc in contracts for _ in range(2)))
+        assert await web3.eth.get_transaction_count(account) == sent + 12
+
+        with pytest.raises(TransactionException) as e:
+            await pay(contracts[0], [1, 0, 1, 0])
+        assert e.value.failed == [0, 2]
+        assert await web3.eth.get_transaction_count(account) == sent + 14
+
+        count, _, calldata_bytes, seconds = contracts[0].stats.transactions["pay"]
+        assert (count, calldata_bytes) == (6, 6 * (4 + 32))
+        assert seconds > 0
+
+    asyncio.run(run())
+
+
+_SET_COMMITMENTS_ABI = [{
+    "type": "function",
+    "name": "setCommitments",
+    "inputs": [{"name": "_commitments", "type": "bytes[]"}, {"name": "startIndex", "type": "uint256"}],
+    "outputs": [],
+    "stateMutability": "nonpayable",
+}]
+# reverts unless startIndex is the number of commitments set so far, and expands memory to 32 times its calldata
+_DEPENDENT_QUADRATIC_BYTECODE = (
+    "0x602580600b6000396000f3" + "60243560005414600e57600080fd5b6004356004013560005401600055" + "6000366020025200"
+)
+
+
+def test_async_ethereum_sc_dependent_batches_out_of_gas(caplog: pytest.LogCaptureFixture):
+    async def run() -> None:
+        params = cast(
+            dict[str, Any],
+            PyEVMBackend.generate_genesis_params(  # pyright: ignore[reportUnknownMemberType]
+                overrides={"gas_limit": 200_000}
+            ),
+        )
+        provider = AsyncEthereumTesterProvider()
+        provider.ethereum_tester = EthereumTester(backend=PyEVMBackend(genesis_parameters=params))
+        web3 = AsyncWeb3(provider)
+        sc = AsyncEthereumSC(web3=web3)
+        await sc.switch_to_account(0)
+        tx_hash = (
+            await web3.eth.contract(abi=_SET_COMMITMENTS_ABI, bytecode=_DEPENDENT_QUADRATIC_BYTECODE)
+            .constructor()
+            .transact({"from": sc.account})
+        )
+        receipt = await web3.eth.wait_for_transaction_receipt(tx_hash)
+        address = receipt["contractAddress"]
+        setattr(sc, "_contract", web3.eth.contract(address=address, abi=_SET_COMMITMENTS_ABI))
+        setattr(sc, "_SC_BATCH_GAS_FRACTION", 1)
+        setattr(sc, "_SC_DEPENDENT_GAS_MARGIN", 1)
+        setattr(sc, "_SC_PUZZLE_BATCH_SIZE", 40)
+
+        commitments = [bytes([i + 1]) * 64 for i in range(100)]
+        with caplog.at_level(logging.INFO):
+            await sc.set_commitments(commitments)
+        assert "ran out of gas" in caplog.text
+        assert address is not None
+        assert await web3.eth.get_storage_at(address, 0) == len(commitments).to_bytes(32)
+
+    asyncio.run(run())
+
+
+def test_async_contract_batches():
+    # deploys SmartContract.sol itself
+    parts = 40
+
+    async def run() -> None:
+        sc = AsyncEthereumSC()
+        setattr(sc, "_SC_PUZZLE_BATCH_SIZE", 8)
+        await sc.switch_to_account(1)
+        helper_id = sc.account
+        await sc.switch_to_account(0)
+        await sc.initiate([10**15] * parts, 0, [0] * parts, list(range(1, parts + 1)), helper_id)
+        assert sc.stats.transactions["initialize"].count > 1
+        assert await sc.coins() == [10**15] * parts
+        assert await sc.upper_bounds() == list(range(1, parts + 1))
+        assert await sc.amount_of_puzzle_parts() == parts
+
+        # each batch of commitments is sent before the one before it is mined
+        await sc.switch_to_account(1)
+        commitments = [bytes([i + 1]) * 16 for i in range(parts)]
+        await sc.set_commitments(commitments)
+        assert sc.stats.transactions["setCommitments"].count > 1
+        assert await sc.commitments() == commitments
+        assert await sc.status() == ContractStatus.SOLVING
+
+    asyncio.run(run())
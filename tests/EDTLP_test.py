@@ -1,12 +1,12 @@
 import math
-from typing import Literal
-from unittest.mock import Mock
+from typing import Literal, Optional
+from unittest.mock import Mock, call
 
 import pytest
 
 from tlp_lib import EDTLP, custom_extra_delay
-from tlp_lib.consts import SQUARINGS_PER_SEC_UPPER_BOUND
-from tlp_lib.EDTLP import CoinException, UpperBoundException
+from tlp_lib.consts import SC_PAY_GAS, SC_TX_GAS, SQUARINGS_PER_SEC_UPPER_BOUND
+from tlp_lib.EDTLP import CoinException, UpperBoundException, solution_gas
 from tlp_lib.protocols import Server_Info
 from tlp_lib.smartcontracts import EthereumSC, MockSC
 from tlp_lib.smartcontracts.protocols import SCInterface
@@ -147,3 +147,93 @@ def test_edtlp(keysize: Literal[1024, 2048], messages: list[bytes], intervals: l
         edtlp.pay(sc, i)
         m = edtlp.retrieve(sc, csk, i)
         assert m == message
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 5])
+@pytest.mark.parametrize("sc", [MockSC(), EthereumSC()])
+def test_edtlp_many(monkeypatch: pytest.MonkeyPatch, batch_size: int, sc: SCInterface):
+    messages = [b"test1", b"test2", b"test3", b"test4", b"test5"]
+    intervals = [1] * len(messages)
+    edtlp = EDTLP(smart_contract=sc)
+
+    csk = edtlp.client_setup()
+    encrypted_messages, start_time = edtlp.client_delegation(messages, csk)
+    if isinstance(sc, EthereumSC):
+        sc.switch_to_account(1)
+        helper_id = sc.account
+    else:
+        helper_id = 1
+    sc.switch_to_account(0)
+    _, sc = edtlp.server_delegation(intervals, Server_Info(squarings=1), [1] * len(messages), start_time, helper_id)
+    sc.switch_to_account(1)
+    pk, sk = edtlp.helper_setup(intervals, 1)
+    puzz_list = edtlp.helper_generate(encrypted_messages, pk, sk, start_time, sc)
+
+    sc.switch_to_account(2)
+    solutions = list(edtlp.solve(sc, Server_Info(squarings=1), pk, puzz_list, 1))
+    add_solutions = Mock(wraps=sc.add_solutions)
+    pay_many = Mock(wraps=sc.pay_many)
+    monkeypatch.setattr(sc, "add_solutions", add_solutions)
+    monkeypatch.setattr(sc, "pay_many", pay_many)
+
+    edtlp.register_many(sc, solutions, gas_budget=SC_TX_GAS + batch_size * solution_gas(*solutions[0]))
+    sc.switch_to_account(0)
+    edtlp.pay_many(sc, range(len(messages)), gas_budget=SC_TX_GAS + batch_size * SC_PAY_GAS)
+    assert add_solutions.call_count == pay_many.call_count == math.ceil(len(messages) / batch_size)
+    assert [i for call in pay_many.call_args_list for i in call.args[0]] == list(range(len(messages)))
+    for i, message in enumerate(messages):
+        assert edtlp.retrieve(sc, csk, i) == message
+
+
+@pytest.mark.parametrize("indices", [None, range(5)])
+def test_edtlp_pay_many_failed(monkeypatch: pytest.MonkeyPatch, indices: Optional[range]):
+    messages = [b"test1", b"test2", b"test3", b"test4", b"test5"]
+    intervals = [1] * len(messages)
+    sc = MockSC()
+    edtlp = EDTLP(smart_contract=sc)
+
+    csk = edtlp.client_setup()
+    encrypted_messages, start_time = edtlp.client_delegation(messages, csk)
+    _, sc = edtlp.server_delegation(intervals, Server_Info(squarings=1), [1] * len(messages), start_time, 1)
+    pk, sk = edtlp.helper_setup(intervals, 1)
+    puzz_list = edtlp.helper_generate(encrypted_messages, pk, sk, start_time, sc)
+    edtlp.register_many(sc, edtlp.solve(sc, Server_Info(squarings=1), pk, puzz_list, 1))
+
+    assert isinstance(sc, MockSC)
+    sc.solutions[2] = (sc.solutions[2][0], b"", sc.solutions[2][2])
+    calls = Mock()
+    for name in ["pay_many", "pay_back"]:
+        method = Mock(wraps=getattr(sc, name))
+        monkeypatch.setattr(sc, name, method)
+        calls.attach_mock(method, name)
+
+    # paying back drains the contract, so it comes after the payouts
+    edtlp.pay_many(sc, indices)
+    assert calls.mock_calls == [call.pay_many([0, 1, 3, 4]), call.pay_back(2)]
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 5, 10])
+def test_edtlp_verify_all(page_size: int):
+    messages = [b"test1", b"test2", b"test3", b"test4", b"test5"]
+    intervals = [1] * len(messages)
+    sc = MockSC()
+    edtlp = EDTLP(smart_contract=sc)
+
+    csk = edtlp.client_setup()
+    encrypted_messages, start_time = edtlp.client_delegation(messages, csk)
+    _, sc = edtlp.server_delegation(intervals, Server_Info(squarings=1), [1] * len(messages), start_time, 1)
+    pk, sk = edtlp.helper_setup(intervals, 1)
+    puzz_list = edtlp.helper_generate(encrypted_messages, pk, sk, start_time, sc)
+
+    solutions = list(edtlp.solve(sc, Server_Info(squarings=1), pk, puzz_list, 1))
+    edtlp.register_many(sc, solutions[:-1])
+    assert edtlp.verify_all(sc, page_size) == [4]
+
+    edtlp.register(sc, *solutions[-1])
+    assert edtlp.verify_all(sc, page_size) == []
+    assert list(edtlp.retrieve_all(sc, csk, page_size)) == messages
+
+    assert isinstance(sc, MockSC)
+    sc.solutions[1] = (sc.solutions[1][0], b"", sc.solutions[1][2])
+    sc.upper_bounds[3] = 0
+    assert edtlp.verify_all(sc, page_size) == [1, 3]
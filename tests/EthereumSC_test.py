@@ -0,0 +1,382 @@
+import logging
+import random
+from typing import Any, cast
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import pytest
+from eth_tester import EthereumTester, PyEVMBackend
+from eth_tester.exceptions import TransactionFailed
+from web3 import EthereumTesterProvider, Web3
+from web3.contract import Contract  # pyright: ignore[reportPrivateImportUsage]
+from web3.exceptions import ContractLogicError
+
+from tlp_lib.consts import SC_PAY_GAS, SC_TX_GAS
+from tlp_lib.EDTLP import solution_gas
+from tlp_lib.smartcontracts import EthereumSC
+from tlp_lib.smartcontracts.BatchSizer import BatchSizer
+from tlp_lib.smartcontracts.EthereumSC import ContractStatus, TransactionException
+from tlp_lib.smartcontracts.protocols import SC_CacheStats
+
+
+def _mock_contract(status: ContractStatus) -> MagicMock:
+    contract = MagicMock()
+    functions = contract.functions
+    functions.contractStatus.return_value.call.return_value = status
+    functions.coins.return_value.call.return_value = [1, 1]
+    functions.commitments.return_value.call.return_value = [b"c0", b"c1"]
+    functions.getSolutionAt.return_value.call.return_value = [b"", b"", 0]
+    return contract
+
+
+def _ethereum_sc(contract: MagicMock) -> tuple[EthereumSC, PyEVMBackend]:
+    backend = PyEVMBackend()
+    sc = EthereumSC(web3=Web3(EthereumTesterProvider(ethereum_tester=EthereumTester(backend=backend))))
+    setattr(sc, "_contract", contract)
+    return sc, backend
+
+
+def test_ethereum_sc_cache_phases():
+    contract = _mock_contract(ContractStatus.SETTING_COMMITMENTS)
+    sc, backend = _ethereum_sc(contract)
+    functions = contract.functions
+
+    # immutable once commitments are being set
+    assert sc.coins == [1, 1]
+    backend.mine_blocks(1)
+    assert sc.coins == [1, 1]
+    assert functions.coins.return_value.call.call_count == 1
+
+    # commitments only become immutable once solving starts
+    assert sc.commitments == [b"c0", b"c1"]
+    assert sc.commitments == [b"c0", b"c1"]
+    assert functions.commitments.return_value.call.call_count == 1
+    backend.mine_blocks(1)
+    assert sc.commitments == [b"c0", b"c1"]
+    assert functions.commitments.return_value.call.call_count == 2
+
+    functions.contractStatus.return_value.call.return_value = ContractStatus.SOLVING
+    backend.mine_blocks(1)
+    assert sc.status == ContractStatus.SOLVING
+    assert sc.commitments == [b"c0", b"c1"]
+    backend.mine_blocks(1)
+    assert sc.commitments == [b"c0", b"c1"]
+    assert sc.status == ContractStatus.SOLVING
+    assert functions.commitments.return_value.call.call_count == 3
+    assert functions.contractStatus.return_value.call.call_count == 4
+
+
+def test_ethereum_sc_cache_solutions():
+    contract = _mock_contract(ContractStatus.SOLVING)
+    sc, backend = _ethereum_sc(contract)
+    call = contract.functions.getSolutionAt.return_value.call
+
+    # an unsolved part is only cached within a block
+    assert sc.get_solution_at(0) == [b"", b"", 0]
+    assert sc.get_solution_at(0) == [b"", b"", 0]
+    assert call.call_count == 1
+    backend.mine_blocks(1)
+    call.return_value = [b"m", b"d", 1]
+    assert sc.get_solution_at(0) == [b"m", b"d", 1]
+    assert call.call_count == 2
+
+    # a solved part can't change anymore
+    backend.mine_blocks(1)
+    assert sc.get_message_at(0) == b"m"
+    assert call.call_count == 2
+
+    hits, misses = sc.cache_stats
+    assert misses == call.call_count
+    assert hits > 0
+
+    sc.clear_cache()
+    assert sc.get_solution_at(0) == [b"m", b"d", 1]
+    assert call.call_count == 3
+    assert sc.cache_stats == SC_CacheStats(hits, misses + 1)
+
+
+def test_ethereum_sc_cache_status_once_per_block():
+    contract = _mock_contract(ContractStatus.SETTING_COMMITMENTS)
+    sc, _ = _ethereum_sc(contract)
+    functions = contract.functions
+
+    with patch.object(type(sc.web3.eth), "block_number", new_callable=PropertyMock, return_value=1) as block_number:
+        # the block number is fetched once per read, and the status it is checked against once per block
+        assert sc.commitments == [b"c0", b"c1"]
+        assert sc.coins == [1, 1]
+        assert block_number.call_count == 2
+        assert functions.contractStatus.return_value.call.call_count == 1
+
+        block_number.return_value = 2
+        assert sc.commitments == [b"c0", b"c1"]
+        assert block_number.call_count == 3
+        assert functions.contractStatus.return_value.call.call_count == 2
+
+
+# pay(i) stops if i is 0 and reverts otherwise
+_PAY_ABI = [{
+    "type": "function",
+    "name": "pay",
+    "inputs": [{"name": "i", "type": "uint256"}],
+    "outputs": [],
+    "stateMutability": "nonpayable",
+}]
+_PAY_BYTECODE = "0x600c80600b6000396000f3" + "600435600757005b600080fd"
+
+
+def test_ethereum_sc_pipeline():
+    backend = PyEVMBackend()
+    web3 = Web3(EthereumTesterProvider(ethereum_tester=EthereumTester(backend=backend)))
+    sc = EthereumSC(web3=web3)
+    sc.switch_to_account(0)
+    receipt = web3.eth.wait_for_transaction_receipt(
+        web3.eth.contract(abi=_PAY_ABI, bytecode=_PAY_BYTECODE).constructor().transact({"from": sc.account})
+    )
+    setattr(sc, "_contract", web3.eth.contract(address=receipt["contractAddress"], abi=_PAY_ABI))
+    sent = web3.eth.get_transaction_count(sc.account)
+
+    # the base fee is only checked before the first transaction of a pipeline
+    with patch.object(sc, "_gas_fee_control") as gas_fee_control, sc.pipeline():
+        for _ in range(3):
+            sc.pay(0)
+    assert web3.eth.get_transaction_count(sc.account) == sent + 3
+    assert gas_fee_control.call_count == 1
+
+    with pytest.raises(TransactionException) as e:
+        with sc.pipeline():
+            for i in [1, 0, 0, 1, 0]:
+                sc.pay(i)
+    assert e.value.failed == [0, 3]
+    assert web3.eth.get_transaction_count(sc.account) == sent + 6
+
+    # rejected transactions were never sent, so only the others are recorded
+    count, gas_used, calldata_bytes, seconds = sc.stats.transactions["pay"]
+    assert (count, calldata_bytes) == (6, 6 * (4 + 32))
+    assert gas_used > 6 * 21_000
+    assert seconds > 0
+    assert sc.stats.transaction_total == sc.stats.transactions["pay"]
+
+
+# setCommitments expands memory to 32 times its calldata size, so its gas grows quadratically with the batch
+_SET_COMMITMENTS_ABI = [{
+    "type": "function",
+    "name": "setCommitments",
+    "inputs": [{"name": "_commitments", "type": "bytes[]"}, {"name": "startIndex", "type": "uint256"}],
+    "outputs": [],
+    "stateMutability": "nonpayable",
+}]
+_SET_COMMITMENTS_BYTECODE = "0x600880600b6000396000f3" + "6000366020025200"
+# setCommitments reverts unless startIndex is the number of commitments set so far, which it then adds to
+_DEPENDENT_BYTECODE = "0x601e80600b6000396000f3" + "60243560005414600e57600080fd5b6004356004013560005401600055" + "00"
+# the dependent setCommitments above, also expanding memory like the first, so later batches need more gas per item
+_DEPENDENT_QUADRATIC_BYTECODE = (
+    "0x602580600b6000396000f3" + "60243560005414600e57600080fd5b6004356004013560005401600055" + "6000366020025200"
+)
+_REVERT_BYTECODE = "0x600580600b6000396000f3" + "600080fd00"
+_BLOCK_GAS_LIMIT = 200_000
+
+
+def _set_commitments_sc(bytecode: str) -> tuple[EthereumSC, Web3, Contract | type[Contract]]:
+    params = cast(
+        dict[str, Any],
+        PyEVMBackend.generate_genesis_params(  # pyright: ignore[reportUnknownMemberType]
+            overrides={"gas_limit": _BLOCK_GAS_LIMIT}
+        ),
+    )
+    web3 = Web3(EthereumTesterProvider(ethereum_tester=EthereumTester(backend=PyEVMBackend(genesis_parameters=params))))
+    sc = EthereumSC(web3=web3)
+    sc.switch_to_account(0)
+    receipt = web3.eth.wait_for_transaction_receipt(
+        web3.eth.contract(abi=_SET_COMMITMENTS_ABI, bytecode=bytecode).constructor().transact({"from": sc.account})
+    )
+    contract = web3.eth.contract(address=receipt["contractAddress"], abi=_SET_COMMITMENTS_ABI)
+    setattr(sc, "_contract", contract)
+    return sc, web3, contract
+
+
+@pytest.mark.parametrize("gas_fraction", [0.5, 0.001])
+def test_ethereum_sc_adaptive_batches(gas_fraction: float):
+    sc, web3, contract = _set_commitments_sc(_SET_COMMITMENTS_BYTECODE)
+    setattr(sc, "_SC_BATCH_GAS_FRACTION", gas_fraction)
+    first_block = web3.eth.block_number + 1
+
+    # the first batch of all 100 runs out of gas and is split
+    commitments = [i.to_bytes(64) for i in range(100)]
+    sc.commitments = commitments
+
+    sent: list[bytes] = []
+    gas_target = web3.eth.get_block("latest").get("gasLimit", 0) * gas_fraction
+    for block_number in range(first_block, web3.eth.block_number + 1):
+        for tx_hash in web3.eth.get_block(block_number).get("transactions", []):
+            tx = web3.eth.get_transaction(tx_hash)  # pyright: ignore[reportArgumentType]
+            _, args = contract.decode_function_input(tx.get("input", b""))
+            assert args["startIndex"] == len(sent)
+            if len(args["_commitments"]) > 1:
+                assert tx.get("gas", 0) <= gas_target
+            sent.extend(args["_commitments"])
+    assert sent == commitments
+
+
+def test_ethereum_sc_dependent_batches():
+    sc, web3, contract = _set_commitments_sc(_DEPENDENT_BYTECODE)
+    setattr(sc, "_SC_BATCH_GAS_FRACTION", 0.35)
+    sent = web3.eth.get_transaction_count(sc.account)
+
+    # only the first batch is estimated, the others would revert until the one before them is mined
+    commitments = [bytes([i + 1]) * 64 for i in range(100)]
+    with patch.object(web3.eth, "estimate_gas", wraps=web3.eth.estimate_gas) as estimate_gas:
+        sc.commitments = commitments
+    assert web3.eth.get_transaction_count(sc.account) - sent > 1
+    for call in estimate_gas.call_args_list:
+        _, args = contract.decode_function_input(call.args[0]["data"])
+        assert args["startIndex"] == 0
+    assert web3.eth.get_storage_at(contract.address, 0) == len(commitments).to_bytes(32)
+
+
+def test_ethereum_sc_dependent_batches_out_of_gas(caplog: pytest.LogCaptureFixture):
+    sc, web3, contract = _set_commitments_sc(_DEPENDENT_QUADRATIC_BYTECODE)
+    setattr(sc, "_SC_BATCH_GAS_FRACTION", 1)
+    setattr(sc, "_SC_DEPENDENT_GAS_MARGIN", 1)
+    setattr(sc, "_SC_PUZZLE_BATCH_SIZE", 40)
+
+    # later batches are sent with the gas per item of the first, so a larger one runs out and is split
+    commitments = [bytes([i + 1]) * 64 for i in range(100)]
+    with caplog.at_level(logging.INFO):
+        sc.commitments = commitments
+    assert "ran out of gas" in caplog.text
+    assert web3.eth.get_storage_at(contract.address, 0) == len(commitments).to_bytes(32)
+
+
+def test_ethereum_sc_batches_revert(caplog: pytest.LogCaptureFixture):
+    sc, _, _ = _set_commitments_sc(_REVERT_BYTECODE)
+
+    # a batch that reverts is not split, as it would revert at any size
+    with caplog.at_level(logging.INFO), pytest.raises((ContractLogicError, TransactionFailed)):
+        sc.commitments = [i.to_bytes(64) for i in range(100)]
+    assert "splitting" not in caplog.text
+
+
+# the tests below deploy SmartContract.sol itself
+_COIN = 10**15
+
+
+def _solving_sc(parts: int) -> EthereumSC:
+    """
+    The contract with `parts` parts owned by account 0, their commitments set by helper account 1, for account 2
+    """
+    sc = EthereumSC()
+    sc.switch_to_account(1)
+    helper_id = sc.account
+    sc.switch_to_account(0)
+    sc.initiate([_COIN] * parts, 0, [0] * parts, [10**9] * parts, helper_id)
+    sc.switch_to_account(1)
+    sc.commitments = [bytes([i + 1]) * 16 for i in range(parts)]
+    sc.switch_to_account(2)
+    return sc
+
+
+def _solutions(parts: int) -> tuple[list[bytes], list[bytes]]:
+    # sized like GCTLP's: a Fernet token of a short message and a 16 byte digest
+    rand = random.Random(1234)
+    return [rand.randbytes(100) for _ in range(parts)], [rand.randbytes(16) for _ in range(parts)]
+
+
+def test_contract_add_solutions():
+    sc = _solving_sc(5)
+    solutions, witnesses = _solutions(5)
+
+    with pytest.raises((ContractLogicError, TransactionFailed)):
+        sc.add_solutions(solutions[:2], witnesses[:1])
+    sc.add_solutions(solutions[:2], witnesses[:2])
+    sc.add_solution(solutions[2], witnesses[2])
+    sc.add_solutions(solutions[3:], witnesses[3:])
+    assert [(m, d) for m, d, _ in sc.solutions] == list(zip(solutions, witnesses))
+    assert all(timestamp >= sc.initial_timestamp for _, _, timestamp in sc.solutions)
+
+    # every part is solved
+    with pytest.raises((ContractLogicError, TransactionFailed)):
+        sc.add_solutions(solutions[:1], witnesses[:1])
+
+
+def test_contract_pay_many():
+    sc = _solving_sc(5)
+    contract: Contract = getattr(sc, "_contract")
+    sc.add_solutions(*_solutions(5))
+    solver = sc.account
+
+    with pytest.raises((ContractLogicError, TransactionFailed)):
+        sc.pay_many([0])
+    balance = sc.web3.eth.get_balance(solver)
+    sc.switch_to_account(0)
+    sc.pay_many([0, 2, 3])
+    assert sc.web3.eth.get_balance(solver) - balance == 3 * _COIN
+
+    # one part already paid out reverts the whole batch
+    with pytest.raises((ContractLogicError, TransactionFailed)):
+        sc.pay_many([1, 2])
+    sc.pay_many([1])
+    assert sc.web3.eth.get_balance(solver) - balance == 4 * _COIN
+    sc.pay_back(4)
+    assert sc.web3.eth.get_balance(contract.address) == 0
+
+
+def test_contract_batch_gas():
+    sc = _solving_sc(20)
+    contract: Contract = getattr(sc, "_contract")
+    solutions, witnesses = _solutions(20)
+
+    # the first batch also writes the solution counter from zero
+    for batch in [range(0, 1), range(1, 11), range(11, 20)]:
+        m, d = [solutions[i] for i in batch], [witnesses[i] for i in batch]
+        estimate = contract.functions.addSolutions(m, d).estimate_gas({"from": sc.account})
+        predicted = SC_TX_GAS + sum(map(solution_gas, m, d))
+        assert estimate <= predicted <= 1.2 * estimate
+        sc.add_solutions(m, d)
+
+    sc.switch_to_account(0)
+    for indices in [[0], list(range(1, 20))]:
+        estimate = contract.functions.payMany(indices).estimate_gas({"from": sc.account})
+        predicted = SC_TX_GAS + len(indices) * SC_PAY_GAS
+        assert estimate <= predicted <= 2 * estimate
+        sc.pay_many(indices)
+
+
+def test_contract_ranges():
+    sc = _solving_sc(5)
+    solutions, witnesses = _solutions(5)
+    sc.add_solutions(solutions[:3], witnesses[:3])
+    commitments = [bytes([i + 1]) * 16 for i in range(5)]
+
+    for start, count in [(0, 2), (3, 10), (4, 2**256 - 1), (2, 0), (5, 1)]:
+        end = min(start + count, 5)
+        assert sc.get_commitments_range(start, count) == commitments[start:end]
+        assert sc.get_upper_bounds_range(start, count) == [10**9] * (end - start)
+        assert [(m, d) for m, d, _ in sc.get_solutions_range(start, count)] == [
+            (solutions[i], witnesses[i]) if i < 3 else (b"", b"") for i in range(start, end)
+        ]
+    assert [timestamp > 0 for _, _, timestamp in sc.get_solutions_range(1, 4)] == [True, True, False, False]
+
+    for read in [sc.get_commitments_range, sc.get_upper_bounds_range, sc.get_solutions_range]:
+        with pytest.raises((ContractLogicError, TransactionFailed)):
+            read(6, 1)
+
+
+def test_batch_sizer():
+    sizer = BatchSizer(8, 100, 1000)
+    assert not sizer.fits(8, 2000) and sizer.size == 4
+    sizer.start_pipeline()
+    sizer.sent(0, 0, 4, 500)
+    assert sizer.size == 8
+    sizer.sent(1, 4, 8, 1000)
+    sizer.sent(2, 12, 8, 1000)
+
+    # a failure the sizer didn't send, or followed by a success, isn't resent
+    assert sizer.resend([1, 3], [1]) is None
+    assert sizer.resend([1], [1]) is None
+    assert sizer.resend([1, 2], [2]) is None
+    assert sizer.resend([1, 2], [1]) == (4, 8)
+    assert sizer.sizes == [4] and sizer.size == 4
+
+    # later batches stay below the one that ran out
+    sizer.start_pipeline()
+    sizer.sent(0, 4, 4, 100)
+    assert sizer.size == 7
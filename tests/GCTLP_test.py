@@ -1,8 +1,23 @@
+import io
+from collections.abc import Iterator
+from pathlib import Path
 from typing import Literal
 
+import gmpy2
 import pytest
 
 from tlp_lib import GCTLP
+from tlp_lib.protocols import TLP_Puzzle
+from tlp_lib.wrappers import (
+    CancellationToken,
+    ChunkedSquarer,
+    FileCheckpointer,
+    FixedBasePow,
+    ProgressMonitor,
+    SeededRSA,
+    SolveCancelled,
+)
+from tlp_lib.wrappers.protocols import Progress
 
 
 @pytest.mark.parametrize("keysize", [1024, 2048])
@@ -23,3 +38,155 @@ def test_gctlp(keysize: Literal[1024, 2048], messages: list[bytes], intervals: l
     for i, (m, d) in enumerate(s):
         assert m == messages[i]
         gctlp.verify(m, d, hash_list[i])
+
+
+def test_gctlp_resume(tmp_path: Path):
+    messages = [b"test1", b"test2", b"test3"]
+    gctlp = GCTLP(seed=1234, squarer=ChunkedSquarer(16))
+    pk, sk = gctlp.setup([1, 2, 1], 100, keysize=1024)
+    puzz_list, _ = gctlp.generate(messages, pk, sk)
+    path = tmp_path / "checkpoint"
+
+    s = gctlp.solve(pk, puzz_list, FileCheckpointer(path, every_squarings=1))
+    assert next(s)[0] == messages[0]
+    assert next(s)[0] == messages[1]
+    s.close()
+
+    checkpointer = FileCheckpointer(path)
+    state = checkpointer.load()
+    assert state is not None and state.index == 1
+    assert [m for m, _ in gctlp.solve(pk, puzz_list, checkpointer)] == messages[1:]
+    assert not path.exists()
+
+
+def test_gctlp_progress():
+    reports: list[Progress] = []
+    messages = [b"test1", b"test2", b"test3"]
+    gctlp = GCTLP(seed=1234, squarer=ChunkedSquarer(16))
+    pk, sk = gctlp.setup([1, 2, 1], 100, keysize=1024)
+    puzz_list, _ = gctlp.generate(messages, pk, sk)
+
+    progress = ProgressMonitor(reports.append, every_squarings=1)
+    assert [m for m, _ in gctlp.solve(pk, puzz_list, progress=progress)] == messages
+    assert {report.index for report in reports} == {0, 1, 2}
+    assert all(report.total == 400 for report in reports)
+    assert reports[-1].squarings == 400
+
+
+def test_gctlp_resume_progress(tmp_path: Path):
+    class Crash(Exception): ...
+
+    class CrashingCheckpointer(FileCheckpointer):
+        def update(self, index: int, r: int, squarings: int) -> None:
+            super().update(index, r, squarings)
+            if index == 1 and squarings >= 100:
+                raise Crash
+
+    reports: list[Progress] = []
+    messages = [b"test1", b"test2", b"test3"]
+    gctlp = GCTLP(seed=1234, squarer=ChunkedSquarer(16))
+    pk, sk = gctlp.setup([1, 2, 1], 100, keysize=1024)
+    puzz_list, _ = gctlp.generate(messages, pk, sk)
+    path = tmp_path / "checkpoint"
+
+    with pytest.raises(Crash):
+        list(gctlp.solve(pk, puzz_list, CrashingCheckpointer(path, every_squarings=1)))
+
+    progress = ProgressMonitor(reports.append, every_squarings=1)
+    assert [m for m, _ in gctlp.solve(pk, puzz_list, FileCheckpointer(path), progress)] == messages[1:]
+    # 112 of the 200 squarings of instance 1 were checkpointed
+    assert all(report.total == 188 for report in reports)
+    assert reports[-1].squarings == 188
+
+
+def test_gctlp_solve_pipelined():
+    reports: list[Progress] = []
+    messages = [b"test1", b"test2", b"test3"]
+    gctlp = GCTLP(seed=1234, squarer=ChunkedSquarer(16))
+    pk, sk = gctlp.setup([1, 2, 1], 100, keysize=1024)
+    puzz_list, hash_list = gctlp.generate(messages, pk, sk)
+
+    progress = ProgressMonitor(reports.append, every_squarings=1)
+    solved = list(gctlp.solve_pipelined(pk, puzz_list, progress=progress, h=hash_list))
+    assert solved == list(gctlp.solve(pk, puzz_list))
+    assert [m for m, _ in solved] == messages
+    assert reports[-1].squarings == 400
+    assert not progress.running
+
+
+def test_gctlp_solve_pipelined_cancel():
+    gctlp = GCTLP(seed=1234, squarer=ChunkedSquarer(16))
+    pk, sk = gctlp.setup([1, 2, 1], 100, keysize=1024)
+    puzz_list, _ = gctlp.generate([b"test1", b"test2", b"test3"], pk, sk)
+
+    token = CancellationToken()
+    progress = ProgressMonitor(
+        lambda report: token.cancel() if report.index == 1 else None, token=token, every_squarings=1
+    )
+    with pytest.raises(SolveCancelled):
+        list(gctlp.solve_pipelined(pk, puzz_list, progress=progress))
+
+
+@pytest.mark.parametrize("base", [2, 3])
+@pytest.mark.parametrize("window", [1, 4, 7])
+def test_fixed_base_pow(base: int, window: int):
+    _, _, _, phi_n = SeededRSA(seed=1234).gen_key(keysize=1024)
+    exponents = [0, 1, 5, 5, 100, 99, 2048, 10**6, 10**6 + 3, 10**15, 2**64 + 1, 7]
+    fixed_base = FixedBasePow(base, phi_n, window)
+    expected = [gmpy2.powmod(base, e, phi_n) for e in exponents]
+    assert fixed_base.pow_many(exponents) == expected
+    assert [fixed_base.pow(e) for e in exponents] == expected
+
+
+def test_gctlp_streaming():
+    messages = [b"test1", b"test2", b"", b"test4"]
+    gctlp = GCTLP(seed=1234)
+    pk, sk = gctlp.setup([1, 2, 1, 3], 100, keysize=1024)
+
+    hash_list: list[bytes] = []
+
+    def puzzles() -> Iterator[TLP_Puzzle]:
+        for puzzle, digest in gctlp.generate_iter(iter(messages), pk, sk):
+            hash_list.append(digest)
+            yield puzzle
+
+    for i, (m, d) in enumerate(gctlp.solve(pk, puzzles())):
+        assert m == messages[i]
+        gctlp.verify(m, d, hash_list[i])
+    assert len(hash_list) == len(messages)
+
+    with pytest.raises(ValueError):
+        list(gctlp.generate_iter(iter(messages + [b"extra"]), pk, sk))
+
+
+def test_gctlp_verify_many():
+    messages = [b"test1", b"test2", b"test3"]
+    gctlp = GCTLP(seed=1234)
+    pk, sk = gctlp.setup([1, 2, 1], 1, keysize=1024)
+    puzz_list, hash_list = gctlp.generate(messages, pk, sk)
+
+    assert gctlp.verify_many(gctlp.solve(pk, puzz_list), hash_list, batch_size=2) == []
+    hash_list[2] = bytes(len(hash_list[2]))
+    assert gctlp.verify_many(gctlp.solve(pk, puzz_list), hash_list, batch_size=2) == [2]
+
+
+def test_gctlp_stream(tmp_path: Path):
+    messages = [b"", b"test" * 100_000, bytes(1 << 20)]
+    gctlp = GCTLP(seed=1234)
+    pk, sk = gctlp.setup([1, 2, 1], 1, keysize=1024)
+    paths = [tmp_path / f"puzzle{i}" for i in range(len(messages))]
+
+    files = [(io.BytesIO(m), open(path, "wb")) for m, path in zip(messages, paths)]
+    encrypted_keys, hash_list = zip(*gctlp.generate_stream(files, pk, sk))
+    for _, dst in files:
+        dst.close()
+
+    outputs = [io.BytesIO() for _ in messages]
+    files = [(open(path, "rb"), out) for path, out in zip(paths, outputs)]
+    d = list(gctlp.solve_stream(pk, encrypted_keys, files))
+    for i, m in enumerate(messages):
+        files[i][0].close()
+        assert outputs[i].getvalue() == m
+        outputs[i].seek(0)
+        gctlp.verify_stream(outputs[i], d[i], hash_list[i])
+        gctlp.verify(m, d[i], hash_list[i])
@@ -1,8 +1,18 @@
-from typing import Literal
+import hashlib
+import io
+import itertools
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import ClassVar, Literal
 
 import pytest
 
 from tlp_lib import MITLP
+from tlp_lib.protocols import TLP_Puzzle
+from tlp_lib.wrappers import BackgroundIterator, ChunkedSquarer, FileCheckpointer, ProgressMonitor, Random
+from tlp_lib.wrappers.protocols import Progress
+from tlp_lib.wrappers.Random import SUBSTREAM_BLOCK_SIZE
 
 
 @pytest.mark.parametrize("keysize", [1024, 2048])
@@ -25,3 +35,180 @@ def test_mitlp(keysize: Literal[1024, 2048], messages: list[bytes]):
     for i, (m, d) in enumerate(s):
         assert m == messages[i]
         mitlp.verify(m, d, hash_list[i])
+
+
+def test_mitlp_resume(tmp_path: Path):
+    messages = [b"test1", b"test2", b"test3"]
+    mitlp = MITLP(seed=1234, squarer=ChunkedSquarer(16))
+    pk, sk = mitlp.setup(len(messages), 1, 100, keysize=1024)
+    puzz_list, _ = mitlp.generate(messages, pk, sk)
+    path = tmp_path / "checkpoint"
+
+    s = mitlp.solve(pk, puzz_list, FileCheckpointer(path, every_squarings=1))
+    assert next(s)[0] == messages[0]
+    assert next(s)[0] == messages[1]
+    s.close()
+
+    checkpointer = FileCheckpointer(path)
+    state = checkpointer.load()
+    assert state is not None and state.index == 1
+    assert [m for m, _ in mitlp.solve(pk, puzz_list, checkpointer)] == messages[1:]
+    assert not path.exists()
+
+
+def test_mitlp_resume_progress(tmp_path: Path):
+    class Crash(Exception): ...
+
+    class CrashingCheckpointer(FileCheckpointer):
+        def update(self, index: int, r: int, squarings: int) -> None:
+            super().update(index, r, squarings)
+            if index == 1 and squarings >= 50:
+                raise Crash
+
+    reports: list[Progress] = []
+    messages = [b"test1", b"test2", b"test3"]
+    mitlp = MITLP(seed=1234, squarer=ChunkedSquarer(16))
+    pk, sk = mitlp.setup(len(messages), 1, 100, keysize=1024)
+    puzz_list, _ = mitlp.generate(messages, pk, sk)
+    path = tmp_path / "checkpoint"
+
+    with pytest.raises(Crash):
+        list(mitlp.solve(pk, puzz_list, CrashingCheckpointer(path, every_squarings=1)))
+
+    progress = ProgressMonitor(reports.append, every_squarings=1)
+    assert [m for m, _ in mitlp.solve(pk, puzz_list, FileCheckpointer(path), progress)] == messages[1:]
+    # 64 of the 100 squarings of instance 1 were checkpointed
+    assert all(report.total == 136 for report in reports)
+    assert reports[-1].squarings == 136
+
+
+def test_mitlp_digest_only_hash_func():
+    class DigestOnlySHA512:
+        name: ClassVar[str] = "SHA512"
+
+        @staticmethod
+        def digest(message: bytes) -> bytes:
+            return hashlib.sha512(message).digest()
+
+    messages = [b"test1", b"test2"]
+    mitlp = MITLP(seed=1234, hash_func=DigestOnlySHA512)
+    pk, sk = mitlp.setup(len(messages), 1, 1, keysize=1024)
+    puzz_list, hash_list = mitlp.generate(messages, pk, sk)
+    assert hash_list == MITLP(seed=1234).generate(messages, pk, sk)[1]
+    for i, (m, d) in enumerate(mitlp.solve(pk, puzz_list)):
+        assert m == messages[i]
+        mitlp.verify(m, d, hash_list[i])
+
+
+def test_mitlp_seeded_setup_is_reproducible():
+    z = SUBSTREAM_BLOCK_SIZE + 10
+    pk_1, sk_1 = MITLP(seed=1234).setup(z, 1, 1, keysize=1024)
+    pk_2, sk_2 = MITLP(seed=1234, random=Random(seed=1234, workers=2)).setup(z, 1, 1, keysize=1024)
+    assert pk_1 == pk_2
+    assert sk_1 == sk_2
+    assert len(set(sk_1.r_bin)) == z
+    assert len(set(sk_1.d)) == z
+
+
+def test_mitlp_streaming():
+    messages = [b"test1", b"test2", b"", b"test4"]
+    mitlp = MITLP(seed=1234)
+    pk, sk = mitlp.setup(len(messages), 1, 100, keysize=1024)
+
+    hash_list: list[bytes] = []
+
+    def puzzles() -> Iterator[TLP_Puzzle]:
+        for puzzle, digest in mitlp.generate_iter(iter(messages), pk, sk):
+            hash_list.append(digest)
+            yield puzzle
+
+    for i, (m, d) in enumerate(mitlp.solve(pk, puzzles())):
+        assert m == messages[i]
+        mitlp.verify(m, d, hash_list[i])
+    assert len(hash_list) == len(messages)
+
+    with pytest.raises(ValueError):
+        list(mitlp.generate_iter(iter(messages + [b"extra"]), pk, sk))
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 256])
+@pytest.mark.parametrize("workers", [None, 1, 3])
+def test_mitlp_verify_many(batch_size: int, workers: int | None):
+    messages = [b"test%d" % i for i in range(7)]
+    mitlp = MITLP(seed=1234)
+    pk, sk = mitlp.setup(len(messages), 1, 1, keysize=1024)
+    puzz_list, hash_list = mitlp.generate(messages, pk, sk)
+    solutions = list(mitlp.solve(pk, puzz_list))
+
+    assert mitlp.verify_many(iter(solutions), hash_list, workers=workers, batch_size=batch_size) == []
+
+    hash_list[1] = bytes(len(hash_list[1]))
+    solutions[4] = (b"wrong", solutions[4][1])
+    assert mitlp.verify_many(solutions[:6], hash_list, workers=workers, batch_size=batch_size) == [1, 4, 6]
+
+    with pytest.raises(ValueError):
+        mitlp.verify_many(solutions, hash_list[:6], workers=workers, batch_size=batch_size)
+
+
+def test_mitlp_stream(tmp_path: Path):
+    messages = [b"", b"test" * 100_000, bytes(1 << 20)]
+    mitlp = MITLP(seed=1234)
+    pk, sk = mitlp.setup(len(messages), 1, 1, keysize=1024)
+    paths = [tmp_path / f"puzzle{i}" for i in range(len(messages))]
+
+    files = [(io.BytesIO(m), open(path, "wb")) for m, path in zip(messages, paths)]
+    encrypted_keys, hash_list = zip(*mitlp.generate_stream(files, pk, sk))
+    for _, dst in files:
+        dst.close()
+
+    outputs = [io.BytesIO() for _ in messages]
+    files = [(open(path, "rb"), out) for path, out in zip(paths, outputs)]
+    d = list(mitlp.solve_stream(pk, encrypted_keys, files))
+    for i, m in enumerate(messages):
+        files[i][0].close()
+        assert outputs[i].getvalue() == m
+        outputs[i].seek(0)
+        mitlp.verify_stream(outputs[i], d[i], hash_list[i])
+        mitlp.verify(m, d[i], hash_list[i])
+
+
+@pytest.mark.parametrize("depth", [1, 2, 8])
+def test_mitlp_solve_pipelined(depth: int):
+    messages = [b"test%d" % i for i in range(6)]
+    mitlp = MITLP(seed=1234)
+    pk, sk = mitlp.setup(len(messages), 1, 10, keysize=1024)
+    puzz_list, hash_list = mitlp.generate(messages, pk, sk)
+
+    assert list(mitlp.solve_pipelined(pk, puzz_list, h=hash_list, depth=depth)) == list(mitlp.solve(pk, puzz_list))
+
+    hash_list[3] = bytes(len(hash_list[3]))
+    solved: list[bytes] = []
+    with pytest.raises(AssertionError):
+        for m, _ in mitlp.solve_pipelined(pk, iter(puzz_list), h=hash_list, depth=depth):
+            solved.append(m)
+    assert solved == messages[:3]
+
+
+def test_background_iterator():
+    def items() -> Iterator[int]:
+        yield from range(5)
+        raise ValueError("failed")
+
+    with BackgroundIterator(items(), depth=2) as background:
+        assert next(background) == 0
+        assert list(itertools.islice(background, 4)) == [1, 2, 3, 4]
+        with pytest.raises(ValueError):
+            next(background)
+        assert list(background) == []
+
+    closed = threading.Event()
+
+    def endless() -> Iterator[int]:
+        try:
+            yield from itertools.count()
+        finally:
+            closed.set()
+
+    with BackgroundIterator(endless(), depth=1) as background:
+        assert next(background) == 0
+    assert closed.wait(5)
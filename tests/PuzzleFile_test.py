@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+
+from tlp_lib import GCTLP, MITLP
+from tlp_lib.protocols import GCTLP_Public, MITLP_Public
+from tlp_lib.PuzzleFile import PuzzleFileReader, PuzzleFileWriter
+
+
+@pytest.mark.parametrize("messages", [[b""], [b"test1"], [b"test1", b"test2", b"test3" * 100]])
+def test_gctlp_puzzle_file(tmp_path: Path, messages: list[bytes]):
+    gctlp = GCTLP(seed=1234)
+    pk, sk = gctlp.setup(list(range(1, len(messages) + 1)), 10, keysize=1024)
+    path = tmp_path / "puzzles"
+
+    with PuzzleFileWriter(path, pk) as writer:
+        hash_list = list(writer.write_stream(gctlp.generate_iter(messages, pk, sk)))
+
+    with PuzzleFileReader(path) as reader:
+        assert isinstance(reader.pk, GCTLP_Public)
+        assert reader.pk._replace(t=list(reader.pk.t)) == pk
+        assert len(reader) == len(messages)
+        for i, (m, d) in enumerate(gctlp.solve(reader.pk, reader)):
+            assert m == messages[i]
+            gctlp.verify(m, d, hash_list[i])
+
+
+def test_mitlp_puzzle_file(tmp_path: Path):
+    messages = [b"test1", b"test2", b"test3"]
+    mitlp = MITLP(seed=1234)
+    pk, sk = mitlp.setup(len(messages), 1, 10, keysize=1024)
+    puzz_list, _ = mitlp.generate(messages, pk, sk)
+    path = tmp_path / "puzzles"
+
+    with PuzzleFileWriter(path, pk) as writer:
+        writer.extend(puzz_list)
+
+    with PuzzleFileReader(path) as reader:
+        assert isinstance(reader.pk, MITLP_Public)
+        assert reader.pk == pk
+        assert reader[-1] == puzz_list[-1]
+        assert reader[1:] == puzz_list[1:]
+        assert [m for m, _ in mitlp.solve(reader.pk, reader)] == messages
+
+
+def test_puzzle_file_failed_write(tmp_path: Path):
+    class Failed(Exception): ...
+
+    messages = [b"test1", b"test2", b"test3"]
+    mitlp = MITLP(seed=1234)
+    pk, sk = mitlp.setup(len(messages), 1, 10, keysize=1024)
+    puzz_list, _ = mitlp.generate(messages, pk, sk)
+    path = tmp_path / "puzzles"
+
+    with pytest.raises(Failed), PuzzleFileWriter(path, pk) as writer:
+        writer.write(puzz_list[0])
+        raise Failed
+    assert not path.exists()
@@ -1,9 +1,31 @@
+import io
+import random
+import threading
+import time
+from pathlib import Path
 from typing import Optional
 
+import gmpy2
 import pytest
+from cryptography.exceptions import InvalidTag
 
 from tlp_lib import TLP
-from tlp_lib.wrappers import SeededRSA
+from tlp_lib.protocols import TLP_Public, TLP_Puzzle
+from tlp_lib.TLP import crt_powmod, pack_puzzle, unpack_puzzle
+from tlp_lib.wrappers import (
+    AESGCMWrapper,
+    CancellationToken,
+    ChunkedSquarer,
+    FernetWrapper,
+    FileCheckpointer,
+    ModulusPool,
+    NaiveSquarer,
+    ProgressMonitor,
+    Random,
+    SeededRSA,
+    SolveCancelled,
+)
+from tlp_lib.wrappers.protocols import Progress, SymEnc
 
 
 @pytest.mark.parametrize(
@@ -31,3 +53,210 @@ def test_tlp(message: bytes, seed: Optional[int]):
     if seed is not None:
         assert pk[0] == SeededRSA(seed=seed).gen_key()[0]
     assert m == message
+
+
+@pytest.mark.parametrize("sym_enc", [FernetWrapper, AESGCMWrapper])
+@pytest.mark.parametrize("message", [b"", b"test2", b"test2" * 1000])
+def test_tlp_sym_enc(sym_enc: SymEnc, message: bytes):
+    tlp = TLP(sym_enc=sym_enc)
+
+    pk, sk = tlp.setup(1, 1)
+    p = tlp.generate(pk, sk.a, message)
+    assert tlp.solve(pk, p) == message
+
+
+def test_aesgcm_wrapper():
+    key = AESGCMWrapper.generate_key()
+    encrypted_message = AESGCMWrapper.encrypt(key, b"test")
+    assert len(encrypted_message) == len(b"test") + 28
+    assert encrypted_message != AESGCMWrapper.encrypt(key, b"test")
+    assert AESGCMWrapper.decrypt(key, encrypted_message) == b"test"
+    with pytest.raises(InvalidTag):
+        AESGCMWrapper.decrypt(key + 1, encrypted_message)
+
+
+@pytest.mark.parametrize("size", [0, 1, 15, 16, 17, 48, 100])
+@pytest.mark.parametrize("tail_length", [0, 1, 16, 20])
+def test_aesgcm_wrapper_stream(size: int, tail_length: int):
+    key = AESGCMWrapper.generate_key()
+    message, trailer = random.randbytes(size), random.randbytes(tail_length)
+    encrypted = io.BytesIO()
+    AESGCMWrapper.encrypt_stream(key, io.BytesIO(message), encrypted, trailer, chunk_size=16)
+
+    decrypted = io.BytesIO()
+    tail = AESGCMWrapper.decrypt_stream(key, io.BytesIO(encrypted.getvalue()), decrypted, tail_length)
+    assert decrypted.getvalue() == message
+    assert tail == trailer
+
+    # dropping the final chunk must not go unnoticed
+    with pytest.raises(InvalidTag):
+        truncated = encrypted.getvalue()[: -(len(message + trailer) % 16 + 16)]
+        AESGCMWrapper.decrypt_stream(key, io.BytesIO(truncated), io.BytesIO(), tail_length)
+
+
+def test_tlp_stream():
+    message = random.randbytes(3 << 20)
+    tlp = TLP()
+
+    pk, sk = tlp.setup(1, 1)
+    encrypted = io.BytesIO()
+    encrypted_key = tlp.generate_stream(pk, sk.a, io.BytesIO(message), encrypted, b"trailer")
+    decrypted = io.BytesIO()
+    assert tlp.solve_stream(pk, encrypted_key, io.BytesIO(encrypted.getvalue()), decrypted, 7) == b"trailer"
+    assert decrypted.getvalue() == message
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, 1 << 16])
+@pytest.mark.parametrize("t", [0, 1, 2, 63, 64, 65, 1000])
+def test_chunked_squarer(chunk_size: int, t: int):
+    n, _, _, _ = SeededRSA(seed=1234).gen_key(keysize=1024)
+    r = 0x1234567890ABCDEF
+    assert ChunkedSquarer(chunk_size).square(r, t, n) == NaiveSquarer.square(r, t, n)
+
+
+def test_chunked_squarer_releases_gil():
+    n, _, _, _ = SeededRSA(seed=1234).gen_key(keysize=2048)
+    # a single powmod call of a few hundred milliseconds
+    squarer = ChunkedSquarer(1 << 18)
+    thread = threading.Thread(target=squarer.square, args=(3, 1 << 18, n))
+
+    gaps: list[float] = []
+    thread.start()
+    last = time.perf_counter()
+    while thread.is_alive():
+        time.sleep(0.001)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+    assert len(gaps) > 10 and max(gaps) < 0.1
+
+
+def test_tlp_naive_squarer():
+    tlp = TLP(seed=1234, squarer=NaiveSquarer())
+    pk, sk = tlp.setup(1, 100)
+    p = tlp.generate(pk, sk.a, b"test")
+    assert tlp.solve(pk, p) == b"test"
+    assert TLP(seed=1234).solve(pk, p) == b"test"
+
+
+def test_tlp_resume(tmp_path: Path):
+    class Crash(Exception): ...
+
+    class CrashingCheckpointer(FileCheckpointer):
+        def update(self, index: int, r: int, squarings: int) -> None:
+            super().update(index, r, squarings)
+            if squarings >= 500:
+                raise Crash
+
+    tlp = TLP(seed=1234, squarer=ChunkedSquarer(16))
+    pk, sk = tlp.setup(1, 1000)
+    p = tlp.generate(pk, sk.a, b"test")
+    path = tmp_path / "checkpoint"
+
+    with pytest.raises(Crash):
+        tlp.solve(pk, p, CrashingCheckpointer(path, every_squarings=100))
+
+    state = FileCheckpointer(path).load()
+    assert state is not None
+    assert state.index == 0 and 0 < state.squarings < 500
+    assert tlp.solve(pk, p, FileCheckpointer(path, every_squarings=100)) == b"test"
+
+
+def test_corrupt_checkpoint(tmp_path: Path):
+    path = tmp_path / "checkpoint"
+    checkpointer = FileCheckpointer(path)
+    checkpointer.update(0, 0x1234567890ABCDEF, 100)
+    checkpointer.save()
+    data = path.read_bytes()
+
+    for corrupt in [data[:5], data[:-1], data + b"\0", b"XXXX" + data[4:]]:
+        path.write_bytes(corrupt)
+        with pytest.raises(ValueError):
+            FileCheckpointer(path).load()
+
+
+def test_tlp_progress():
+    reports: list[Progress] = []
+    tlp = TLP(seed=1234, squarer=ChunkedSquarer(16))
+    pk, sk = tlp.setup(1, 1000)
+    p = tlp.generate(pk, sk.a, b"test")
+
+    progress = ProgressMonitor(reports.append, every_squarings=100)
+    assert tlp.solve(pk, p, progress=progress) == b"test"
+    assert [report.squarings for report in reports] == list(range(112, 1000, 112)) + [1000]
+    assert all(report.total == 1000 and report.rate > 0 for report in reports)
+    assert reports[-1].seconds_left == 0
+    assert not progress.running
+
+
+def test_tlp_cancel(tmp_path: Path):
+    token = CancellationToken()
+    tlp = TLP(seed=1234, squarer=ChunkedSquarer(16))
+    pk, sk = tlp.setup(1, 1000)
+    p = tlp.generate(pk, sk.a, b"test")
+    path = tmp_path / "checkpoint"
+
+    progress = ProgressMonitor(lambda _: token.cancel(), token=token, every_squarings=100)
+    with pytest.raises(SolveCancelled):
+        tlp.solve(pk, p, FileCheckpointer(path), progress=progress)
+
+    state = FileCheckpointer(path).load()
+    assert state is not None and state.squarings == 128
+    assert tlp.solve(pk, p, FileCheckpointer(path)) == b"test"
+
+
+def test_tlp_solve_many():
+    tlp = TLP(seed=1234)
+    messages = [b"test%d" % i for i in range(6)]
+    items: list[tuple[TLP_Public, TLP_Puzzle]] = []
+    for i, message in enumerate(messages):
+        pk, sk = tlp.setup(i + 1, 100, keysize=1024)
+        p = tlp.generate(pk, sk.a, message)
+        assert unpack_puzzle(pack_puzzle(pk, p)) == (pk, p)
+        items.append((pk, p))
+
+    solved = dict(tlp.solve_many(items, workers=2))
+    assert [solved[i] for i in range(len(messages))] == messages
+
+
+def test_tlp_setup_and_generate_many():
+    tlp = TLP(seed=1234)
+    messages = [b"test1", b"test2", b"test3"]
+    keys = tlp.setup_many([1, 2, 3], 100, keysize=1024)
+    pks = [pk for pk, _ in keys]
+    assert len({pk.n for pk in pks}) == 1
+    assert [pk.t for pk in pks] == [100, 200, 300]
+
+    puzzles = tlp.generate_many(pks, [sk.a for _, sk in keys], messages)
+    assert [tlp.solve(pk, p) for pk, p in zip(pks, puzzles)] == messages
+
+    with pytest.raises(ValueError):
+        tlp.generate_many(pks, [sk.a for _, sk in keys], messages[:-1])
+
+
+@pytest.mark.parametrize("keysize", [1024, 2048])
+def test_crt_powmod(keysize: int):
+    n, p, q, phi_n = SeededRSA(seed=1234).gen_key(keysize=keysize)
+    rand = random.Random(1234)
+    for _ in range(20):
+        r = Random(seed=rand.getrandbits(32)).gen_random_generator_mod_n(n)
+        a = rand.randrange(phi_n)
+        assert crt_powmod(r, a, p, q) == gmpy2.powmod(r, a, n)
+
+
+def test_tlp_generate_with_factors():
+    pk, sk = TLP(seed=1234).setup(1, 100, keysize=1024)
+    tlp = TLP()
+    p = tlp.generate(pk, sk.a, b"test", (sk.p, sk.q))
+    assert tlp.solve(pk, p) == b"test"
+
+
+def test_tlp_modulus_pool():
+    with ModulusPool(size=2, keysizes=[1024], workers=2) as pool:
+        tlp = TLP(gen_modulus=pool)
+        moduli = [tlp.setup(1, 1, keysize=1024)[0].n for _ in range(5)]
+        assert len(set(moduli)) == 5
+        assert pool.hits + pool.misses == 5
+
+        pk, sk = tlp.setup(1, 1, keysize=1024)
+        assert tlp.solve(pk, tlp.generate(pk, sk.a, b"test")) == b"test"
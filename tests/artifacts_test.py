@@ -0,0 +1,68 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from tlp_lib.smartcontracts import artifacts
+from tlp_lib.smartcontracts.artifacts import bundle_artifact, bundled_artifact_path, is_bundled, load_compiled_contract
+from tlp_lib.smartcontracts.EthereumSC import CONTRACT_NAME, CONTRACT_PATH, SOLC_VERSION
+
+
+@pytest.fixture
+def compilations(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> list[str]:
+    compiled: list[str] = []
+
+    def compile_contract(contract_path: str, contract_name: str, solc_version: str) -> tuple[list[str], str]:
+        compiled.append(Path(contract_path).read_text())
+        return [contract_name, solc_version], f"0x{len(compiled)}"
+
+    monkeypatch.setattr(artifacts, "compile_contract", compile_contract)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    return compiled
+
+
+def test_load_compiled_contract(compilations: list[str], tmp_path: Path):
+    contract_path = tmp_path / "SmartContract.sol"
+    shutil.copy(CONTRACT_PATH, contract_path)
+
+    artifact = load_compiled_contract(contract_path, CONTRACT_NAME, SOLC_VERSION)
+    assert artifact == ([CONTRACT_NAME, SOLC_VERSION], "0x1")
+    assert load_compiled_contract(contract_path, CONTRACT_NAME, SOLC_VERSION) == artifact
+    assert len(compilations) == 1
+
+    # a new solc version or source is compiled again
+    assert load_compiled_contract(contract_path, CONTRACT_NAME, "0.8.1")[1] == "0x2"
+    contract_path.write_text(contract_path.read_text() + "\n")
+    assert load_compiled_contract(contract_path, CONTRACT_NAME, SOLC_VERSION)[1] == "0x3"
+    assert len(compilations) == 3
+
+
+def test_bundle_artifact(compilations: list[str], tmp_path: Path):
+    contract_path = tmp_path / "SmartContract.sol"
+    shutil.copy(CONTRACT_PATH, contract_path)
+
+    assert not is_bundled(contract_path, CONTRACT_NAME, SOLC_VERSION)
+    assert bundle_artifact(contract_path, CONTRACT_NAME, SOLC_VERSION) == bundled_artifact_path(contract_path)
+    assert is_bundled(contract_path, CONTRACT_NAME, SOLC_VERSION)
+    assert not is_bundled(contract_path, CONTRACT_NAME, "0.8.1")
+    shutil.rmtree(tmp_path / "cache")
+    assert load_compiled_contract(contract_path, CONTRACT_NAME, SOLC_VERSION)[1] == "0x1"
+    assert len(compilations) == 1
+
+    # a bundled artifact of an older source is ignored
+    contract_path.write_text(contract_path.read_text() + "\n")
+    assert not is_bundled(contract_path, CONTRACT_NAME, SOLC_VERSION)
+    assert load_compiled_contract(contract_path, CONTRACT_NAME, SOLC_VERSION)[1] == "0x2"
+
+
+def test_load_compiled_contract_corrupt_artifact(compilations: list[str], tmp_path: Path):
+    contract_path = tmp_path / "SmartContract.sol"
+    shutil.copy(CONTRACT_PATH, contract_path)
+    bundled_artifact_path(contract_path).write_text('{"key": ')
+
+    assert load_compiled_contract(contract_path, CONTRACT_NAME, SOLC_VERSION)[1] == "0x1"
+    cached = next((tmp_path / "cache").glob("**/*.json"))
+    cached.write_text(cached.read_text()[:-1])
+    assert load_compiled_contract(contract_path, CONTRACT_NAME, SOLC_VERSION)[1] == "0x2"
+    assert load_compiled_contract(contract_path, CONTRACT_NAME, SOLC_VERSION)[1] == "0x2"
+    assert len(compilations) == 2
@@ -0,0 +1,77 @@
+import logging
+import time
+from pathlib import Path
+
+import pytest
+
+from tlp_lib import EDTLP, GCTLP, MITLP, TLP, calibrate, calibration
+from tlp_lib.calibration import (
+    HostProfile,
+    cpu_model,
+    default_profile_path,
+    host_server_info,
+    host_squarings_per_second,
+    load_profile,
+    save_profile,
+)
+from tlp_lib.protocols import Server_Info
+from tlp_lib.wrappers import NaiveSquarer
+
+
+def test_calibrate(tmp_path: Path):
+    path = tmp_path / "profiles.json"
+    profile = calibrate(1024, seconds=0.2, path=path)
+    assert profile.cpu == cpu_model()
+    assert profile.keysize == 1024
+    assert profile.squarings_per_second > 0
+    assert load_profile(1024, path) == profile
+    assert load_profile(2048, path) is None
+
+    naive = calibrate(1024, squarer=NaiveSquarer(), seconds=0.2, path=path, save=False)
+    assert naive.squarings_per_second > 0
+    assert load_profile(1024, path) == profile
+
+
+def test_load_profile_max_age(tmp_path: Path):
+    path = tmp_path / "profiles.json"
+    save_profile(HostProfile(cpu_model(), 2048, 100, time.time() - 3600), path)
+    save_profile(HostProfile("another cpu", 2048, 200, time.time()), path)
+    profile = load_profile(2048, path, max_age=None)
+    assert profile is not None and profile.squarings_per_second == 100
+    assert load_profile(2048, path, max_age=60) is None
+    assert host_squarings_per_second(2048, path) == 100
+
+
+def test_setup_from_profile(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert default_profile_path().is_relative_to(tmp_path)
+    save_profile(HostProfile(cpu_model(), 1024, 3, time.time()))
+    assert host_server_info(1024) == Server_Info(squarings=3)
+
+    pk, _ = TLP().setup(2, keysize=1024)
+    assert pk.t == 6
+    pk, _ = MITLP().setup(2, 2, keysize=1024)
+    assert pk.t == 6
+    pk, _ = GCTLP().setup([1, 2], keysize=1024)
+    assert list(pk.t) == [3, 6]
+
+    extra_time, _ = EDTLP().server_delegation([1], None, [1], 0, 1, squarings_upper_bound=6, keysize=1024)
+    assert extra_time == [1]
+
+
+def test_corrupt_profile(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture):
+    path = tmp_path / "profiles.json"
+    path.write_text('{"truncated')
+    assert load_profile(2048, path) is None
+
+    def fake_calibrate(keysize: int, path: Path) -> HostProfile:
+        return HostProfile(cpu_model(), keysize, 5, 0)
+
+    monkeypatch.setattr(calibration, "calibrate", fake_calibrate)
+    with caplog.at_level(logging.INFO, logger=calibration.__name__):
+        assert host_squarings_per_second(2048, path) == 5
+    assert "calibrating" in caplog.text
+
+    save_profile(HostProfile(cpu_model(), 2048, 100, time.time()), path)
+    profile = load_profile(2048, path)
+    assert profile is not None and profile.squarings_per_second == 100
@@ -0,0 +1,114 @@
+import gmpy2
+import pytest
+
+from tlp_lib import EDTLP, GCTLP, MITLP, TLP
+from tlp_lib.proofs import proof_depth, prove, verify_proof
+from tlp_lib.protocols import GCTLP_Public_Input, Server_Info, TLP_Proof, TLP_Puzzle
+from tlp_lib.smartcontracts import MockSC
+from tlp_lib.smartcontracts.protocols import SCInterface
+from tlp_lib.wrappers import ChunkedSquarer, NaiveSquarer, SeededRSA
+
+
+@pytest.mark.parametrize("t", [1, 2, 3, 4, 5, 7, 8, 100, 1001, 9000, 1 << 14, 100_003])
+def test_prove(t: int):
+    n, _, _, _ = SeededRSA(seed=1234).gen_key(keysize=1024)
+    proof = prove(5, t, n, ChunkedSquarer(1000))
+    assert proof.y == gmpy2.powmod(5, 1 << t, n)
+    assert proof.w == gmpy2.powmod(5, 1 << (t - 1), n)
+    assert verify_proof(n, t, proof)
+    assert proof_depth(t) <= len(proof.mu)
+
+    assert not verify_proof(n, t + 1, proof)
+    assert not verify_proof(n, t, proof._replace(r=6))
+    assert not verify_proof(n, t, proof._replace(y=proof.y * 4 % n, w=proof.w * 2 % n))
+    assert not verify_proof(n, t, proof._replace(y=n - proof.y))
+    if proof.mu:
+        assert not verify_proof(n, t, proof._replace(mu=[proof.mu[0] + 1] + proof.mu[1:]))
+        assert not verify_proof(n, t, proof._replace(mu=proof.mu[:-1]))
+
+
+def test_tlp_solve_with_proof():
+    tlp = TLP(seed=1234, squarer=NaiveSquarer())
+    pk, sk = tlp.setup(1, 5000, keysize=1024)
+    p = tlp.generate(pk, sk.a, b"test")
+    m, proof = tlp.solve_with_proof(pk, p)
+    assert m == b"test"
+    assert tlp.verify_proof(pk, proof)
+    assert not tlp.verify_proof(pk._replace(r=pk.r + 1), proof)
+
+
+def test_mitlp_solve_with_proofs():
+    messages = [b"test1", b"test2", b"test3"]
+    mitlp = MITLP(seed=1234)
+    pk, sk = mitlp.setup(len(messages), 1, 100, keysize=1024)
+    puzz_list, hash_list = mitlp.generate(messages, pk, sk)
+
+    proofs: list[TLP_Proof] = []
+    r = None
+    for i, (m, d, proof) in enumerate(mitlp.solve_with_proofs(pk, puzz_list)):
+        assert m == messages[i]
+        mitlp.verify(m, d, hash_list[i])
+        assert mitlp.verify_proof(pk, i, proof, r)
+        opened_m, opened_d, r = mitlp.open_with_proof(pk, puzz_list[i], proof, i == len(messages) - 1)
+        assert (opened_m, opened_d) == (m, d)
+        proofs.append(proof)
+    assert r is None
+    assert proofs[0].r == pk.r_0
+    assert not mitlp.verify_proof(pk._replace(r_0=pk.r_0 + 1), 0, proofs[0])
+    with pytest.raises(ValueError):
+        mitlp.verify_proof(pk, 1, proofs[1])
+
+    # a proof of the right number of squarings, but of some other r
+    forged = prove(12345, pk.t, pk.n, ChunkedSquarer())
+    assert not mitlp.verify_proof(pk, 1, forged, proofs[1].r)
+
+
+def _edtlp_with_proofs() -> tuple[EDTLP, SCInterface, GCTLP_Public_Input, list[TLP_Puzzle], list[TLP_Proof]]:
+    intervals = [1, 2]
+    edtlp = EDTLP(smart_contract=MockSC())
+    csk = edtlp.client_setup()
+    encrypted_messages, start_time = edtlp.client_delegation([b"test1", b"test2"], csk)
+    _, sc = edtlp.server_delegation(intervals, Server_Info(squarings=1), [1, 1], start_time, 1, keysize=1024)
+    pk, sk = edtlp.helper_setup(intervals, 1000, keysize=1024)
+    puzz_list = edtlp.helper_generate(encrypted_messages, pk, sk, start_time, sc)
+
+    gctlp = GCTLP()
+    proofs: list[TLP_Proof] = []
+    for m, d, proof in gctlp.solve_with_proofs(pk, puzz_list):
+        edtlp.register(sc, m, d)
+        proofs.append(proof)
+    return edtlp, sc, pk, puzz_list, proofs
+
+
+def test_edtlp_verify_with_proof():
+    edtlp, sc, pk, puzz_list, proofs = _edtlp_with_proofs()
+
+    r = None
+    for i, proof in enumerate(proofs):
+        r = edtlp.verify(sc, i, pk, proof, puzz_list[i], r)
+    assert r is not None
+    with pytest.raises(AssertionError):
+        edtlp.verify(sc, 1, pk, proofs[0], puzz_list[1], proofs[1].r)
+
+
+def test_edtlp_verify_rejects_forged_proof():
+    edtlp, sc, pk, puzz_list, proofs = _edtlp_with_proofs()
+
+    # a valid proof of t[1] squarings that starts from an r of the prover's choosing
+    _, n, t, _ = pk
+    forged = prove(12345, t[1], n, ChunkedSquarer())
+    assert verify_proof(n, t[1], forged)
+    assert not edtlp.gctlp.verify_proof(pk, 1, forged, proofs[1].r)
+    with pytest.raises(AssertionError):
+        edtlp.verify(sc, 1, pk, forged, puzz_list[1], proofs[1].r)
+    with pytest.raises(ValueError):
+        edtlp.gctlp.verify_proof(pk, 1, forged)
+
+
+def test_edtlp_verify_rejects_other_puzzle():
+    edtlp, sc, pk, puzz_list, proofs = _edtlp_with_proofs()
+    r_1 = edtlp.verify(sc, 0, pk, proofs[0], puzz_list[0])
+
+    # the proof of instance 1 is sound, but its y is not the key of puzzle 0
+    with pytest.raises(Exception):
+        edtlp.verify(sc, 1, pk, proofs[1], puzz_list[0], r_1)
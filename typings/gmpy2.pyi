@@ -99,6 +99,13 @@ class mpz(int):
 
 class mpfr(float): ...
 
+class context:
+    allow_release_gil: bool
+    def __init__(self, ctx: context = ..., /, **kwargs: Any) -> None: ...
+    def __enter__(self) -> context: ...
+    def __exit__(self, *args: object) -> None: ...
+
+def get_context() -> context: ...
 def invert(x: mpz, m: mpz) -> mpz: ...
 def powmod(a: int, e: int, p: int) -> mpz: ...
 def to_binary(a: mpz) -> bytes: ...